@@ -2,7 +2,9 @@
 
 from itertools import chain
 
-from django.db.models import Exists, OuterRef, Q, TextChoices
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Exists, OuterRef, Q, TextChoices, Value
 from django.utils.translation import gettext_lazy as _
 
 import django_filters
@@ -19,9 +21,7 @@ class ItemFilter(django_filters.FilterSet):
     and favorites) so the topbar filters behave the same in all views.
     """
 
-    title = django_filters.CharFilter(
-        field_name="title", lookup_expr="unaccent__icontains", label=_("Title")
-    )
+    title = django_filters.CharFilter(method="filter_title", label=_("Title"))
     category = django_filters.ChoiceFilter(
         method="filter_category", label=_("File type"), choices=enums.FILE_CATEGORY_CHOICES
     )
@@ -44,6 +44,31 @@ class ItemFilter(django_filters.FilterSet):
             matched |= Q(filename__iendswith=f".{extension}")
         return matched
 
+    # pylint: disable=unused-argument
+    def filter_title(self, queryset, name, value):
+        """
+        Filter items whose title contains the value, ignoring case and accents, and
+        annotate them with their similarity to the value (`title_similarity`).
+
+        When SEARCH_TITLE_MIN_SIMILARITY is set, titles with a word similarity to the
+        value above this threshold also match, to tolerate typos.
+
+        Both conditions are served by the trigram index on the searchable title.
+        """
+        searched = models.SearchableText(Value(value))
+        queryset = queryset.alias(searchable_title=models.SearchableText("title")).annotate(
+            title_similarity=TrigramWordSimilarity(searched, "searchable_title")
+        )
+
+        matched = Q(searchable_title__contains=searched)
+        if min_similarity := settings.SEARCH_TITLE_MIN_SIMILARITY:
+            matched |= Q(
+                searchable_title__trigram_word_similar=searched,
+                title_similarity__gte=min_similarity,
+            )
+
+        return queryset.filter(matched)
+
     # pylint: disable=unused-argument
     def filter_category(self, queryset, name, value):
         """
@@ -84,7 +109,8 @@ class ItemFilter(django_filters.FilterSet):
                 → Filters items shared with or by the given user
         """
         contact_access = models.ItemAccess.objects.filter(
-            user_id=value, item__path__ancestors=OuterRef("path")
+            user_id=value,
+            item_id__in=models.PathIds(models.EffectivePath(OuterRef("path"))),
         )
         return queryset.filter(Exists(contact_access) | Q(creator_id=value))
 
@@ -183,6 +209,11 @@ class SearchItemFilter(ItemFilter):
 
         super().__init__(data, *args, **kwargs)
 
+    def filter_title(self, queryset, name, value):
+        """Rank the items matching the title by similarity."""
+        queryset = super().filter_title(queryset, name, value)
+        return queryset.order_by("-title_similarity", "created_at")
+
     # pylint: disable=unused-argument
     def filter_workspace(self, queryset, name, value):
         """
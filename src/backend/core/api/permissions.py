@@ -12,6 +12,11 @@ ACTION_FOR_METHOD_TO_PERMISSION = {
     "versions_detail": {"DELETE": "versions_destroy", "GET": "versions_retrieve"},
     "children": {"GET": "children_list", "POST": "children_create"},
     "batch_share": {"POST": "accesses_manage"},
+    "tree_task": {"GET": "retrieve"},
+    "bulk_move": {"POST": "move"},
+    "bulk_destroy": {"POST": "destroy"},
+    "bulk_restore": {"POST": "restore"},
+    "bulk_favorite": {"POST": "favorite", "DELETE": "favorite"},
 }
 
 
@@ -125,6 +130,10 @@ class ItemPermission(permissions.BasePermission):
             "create",
             "trashbin",
             "search",
+            "bulk_move",
+            "bulk_destroy",
+            "bulk_restore",
+            "bulk_favorite",
         ]
 
     def has_object_permission(self, request, view, obj):
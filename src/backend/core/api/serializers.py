@@ -9,6 +9,7 @@ from os.path import splitext
 from urllib.parse import quote
 
 from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
@@ -267,6 +268,7 @@ class ListItemSerializer(serializers.ModelSerializer):
             "description",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
         read_only_fields = [
@@ -297,6 +299,7 @@ class ListItemSerializer(serializers.ModelSerializer):
             "description",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
 
@@ -420,6 +423,7 @@ class ListItemLightSerializer(ListItemSerializer):
             "description",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
         read_only_fields = [
@@ -445,14 +449,34 @@ class ListItemLightSerializer(ListItemSerializer):
             "description",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
 
 
+class SearchParentItemSerializer(serializers.ModelSerializer):
+    """
+    Serialize the parents of the search results with the fields displayed in their
+    breadcrumb. A parent shared by several results is serialized once per response.
+    """
+
+    class Meta:
+        model = models.Item
+        fields = ["id", "title", "path", "depth", "type", "main_workspace"]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        """Reuse the representation of the parent if it was already serialized."""
+        representations = self.context.setdefault("parents_representations", {})
+        if instance.pk not in representations:
+            representations[instance.pk] = super().to_representation(instance)
+        return representations[instance.pk]
+
+
 class SearchItemSerializer(ListItemSerializer):
     """Serialize items for search."""
 
-    parents = ListItemSerializer(many=True, read_only=True)
+    parents = SearchParentItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = models.Item
@@ -497,6 +521,7 @@ class ItemSerializer(ListItemSerializer):
             "description",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
         read_only_fields = [
@@ -527,14 +552,19 @@ class ItemSerializer(ListItemSerializer):
             "size",
             "deleted_at",
             "hard_delete_at",
+            "subtree_operation",
             "is_wopi_supported",
         ]
 
     def create(self, validated_data):
         raise NotImplementedError("Create method can not be used.")
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Validate that the title is unique in the current path."""
+        """
+        Validate that the title is unique in the current path, the titles of the siblings
+        are locked until the item is saved.
+        """
         if validated_data.get("title") and instance.title != validated_data.get("title"):
             if instance.depth > 1:
                 validated_data["title"] = instance.manage_unique_title(validated_data.get("title"))
@@ -596,6 +626,7 @@ class CreateItemSerializer(ItemSerializer):
             "size",
             "description",
             "hard_delete_at",
+            "subtree_operation",
             "extension",
         ]
         read_only_fields = [
@@ -621,6 +652,7 @@ class CreateItemSerializer(ItemSerializer):
             "main_workspace",
             "size",
             "hard_delete_at",
+            "subtree_operation",
         ]
 
     def get_fields(self):
@@ -720,6 +752,17 @@ class BreadcrumbItemSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "title", "path", "depth", "main_workspace"]
 
 
+class ItemTreeTaskSerializer(serializers.ModelSerializer):
+    """Serialize the progress of a background operation on a subtree."""
+
+    progress = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = models.ItemTreeTask
+        fields = ["id", "kind", "status", "total", "done", "progress", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
 class UserMeSerializer(UserSerializer):
     """Serialize users for me endpoint."""
 
@@ -867,6 +910,25 @@ class MoveItemSerializer(serializers.Serializer):
     target_item_id = serializers.UUIDField(required=False)
 
 
+BULK_ACTION_MAX_ITEMS = 1000
+
+
+class BulkItemsSerializer(serializers.Serializer):
+    """Validate the ids of the items selected for a bulk action."""
+
+    item_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=BULK_ACTION_MAX_ITEMS
+    )
+
+    def validate_item_ids(self, value):
+        """Remove the duplicated ids, keeping the order of the selection."""
+        return list(dict.fromkeys(value))
+
+
+class BulkMoveItemsSerializer(BulkItemsSerializer, MoveItemSerializer):
+    """Validate the ids of the items to move and their target parent item."""
+
+
 BATCH_SHARE_MAX_ROWS = 100  # Keep in sync with the ui-kit share import modal max rows
 
 
@@ -18,7 +18,7 @@ from django.db import IntegrityError, transaction
 from django.db import models as db
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import Coalesce
-from django.http import StreamingHttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.utils.functional import cached_property
@@ -31,6 +31,7 @@ from corsheaders.middleware import (
     ACCESS_CONTROL_ALLOW_METHODS,
     ACCESS_CONTROL_ALLOW_ORIGIN,
 )
+from django_ltree.functions import NLevel
 from drf_spectacular.utils import extend_schema, extend_schema_view, inline_serializer
 from lasuite.drf.models.choices import (
     PRIVILEGED_ROLES,
@@ -53,12 +54,14 @@ from core.services.accesses import (
 )
 from core.services.item_exports import build_zip_stream, export_descendants
 from core.services.sdk_relay import SDKRelayManager
+from core.services.search_cache import SearchResultsCache
 from core.services.search_indexers import (
     get_file_indexer,
-    get_visited_items_ids_of,
 )
 from core.storage.cache import invalidate_storage_used_cache
+from core.tasks.email import queue_invitation_emails
 from core.tasks.item import duplicate_file, process_item_purge, rename_file
+from core.tasks.search import record_index_change
 from core.utils.analytics import posthog_capture
 from wopi.conversion import exceptions as conversion_exceptions
 from wopi.conversion.services import prepare_conversion
@@ -377,6 +380,14 @@ class ItemViewSet(
     6. **Duplicate**: Duplicate an item of type file.
         Example:
 
+    7. **Bulk actions**: Move, delete, restore or mark as favorite a list of items,
+        returning the result of each item.
+        Examples:
+        - POST /items/bulk-move/
+        - POST /items/bulk-delete/
+        - POST /items/bulk-restore/
+        - POST, DELETE /items/bulk-favorite/
+
     ### Ordering: created_at, updated_at, is_favorite, title
 
         Example:
@@ -518,15 +529,11 @@ class ItemViewSet(
             skip_sorting=True,
         )
 
-        path_list = db.Q()
-        for path in root_paths:
-            path_list |= db.Q(path__descendants=path)
-
         queryset = self.queryset.select_related("creator")
         # Remove items with upload_state SUSPICIOUS for non-creators
         queryset = self._filter_suspicious_items(queryset, user)
         queryset = self._exclude_pending_items(queryset)
-        queryset = queryset.filter(path_list)
+        queryset = queryset.filter_subtrees(root_paths)
         queryset = queryset.filter(ancestors_deleted_at__isnull=True)
 
         return queryset
@@ -707,8 +714,9 @@ class ItemViewSet(
         Hard delete an item.
         """
         instance = self.get_object()
-        instance.hard_delete()
-        process_item_purge.delay(instance.id)
+        # A large subtree is purged once its descendants are marked as hard deleted
+        if instance.hard_delete() is None:
+            process_item_purge.delay(instance.id)
         return drf.response.Response(status=status.HTTP_204_NO_CONTENT)
 
     @drf.decorators.action(detail=True, methods=["post"], url_path="convert")
@@ -913,8 +921,8 @@ class ItemViewSet(
     def _complete_item_deletion(self, item):
         """Completely delete an item."""
         item.soft_delete()
-        item.hard_delete()
-        process_item_purge.delay(item.id)
+        if item.hard_delete() is None:
+            process_item_purge.delay(item.id)
 
     @drf.decorators.action(
         detail=False,
@@ -984,47 +992,45 @@ class ItemViewSet(
 
         return self.get_response_for_queryset(queryset)
 
-    @drf.decorators.action(detail=True, methods=["post"])
-    @transaction.atomic
-    def move(self, request, *args, **kwargs):
+    def _get_move_target(self, target_item_id, item=None):
         """
-        Move an item to another location within the item tree.
-
-        The user must be an administrator or owner of both the item being moved
-        and the target parent item.
+        Return the target parent item of a move, None to move to the root, after
+        checking that the current user can create children in it.
         """
-        user = request.user
-        item = self.get_object()  # including permission checks
-
-        # Validate the input payload
-        serializer = serializers.MoveItemSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        validated_data = serializer.validated_data
-
-        target_item_id = validated_data.get("target_item_id")
         if not target_item_id:
-            target_item = None
-        else:
-            try:
-                target_item = models.Item.objects.get(
-                    id=target_item_id, ancestors_deleted_at__isnull=True
-                )
-            except models.Item.DoesNotExist as excpt:
-                raise drf.exceptions.ValidationError(
-                    {"target_item_id": "Target parent item does not exist."},
-                    code="item_move_target_does_not_exist",
-                ) from excpt
+            return None
 
-        message = None
-        if target_item and not target_item.get_abilities(user).get("children_create"):
-            message = "You do not have permission to move items as a child to this target item."
+        try:
+            target_item = models.Item.objects.get(
+                id=target_item_id, ancestors_deleted_at__isnull=True
+            )
+        except models.Item.DoesNotExist as excpt:
+            raise drf.exceptions.ValidationError(
+                {"target_item_id": "Target parent item does not exist."},
+                code="item_move_target_does_not_exist",
+            ) from excpt
 
-        if message:
+        user = self.request.user
+        if not target_item.get_abilities(user).get("children_create"):
             posthog_capture("item_move_missing_permission", user, {}, item=item)
             raise drf.exceptions.ValidationError(
-                {"target_item_id": message}, code="item_move_missing_permission"
+                {
+                    "target_item_id": (
+                        "You do not have permission to move items as a child to this target item."
+                    )
+                },
+                code="item_move_missing_permission",
             )
 
+        return target_item
+
+    def _move_item(self, item, target_item):
+        """
+        Move an item under the target item, or to the root when it is None.
+        Returns the tree task moving its descendants in the background, if any.
+        """
+        user = self.request.user
+
         # Moving a file to the root without a direct access reassigns its creator
         # (see below), shifting the file size to the mover's storage usage: gate it
         # like an upload so an over-quota user cannot take ownership of more storage.
@@ -1037,7 +1043,7 @@ class ItemViewSet(
                     code=can_upload.get("reason"),
                 )
 
-        item.move(target_item)
+        tree_task = item.move(target_item)
 
         # If the item is moved to the root and the user does not have an access on the item,
         # create an owner access for the user. Otherwise, the item will be invisible for the user.
@@ -1045,7 +1051,7 @@ class ItemViewSet(
         if not target_item and not has_direct_access:
             models.ItemAccess.objects.create(
                 item=item,
-                user=self.request.user,
+                user=user,
                 role=models.RoleChoices.OWNER,
             )
             # Saving the item only invalidates the storage used cache of the
@@ -1071,11 +1077,51 @@ class ItemViewSet(
             item.save(update_fields=update_fields)
 
         posthog_capture("item_moved", user, {}, item=item)
+        return tree_task
+
+    @drf.decorators.action(detail=True, methods=["post"])
+    @transaction.atomic
+    def move(self, request, *args, **kwargs):
+        """
+        Move an item to another location within the item tree.
+
+        The user must be an administrator or owner of both the item being moved
+        and the target parent item.
+        """
+        item = self.get_object()  # including permission checks
+
+        # Validate the input payload
+        serializer = serializers.MoveItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        target_item = self._get_move_target(serializer.validated_data.get("target_item_id"), item)
+        tree_task = self._move_item(item, target_item)
+
+        if tree_task:
+            # The descendants are moved in the background, the progress is
+            # reported by the tree-task endpoint.
+            return drf.response.Response(
+                serializers.ItemTreeTaskSerializer(tree_task).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
 
         return drf.response.Response(
             {"message": "item moved successfully."}, status=status.HTTP_200_OK
         )
 
+    @drf.decorators.action(detail=True, methods=["get"], url_path="tree-task")
+    def tree_task(self, request, *args, **kwargs):
+        """
+        Return the progress of the latest background operation on the descendants
+        of the item.
+        """
+        item = self.get_object()
+        tree_task = item.tree_tasks.order_by("-created_at").first()
+        if tree_task is None:
+            raise drf.exceptions.NotFound("No operation was run on this item.")
+
+        return drf.response.Response(serializers.ItemTreeTaskSerializer(tree_task).data)
+
     @drf.decorators.action(
         detail=True,
         methods=["post"],
@@ -1085,13 +1131,206 @@ class ItemViewSet(
         Restore a soft-deleted item if it was deleted less than x days ago.
         """
         item = self.get_object()
-        item.restore()
+        tree_task = item.restore()
+
+        if tree_task:
+            # The descendants are restored in the background
+            return drf_response.Response(
+                serializers.ItemTreeTaskSerializer(tree_task).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
 
         return drf_response.Response(
             {"detail": "item has been successfully restored."},
             status=status.HTTP_200_OK,
         )
 
+    def _get_bulk_error(self, exc):
+        """Return the status and the errors of an item of a bulk action."""
+        response = self.get_exception_handler()(exc, self.get_exception_handler_context())
+        return {"status": response.status_code, **response.data}
+
+    def _get_bulk_items(self, item_ids):
+        """
+        Return the items of a bulk action the current user is allowed to act on, and
+        the errors of the other ones by id.
+
+        The items are fetched in a single query annotated with the roles of the user
+        and the link definitions of their ancestors are computed together, so that the
+        permissions are checked on each item without further queries.
+        """
+        user = self.request.user
+        queryset = self._filter_suspicious_items(self.queryset.select_related("creator"), user)
+        queryset = queryset.filter(id__in=item_ids).annotate_is_favorite(user)
+        items = {item.id: item for item in queryset.annotate_user_roles(user)}
+        paths_links_mapping = self._compute_ancestors_link_definition(list(items.values()))
+
+        allowed_items = []
+        errors = {}
+        for item_id in item_ids:
+            item = items.get(item_id)
+            try:
+                if item is None:
+                    raise drf.exceptions.NotFound()
+                item.ancestors_link_definition = get_equivalent_link_definition(
+                    paths_links_mapping.get(str(item.path[:-1]), [])
+                )
+                self.check_object_permissions(self.request, item)
+            except (drf.exceptions.APIException, Http404) as exc:
+                errors[item_id] = self._get_bulk_error(exc)
+            else:
+                allowed_items.append(item)
+
+        return allowed_items, errors
+
+    def _apply_bulk_operation(self, items, operation, results):
+        """
+        Apply an operation to each item in a savepoint: the failure of an item does
+        not roll back the others. `operation` returns the result of the item.
+        """
+        for item in items:
+            try:
+                with transaction.atomic():
+                    results[item.id] = operation(item)
+            except (ValidationError, drf.exceptions.APIException) as exc:
+                results[item.id] = self._get_bulk_error(exc)
+
+    @staticmethod
+    def _get_bulk_response(item_ids, results):
+        """Return the result of each item of a bulk action, in the order of the selection."""
+        return drf.response.Response(
+            {"results": [{"id": item_id, **results[item_id]} for item_id in item_ids]}
+        )
+
+    @staticmethod
+    def _get_tree_task_result(tree_task, status_code):
+        """Result of an item operated in the background or right away."""
+        if tree_task:
+            return {
+                "status": status.HTTP_202_ACCEPTED,
+                "tree_task": serializers.ItemTreeTaskSerializer(tree_task).data,
+            }
+        return {"status": status_code}
+
+    @extend_schema(request=serializers.BulkMoveItemsSerializer)
+    @drf.decorators.action(detail=False, methods=["post"], url_path="bulk-move")
+    @transaction.atomic
+    def bulk_move(self, request, *args, **kwargs):
+        """
+        Move the selected items under the same target item, or to the root.
+        Returns the result of each item.
+        """
+        serializer = serializers.BulkMoveItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_ids = serializer.validated_data["item_ids"]
+
+        target_item = self._get_move_target(serializer.validated_data.get("target_item_id"))
+        items, results = self._get_bulk_items(item_ids)
+        # The descendants are moved before their ancestors so their paths stay valid
+        self._apply_bulk_operation(
+            sorted(items, key=lambda item: item.depth, reverse=True),
+            lambda item: self._get_tree_task_result(
+                self._move_item(item, target_item), status.HTTP_200_OK
+            ),
+            results,
+        )
+        return self._get_bulk_response(item_ids, results)
+
+    @extend_schema(request=serializers.BulkItemsSerializer)
+    @drf.decorators.action(detail=False, methods=["post"], url_path="bulk-delete")
+    @transaction.atomic
+    def bulk_destroy(self, request, *args, **kwargs):
+        """
+        Soft delete the selected items. Returns the result of each item.
+        """
+        serializer = serializers.BulkItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_ids = serializer.validated_data["item_ids"]
+
+        items, results = self._get_bulk_items(item_ids)
+        deleted_paths = []
+
+        def soft_delete(item):
+            # A selected item is deleted along with a selected ancestor
+            if any(str(item.path).startswith(f"{path}.") for path in deleted_paths):
+                return {"status": status.HTTP_204_NO_CONTENT}
+            tree_task = item.soft_delete()
+            deleted_paths.append(str(item.path))
+            return self._get_tree_task_result(tree_task, status.HTTP_204_NO_CONTENT)
+
+        # The ancestors are deleted before their descendants
+        self._apply_bulk_operation(sorted(items, key=lambda item: item.depth), soft_delete, results)
+        return self._get_bulk_response(item_ids, results)
+
+    @extend_schema(request=serializers.BulkItemsSerializer)
+    @drf.decorators.action(detail=False, methods=["post"], url_path="bulk-restore")
+    @transaction.atomic
+    def bulk_restore(self, request, *args, **kwargs):
+        """
+        Restore the selected soft deleted items. Returns the result of each item.
+        """
+        serializer = serializers.BulkItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_ids = serializer.validated_data["item_ids"]
+
+        items, results = self._get_bulk_items(item_ids)
+        # The ancestors are restored first so their descendants are restored in place
+        self._apply_bulk_operation(
+            sorted(items, key=lambda item: item.depth),
+            lambda item: self._get_tree_task_result(item.restore(), status.HTTP_200_OK),
+            results,
+        )
+        return self._get_bulk_response(item_ids, results)
+
+    @extend_schema(request=serializers.BulkItemsSerializer)
+    @drf.decorators.action(detail=False, methods=["post", "delete"], url_path="bulk-favorite")
+    @transaction.atomic
+    def bulk_favorite(self, request, *args, **kwargs):
+        """
+        Mark or unmark the selected items as favorites for the logged-in user based
+        on the HTTP method, in a single query. Returns the result of each item.
+        """
+        serializer = serializers.BulkItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item_ids = serializer.validated_data["item_ids"]
+        user = request.user
+
+        items, results = self._get_bulk_items(item_ids)
+
+        if request.method == "POST":
+            models.ItemFavorite.objects.bulk_create(
+                [
+                    models.ItemFavorite(item=item, user=user)
+                    for item in items
+                    if not item.is_favorite
+                ],
+                ignore_conflicts=True,
+            )
+            for item in items:
+                if item.is_favorite:
+                    results[item.id] = {
+                        "status": status.HTTP_200_OK,
+                        "detail": "item already marked as favorite",
+                    }
+                else:
+                    posthog_capture("item_favorited", user, {}, item=item)
+                    results[item.id] = {"status": status.HTTP_201_CREATED}
+            return self._get_bulk_response(item_ids, results)
+
+        models.ItemFavorite.objects.filter(
+            user=user, item_id__in=[item.id for item in items if item.is_favorite]
+        ).delete()
+        for item in items:
+            if item.is_favorite:
+                posthog_capture("item_unfavorited", user, {}, item=item)
+                results[item.id] = {"status": status.HTTP_200_OK}
+            else:
+                results[item.id] = {
+                    "status": status.HTTP_200_OK,
+                    "detail": "item was already not marked as favorite",
+                }
+        return self._get_bulk_response(item_ids, results)
+
     @drf.decorators.action(
         detail=True,
         methods=["get", "post"],
@@ -1182,13 +1421,14 @@ class ItemViewSet(
             item = self.queryset.only("path").get(pk=pk)
         except models.Item.DoesNotExist as exc:
             raise drf.exceptions.NotFound from exc
+        # The tree of an item not moved yet by a move in progress is the one it is
+        # moved to, its previous ancestors must not grant it their link reach.
+        path_items = self.queryset.filter_path_items(item.path).filter(
+            ancestors_deleted_at__isnull=True
+        )
 
         highest_ancestor = (
-            self.queryset.filter(path__ancestors=item.path, ancestors_deleted_at__isnull=True)
-            .readable_per_se(request.user)
-            .only("path")
-            .order_by("path")
-            .first()
+            path_items.readable_per_se(request.user).only("path").order_by("effective_path").first()
         )
 
         if not highest_ancestor:
@@ -1199,13 +1439,9 @@ class ItemViewSet(
             )
 
         ancestors = (
-            self.queryset.filter(
-                path__ancestors=item.path,
-                path__descendants=highest_ancestor.path,
-                ancestors_deleted_at__isnull=True,
-            )
-            .order_by("path")
-            .values_list("path", "link_reach", "link_role", named=True)
+            path_items.filter(effective_path__descendants=highest_ancestor.effective_path)
+            .order_by("effective_path")
+            .values_list("id", "effective_path", "link_reach", "link_role", named=True)
         )
 
         if len(ancestors) == 0:
@@ -1222,12 +1458,11 @@ class ItemViewSet(
             # exclude first iteration
             if i == 0:
                 # this is the highest ancestor, select it directly
-                clause |= db.Q(path=ancestor.path)
+                clause |= db.Q(id=ancestor.id)
             else:
                 # Select all siblings of the current ancestor
-                clause |= db.Q(
-                    path__descendants=".".join(ancestor.path[:-1]),
-                    path__depth=len(ancestor.path),
+                clause |= models.get_children_filter(
+                    models.get_path_value(".".join(ancestor.effective_path[:-1]))
                 )
 
             # Compute cache for ancestors links to avoid many queries while computing
@@ -1235,11 +1470,12 @@ class ItemViewSet(
             ancestors_links.append(
                 {"link_reach": ancestor.link_reach, "link_role": ancestor.link_role}
             )
-            paths_links_mapping[str(ancestor.path)] = ancestors_links.copy()
+            paths_links_mapping[str(ancestor.effective_path)] = ancestors_links.copy()
 
         tree = (
             self.queryset.select_related("creator")
             .filter(clause, type=models.ItemTypeChoices.FOLDER, deleted_at__isnull=True)
+            .annotate(effective_path=models.EffectivePath("path"))
             .order_by("created_at")
         )
 
@@ -1247,7 +1483,10 @@ class ItemViewSet(
         tree = tree.annotate_user_roles(user)
         tree = tree.annotate_is_favorite(user)
         tree = tree.annotate_with_numchild()
-        tree = self._filter_suspicious_items(tree, user)
+        tree = list(self._filter_suspicious_items(tree, user))
+        # The items of the tree are nested along the paths they have once moved
+        for node in tree:
+            node.path = node.effective_path
 
         serializer = self.get_serializer(
             tree,
@@ -1294,13 +1533,12 @@ class ItemViewSet(
         List the breadcrumb for an item
         """
         item = self.get_object()
+        path_items = self.queryset.filter_path_items(item.path).filter(
+            ancestors_deleted_at__isnull=True
+        )
 
         highest_ancestor = (
-            self.queryset.filter(path__ancestors=item.path, ancestors_deleted_at__isnull=True)
-            .readable_per_se(request.user)
-            .only("path")
-            .order_by("path")
-            .first()
+            path_items.readable_per_se(request.user).only("path").order_by("effective_path").first()
         )
 
         if not highest_ancestor:
@@ -1310,11 +1548,13 @@ class ItemViewSet(
                 else drf.exceptions.NotAuthenticated()
             )
 
-        breadcrumb = self.queryset.filter(
-            path__ancestors=item.path,
-            path__descendants=highest_ancestor.path,
-            ancestors_deleted_at__isnull=True,
-        ).order_by("path")
+        breadcrumb = list(
+            path_items.filter(effective_path__descendants=highest_ancestor.effective_path).order_by(
+                "effective_path"
+            )
+        )
+        for ancestor in breadcrumb:
+            ancestor.path = ancestor.effective_path
 
         serializer = self.get_serializer(breadcrumb, many=True)
         return drf.response.Response(serializer.data, status=drf.status.HTTP_200_OK)
@@ -1326,38 +1566,60 @@ class ItemViewSet(
         Returns a DRF response containding the results the fulltext search of Find
         sorted by score.
         """
+        return self._indexer_search(request, queryset, indexer, text)
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def _indexer_search(self, request, queryset, indexer, text):
+        """
+        Returns a DRF response containing the results of the fulltext search of the
+        indexer sorted by score.
+        """
         user = request.user
         token = request.session.get("oidc_access_token")
 
-        # Retrieve the documents ids from Find. No pagination here the queryset is
-        # already filtered
-        result_ids = [
-            r["_id"]
-            for r in indexer.search(
-                text=text, token=token, visited=get_visited_items_ids_of(queryset, user)
-            )
-        ]
+        # The results are paginated before loading and annotating the items of the page
+        results = indexer.search_results(text=text, token=token, queryset=queryset, user=user)
+        return self._get_search_results_response(queryset, results)
+
+    def _get_search_results_response(self, queryset, result_ids):
+        """
+        Returns a DRF response paginating the ordered ids of search results, then
+        loading, annotating and serializing only the items of the page.
+        """
+        user = self.request.user
+        page = self.paginate_queryset(result_ids)
+        page_ids = page if page is not None else result_ids[:]
 
-        queryset = queryset.filter(pk__in=result_ids)
+        queryset = queryset.filter(pk__in=page_ids)
         queryset = queryset.annotate_user_roles(user)
         queryset = queryset.annotate_is_favorite(user)
         queryset = queryset.annotate_with_numchild()
 
         files_by_uuid = {str(d.pk): d for d in queryset}
-        ordered_files = [files_by_uuid[id] for id in result_ids if id in files_by_uuid]
+        ordered_files = [files_by_uuid[id] for id in page_ids if id in files_by_uuid]
 
-        page = self.paginate_queryset(ordered_files)
+        items = self._compute_parents(ordered_files)
+        serializer = self.get_serializer(items, many=True)
 
         if page is not None:
-            items = self._compute_parents(page)
-            serializer = self.get_serializer(items, many=True)
-            result = self.get_paginated_response(serializer.data)
-            return result
+            return self.get_paginated_response(serializer.data)
 
-        items = self._compute_parents(ordered_files)
-        serializer = self.get_serializer(items, many=True)
         return drf.response.Response(serializer.data)
 
+    def _get_search_results_cache(self, filterset):
+        """Return the cache of the title search results of the user for the other filters."""
+        filters = {
+            name: value for name, value in filterset.form.cleaned_data.items() if name != "title"
+        }
+        return SearchResultsCache(self.request.user, filters, rank=self._rank_search_results)
+
+    @staticmethod
+    def _rank_search_results(text, item_ids):
+        """Rank items by the similarity of their title to the text, like the search."""
+        queryset = models.Item.objects.filter(pk__in=item_ids)
+        queryset = SearchItemFilter().filter_title(queryset, "title", text)
+        return [str(pk) for pk in queryset.values_list("pk", flat=True)]
+
     @drf.decorators.action(
         detail=False,
         methods=["get"],
@@ -1384,6 +1646,15 @@ class ItemViewSet(
             raise drf.exceptions.ValidationError(filterset.errors)
 
         workspace = filterset.form.cleaned_data.get("workspace")
+        use_indexer = indexer and settings.FEATURES_INDEXED_SEARCH is True
+
+        # Search-as-you-type sends a title search per keystroke: the results are
+        # cached, and refined from the results of a shorter text.
+        text = filterset.form.cleaned_data.get("title")
+        search_cache = cached_results = None
+        if text and not use_indexer and settings.SEARCH_RESULTS_CACHE_TIMEOUT:
+            search_cache = self._get_search_results_cache(filterset)
+            cached_results = search_cache.get(text)
 
         # First look for all top level items user has access to. Soft deleted items
         # are kept: a deleted root item is its own access holder and would become
@@ -1417,17 +1688,23 @@ class ItemViewSet(
             skip_sorting=True,
         )
 
-        path_list = db.Q()
-        for top_level_item in root_paths:
-            path_list |= db.Q(path__descendants=top_level_item)
+        queryset = queryset.filter_subtrees(root_paths)
 
-        queryset = queryset.filter(path_list)
+        if cached_results is not None and cached_results["complete"]:
+            # The items of the page are filtered again with the current permissions
+            # and state of the items, the cached results may be outdated.
+            return self._get_search_results_response(
+                filterset.filter_queryset(queryset), cached_results["results"]
+            )
 
         # use indexed search ONLY when the feature flag is enabled
-        if indexer and settings.FEATURES_INDEXED_SEARCH is True:
+        if use_indexer:
             # When the indexer is configured pop "title" from queryset search and use
             # fulltext results instead.
-            return self._indexed_search(
+            indexed_search = (
+                self._indexed_search if indexer.requires_oidc_token else self._indexer_search
+            )
+            return indexed_search(
                 request,
                 queryset,
                 indexer,
@@ -1436,6 +1713,13 @@ class ItemViewSet(
 
         # Without the indexer, the "title" filtering is kept
         queryset = filterset.filter_queryset(queryset)
+
+        if search_cache is not None and cached_results is None:
+            results = queryset.values_list("pk", flat=True)[: search_cache.max_size + 1]
+            cached_results = search_cache.set(text, [str(pk) for pk in results])
+            if cached_results["complete"]:
+                return self._get_search_results_response(queryset, cached_results["results"])
+
         queryset = queryset.annotate_user_roles(user)
         queryset = queryset.annotate_with_numchild()
 
@@ -1453,29 +1737,50 @@ class ItemViewSet(
 
     def _compute_parents(self, items):
         """
-        Compute parents for the items by analyzing their paths and fetching missing parents.
+        Attach their parents to the items. The missing parents are fetched in a single
+        query with the fields of their breadcrumb and of their links only, and the
+        ancestors link definitions of the items are computed once per ancestor chain,
+        whatever the depth of the results.
         """
-        # Build parents dictionary and collect missing parent IDs
-        parents = {str(item.id): item for item in items}
-        missing_parent_ids = set()
-
-        for item in items:
-            for item_id in item.path:
-                if item_id not in parents and item_id not in missing_parent_ids:
-                    missing_parent_ids.add(item_id)
+        items = list(items)
+        nodes = {str(item.id): item for item in items}
+        missing_parent_ids = {
+            item_id for item in items for item_id in item.path if item_id not in nodes
+        }
 
-        # Fetch missing ancestors from database
         if missing_parent_ids:
-            for parent in (
-                models.Item.objects.annotate_with_numchild()
-                .filter(id__in=missing_parent_ids)
-                .iterator()
-            ):
-                parents[str(parent.id)] = parent
+            parents = models.Item.objects.filter(id__in=missing_parent_ids).only(
+                "id",
+                "title",
+                "path",
+                "type",
+                "main_workspace",
+                "link_reach",
+                "link_role",
+                "ancestors_deleted_at",
+            )
+            for parent in parents:
+                nodes[str(parent.id)] = parent
+
+        # Shallower nodes first: the links of a parent's chain are known before its
+        # children's. The chains under a deleted ancestor are left to the lazy
+        # computation of Item.ancestors_link_definition.
+        links_by_path = {}
+        for node in sorted(nodes.values(), key=lambda node: node.depth):
+            if node.depth == 1:
+                ancestors_links = []
+            elif (ancestors_links := links_by_path.get(str(node.path[:-1]))) is None:
+                continue
+            node.ancestors_link_definition = get_equivalent_link_definition(ancestors_links)
+            if node.ancestors_deleted_at is None:
+                links_by_path[str(node.path)] = [*ancestors_links, node.link_definition]
 
-        # Set parents for each item
         for item in items:
-            item.parents = [parents[item_id] for item_id in item.path if item_id != str(item.id)]
+            item.parents = [
+                nodes[item_id]
+                for item_id in item.path
+                if item_id != str(item.id) and item_id in nodes
+            ]
 
         return items
 
@@ -1496,6 +1801,7 @@ class ItemViewSet(
             item.link_reach
         ) >= models.LinkReachChoices.get_priority(previous_link_reach):
             item.descendants().update(link_reach=None)
+            record_index_change(item, models.ItemIndexChangeChoices.SUBTREE)
 
         return drf.response.Response(serializer.data, status=drf.status.HTTP_200_OK)
 
@@ -1549,13 +1855,12 @@ class ItemViewSet(
             item, request.user, rows
         )
 
-        for email, role in created_accesses + created_invitations:
-            item.send_invitation_email(
-                email,
-                role,
-                request.user,
-                request.user.language or settings.LANGUAGE_CODE,
-            )
+        queue_invitation_emails(
+            item,
+            created_accesses + created_invitations,
+            request.user,
+            request.user.language or settings.LANGUAGE_CODE,
+        )
 
         posthog_capture(
             "item_batch_share",
@@ -1943,15 +2248,41 @@ class ItemAccessViewSet(
         queryset = super().filter_queryset(queryset)
         return queryset.filter(**{self.resource_field_name: self.kwargs["resource_id"]})
 
+    def get_queryset(self):
+        """
+        Annotate the max ancestors role of the accesses and the roles of the current
+        user on their item, the list computes the max ancestors role on its own.
+        """
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return queryset
+        return queryset.annotate_max_ancestors_role().annotate_user_roles(self.request.user)
+
+    @property
+    def paginator(self):
+        """
+        Only paginate the list of accesses when a page is requested, the whole list
+        is returned by default.
+        """
+        if not hasattr(self, "_paginator"):
+            query_params = self.request.query_params
+            self._paginator = (
+                Pagination() if "page" in query_params or "page_size" in query_params else None
+            )
+        return self._paginator
+
     def list(self, request, *args, **kwargs):
         """
         List item accesses for an item and its ancestors.
 
         Returns the deepest access per target (user/team) with computed max_ancestors_role.
         For inherited accesses (not on current item), max_ancestors_role equals the access's role.
+        The deepest accesses and their max ancestors role are computed in SQL.
 
         Non-privileged users only see privileged roles to prevent information leakage.
-        Results are ordered by item depth and creation date.
+        Results are ordered by item depth and creation date, they can be searched by
+        user email, user name or team with the "q" query parameter and are paginated
+        when the "page" or "page_size" query parameters are given.
         """
         user = request.user
         role = self.item.get_role(user)
@@ -1960,49 +2291,50 @@ class ItemAccessViewSet(
 
         # Get all accesses from ancestors (including current item)
         ancestors_qs = models.Item.objects.filter(
-            path__ancestors=self.item.path, ancestors_deleted_at__isnull=True
+            id__in=models.PathIds(models.EffectivePath(models.get_path_value(self.item.path))),
+            ancestors_deleted_at__isnull=True,
         )
         accesses_qs = self.get_queryset().filter(item__in=ancestors_qs)
         if role not in PRIVILEGED_ROLES:
             accesses_qs = accesses_qs.filter(role__in=PRIVILEGED_ROLES)
 
-        accesses_qs = accesses_qs.annotate_user_roles(user).order_by("item__path", "created_at")
-
-        # Track max role and keep only deepest access per target
-        max_role_by_target = {}
-        deepest_access_by_target = {}
-
-        for access in accesses_qs.iterator():
-            target = access.target_key
-            previous = max_role_by_target.get(target)
-            previous_role = previous["role"] if previous else None
+        # The search matches targets, so it keeps all the accesses of a matched target
+        if query := request.query_params.get("q", ""):
+            accesses_qs = accesses_qs.filter(
+                db.Q(user__email__icontains=query)
+                | db.Q(user__full_name__icontains=query)
+                | db.Q(team__icontains=query)
+            )
 
-            # Set max_ancestors_role from previous accesses in hierarchy
-            access.max_ancestors_role = previous_role
-            access.max_ancestors_role_item_id = previous["item_id"] if previous else None
+        accesses_qs = (
+            accesses_qs.annotate_user_roles(user)
+            .filter_deepest_by_target()
+            .order_by(NLevel("item__path"), "created_at")
+        )
 
-            max_role_by_target[target] = {
-                "role": models.RoleChoices.max(previous_role, access.role),
-                "item_id": access.item_id,
-            }
-            deepest_access_by_target[target] = access
+        page = self.paginate_queryset(accesses_qs)
+        selected_accesses = page if page is not None else list(accesses_qs)
 
-        for access in deepest_access_by_target.values():
+        roles_by_priority = {
+            models.RoleChoices.get_priority(role): role for role in models.RoleChoices.values
+        }
+        for access in selected_accesses:
             # In case of inherited accesses, the max ancestors role and the max ancestors
             # item id should be the access itself because it is the one should go to update.
             if access.item.depth < self.item.depth:
                 access.max_ancestors_role = access.role
                 access.max_ancestors_role_item_id = access.item_id
-
-        # Sort by depth and creation date, then serialize
-        selected_accesses = sorted(
-            deepest_access_by_target.values(),
-            key=lambda a: (a.item.depth, a.created_at),
-        )
+            else:
+                access.max_ancestors_role = roles_by_priority.get(
+                    access.max_ancestors_role_priority
+                )
+                access.max_ancestors_role_item_id = access.previous_item_id
 
         serializer = self.get_serializer_class()(
             selected_accesses, many=True, context=self.get_serializer_context()
         )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
         return drf.response.Response(serializer.data)
 
     def update(self, request, *args, **kwargs):
@@ -2082,13 +2414,19 @@ class ItemAccessViewSet(
                 "Only owners of an item can assign other users as owners."
             )
 
-        # Look for the max ancestors role of the item for the current user.
+        # Look for the max ancestors role of the item for the targeted user or team.
         ancestor_qs = (self.item.ancestors() | models.Item.objects.filter(pk=self.item.pk)).filter(
             ancestors_deleted_at__isnull=True
         )
-        ancestors_roles = models.ItemAccess.objects.filter(
-            item__in=ancestor_qs, user=serializer.validated_data.get("user")
-        ).values_list("role", flat=True)
+        if user := serializer.validated_data.get("user"):
+            target = db.Q(user=user)
+        else:
+            target = db.Q(team=serializer.validated_data.get("team", ""), team__gt="")
+        ancestors_roles = dict(
+            models.ItemAccess.objects.filter(target, item__in=ancestor_qs).values_list(
+                "role", "item_id"
+            )
+        )
         max_ancestors_role = models.RoleChoices.max(*ancestors_roles)
 
         if models.RoleChoices.get_priority(max_ancestors_role) >= models.RoleChoices.get_priority(
@@ -2104,11 +2442,14 @@ class ItemAccessViewSet(
             )
 
         access = serializer.save(item_id=self.kwargs["resource_id"])
+        # Spare the serialization of the new access from querying its ancestors again
+        access.max_ancestors_role = max_ancestors_role
+        access.max_ancestors_role_item_id = ancestors_roles.get(max_ancestors_role)
         synchronize_descendants_accesses(self.item, access)
         if access.user:
-            access.item.send_invitation_email(
-                access.user.email,
-                access.role,
+            queue_invitation_emails(
+                access.item,
+                [(access.user.email, access.role)],
                 self.request.user,
                 self.request.user.language or settings.LANGUAGE_CODE,
             )
@@ -2222,9 +2563,9 @@ class InvitationViewset(
         self._validate_provided_role(serializer.validated_data.get("role"))
         invitation = serializer.save()
 
-        invitation.item.send_invitation_email(
-            invitation.email,
-            invitation.role,
+        queue_invitation_emails(
+            invitation.item,
+            [(invitation.email, invitation.role)],
             self.request.user,
             self.request.user.language or settings.LANGUAGE_CODE,
         )
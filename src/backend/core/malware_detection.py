@@ -11,6 +11,7 @@ from lasuite.malware_detection.backends.dummy import DummyBackend
 from lasuite.malware_detection.enums import ReportStatus
 
 from core.models import Item, ItemUploadStateChoices
+from core.tasks.malware_detection import is_analysis_superseded
 
 logger = logging.getLogger(__name__)
 security_logger = logging.getLogger("drive.security")
@@ -37,6 +38,13 @@ def malware_detection_callback(file_path, status, error_info, **kwargs):
     """Malware detection callback"""
 
     item_id = kwargs.get("item_id")
+    analysis_version = kwargs.get("analysis_version")
+    if analysis_version is not None and is_analysis_superseded(item_id, analysis_version):
+        logger.info(
+            "Discard result of superseded analysis %s of item %s", analysis_version, item_id
+        )
+        return
+
     try:
         item = Item.objects.get(pk=item_id)
     except Item.DoesNotExist:
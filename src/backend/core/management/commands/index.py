@@ -2,15 +2,139 @@
 Handle search setup that needs to be done at bootstrap time.
 """
 
+import argparse
 import logging
+import multiprocessing
 import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date, parse_datetime
 
+from core import models
 from core.services.search_indexers import get_file_indexer
 
 logger = logging.getLogger("drive.search.bootstrap_search")
 
+PROGRESS_LOG_INTERVAL = 10
+
+
+def parse_since(value):
+    """Parse the --since argument as a datetime or a date."""
+    since = parse_datetime(value) or parse_date(value)
+    if since is None:
+        raise argparse.ArgumentTypeError(f"Invalid date or datetime: {value}")
+    return since.isoformat()
+
+
+def get_shard_bounds(shard, shards):
+    """
+    Return the ids bounding a shard: the UUID space is split into `shards` ranges
+    of equal size. The upper bound of the last shard is None.
+    """
+    step = 2**128 // shards
+    lower = uuid.UUID(int=shard * step)
+    upper = uuid.UUID(int=(shard + 1) * step) if shard < shards - 1 else None
+    return lower, upper
+
+
+def get_run(shards, since):
+    """Key of the checkpoints of a reindexation run with the given options."""
+    return f"{shards}:{since or 'all'}"
+
+
+def get_shard_queryset(shard, shards, since):
+    """Return the queryset of the items of a shard."""
+    lower, upper = get_shard_bounds(shard, shards)
+    queryset = models.Item.objects.filter(main_workspace=False, id__gte=lower)
+    if upper is not None:
+        queryset = queryset.filter(id__lt=upper)
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    return queryset
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
+def index_shard(shard, shards, batch_size, since, resume, report):  # noqa: PLR0913
+    """
+    Index the items of a shard, saving the last indexed id after each batch so an
+    interrupted reindexation can be resumed.
+
+    `report` is called with the shard, the number of items to index and the number
+    of items indexed, then with the number of items of each pushed batch.
+    """
+    indexer = get_file_indexer()
+    run = get_run(shards, since)
+    queryset = get_shard_queryset(shard, shards, since)
+
+    checkpoint = (
+        models.ItemIndexCheckpoint.objects.filter(run=run, shard=shard).first() if resume else None
+    )
+    if checkpoint and checkpoint.done:
+        report(shard, 0, 0)
+        return 0
+
+    start_after = checkpoint.last_id if checkpoint else None
+    remaining = queryset.filter(id__gt=start_after) if start_after else queryset
+    report(shard, remaining.count(), 0)
+
+    def on_batch(count, last_id):
+        models.ItemIndexCheckpoint.objects.update_or_create(
+            run=run, shard=shard, defaults={"last_id": last_id, "done": False}
+        )
+        report(shard, None, count)
+
+    count = indexer.index(
+        queryset, batch_size=batch_size, start_after=start_after, callback=on_batch
+    )
+    models.ItemIndexCheckpoint.objects.update_or_create(
+        run=run, shard=shard, defaults={"last_id": None, "done": True}
+    )
+    return count
+
+
+class Progress:
+    """Aggregate the progress of the shards and log it with a rate and an ETA."""
+
+    def __init__(self, shards):
+        self.totals = dict.fromkeys(range(shards))
+        self.done = 0
+        self.start = time.perf_counter()
+        self.logged_at = self.start
+
+    def update(self, shard, total, count, force=False):
+        """Record the total of a shard or a number of indexed items."""
+        if total is not None:
+            self.totals[shard] = total
+        self.done += count
+
+        now = time.perf_counter()
+        if force or now - self.logged_at >= PROGRESS_LOG_INTERVAL:
+            self.logged_at = now
+            self.log(now - self.start)
+
+    def log(self, duration):
+        """Log the number of indexed items, the rate and the ETA."""
+        rate = self.done / duration if duration else 0
+        if None in self.totals.values():
+            logger.info("Indexed %d items (%.1f items/s)", self.done, rate)
+            return
+
+        total = sum(self.totals.values())
+        eta = timedelta(seconds=round((total - self.done) / rate)) if rate else "unknown"
+        logger.info(
+            "Indexed %d/%d items (%.1f%%), %.1f items/s, ETA %s",
+            self.done,
+            total,
+            100 * self.done / total if total else 100,
+            rate,
+            eta,
+        )
+
 
 class Command(BaseCommand):
     """Index all files to remote search service"""
@@ -27,6 +151,32 @@ class Command(BaseCommand):
             default=50,
             help="Indexation query batch size",
         )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="Number of id ranges the items are split into",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes indexing the shards in parallel",
+        )
+        parser.add_argument(
+            "--since",
+            type=parse_since,
+            default=None,
+            help="Only index the items updated since this date or datetime (ISO 8601)",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Resume an interrupted indexation with the same shards and since options, "
+                "from the checkpoints saved in the database"
+            ),
+        )
 
     def handle(self, *args, **options):
         """Launch and log search index generation."""
@@ -36,18 +186,77 @@ class Command(BaseCommand):
             logger.warning("The indexer is not enabled or properly configured.")
             return
 
+        shards = options["shards"]
+        workers = min(options["workers"], shards)
+        if shards < 1 or workers < 1:
+            raise CommandError("The number of shards and workers must be positive")
+
         logger.info("Starting to regenerate Find index...")
         start = time.perf_counter()
+        progress = Progress(shards)
+        checkpoints = models.ItemIndexCheckpoint.objects.filter(
+            run=get_run(shards, options["since"])
+        )
+        if not options["resume"]:
+            checkpoints.delete()
+        index_options = {
+            "shards": shards,
+            "batch_size": options["batch_size"],
+            "since": options["since"],
+            "resume": options["resume"],
+        }
 
         try:
-            count = indexer.index(batch_size=options["batch_size"])
+            if workers == 1:
+                count = sum(
+                    index_shard(shard=shard, report=progress.update, **index_options)
+                    for shard in range(shards)
+                )
+            else:
+                count = self.index_in_processes(workers, progress, index_options)
         except Exception as err:
             logger.exception(err)
             raise CommandError("Unable to regenerate index") from err
 
+        # The run is complete, a later --resume starts a new one
+        checkpoints.delete()
+
+        progress.update(None, None, 0, force=True)
         duration = time.perf_counter() - start
         logger.info(
             "Search index regenerated from %d files(s) in %.2f seconds.",
             count,
             duration,
         )
+
+    @staticmethod
+    def index_in_processes(workers, progress, index_options):
+        """Index the shards in a pool of processes reporting their progress in a queue."""
+        # The processes must open their own database connections
+        connections.close_all()
+
+        with multiprocessing.Manager() as manager:
+            queue = manager.Queue()
+            report = partial(_put_in_queue, queue)
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = {
+                    executor.submit(index_shard, shard=shard, report=report, **index_options)
+                    for shard in range(index_options["shards"])
+                }
+                count = 0
+                while pending:
+                    done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                    while not queue.empty():
+                        progress.update(*queue.get())
+                    count += sum(future.result() for future in done)
+
+            while not queue.empty():
+                progress.update(*queue.get())
+
+        return count
+
+
+def _put_in_queue(queue, *args):
+    """Send a progress report of a shard to the main process."""
+    queue.put(args)
@@ -0,0 +1,46 @@
+"""Resume the item tree tasks left unfinished."""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ItemTreeTask, ItemTreeTaskStatusChoices
+from core.tasks.item import process_item_tree_task
+
+
+class Command(BaseCommand):
+    """
+    Enqueue again the tree tasks not completed and not updated for a given time:
+    - tasks failed after their last retry
+    - tasks pending whose enqueueing was lost
+    - tasks processing on a worker that stopped
+    A task processes again only the descendants left, the task of an item waiting for
+    a previous one is left to it.
+    """
+
+    help = "Resume the item tree tasks stuck for too long"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=30,
+            help="Age threshold in minutes since the last progress (default: 30)",
+        )
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(minutes=options["minutes"])
+
+        tree_tasks = (
+            ItemTreeTask.objects.exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+            .filter(updated_at__lt=threshold)
+            .order_by("created_at")
+        )
+
+        count = 0
+        for tree_task_id in tree_tasks.values_list("id", flat=True):
+            process_item_tree_task.delay(tree_task_id)
+            count += 1
+
+        self.stdout.write(f"Resumed {count} item tree task(s).")
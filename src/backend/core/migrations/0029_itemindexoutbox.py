@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_item_creator_size_quota_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemIndexOutbox',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('item', 'Item'), ('subtree', 'Item and descendants')], default='item', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_changes', to='core.item')),
+            ],
+            options={
+                'verbose_name': 'Item index change',
+                'verbose_name_plural': 'Item index changes',
+                'db_table': 'drive_item_index_outbox',
+            },
+        ),
+    ]
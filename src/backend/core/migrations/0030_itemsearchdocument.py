@@ -0,0 +1,28 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_itemindexoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSearchDocument',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.item')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Item search document',
+                'verbose_name_plural': 'Item search documents',
+                'db_table': 'drive_item_search_document',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='item_search_vector_gin_idx')],
+            },
+        ),
+    ]
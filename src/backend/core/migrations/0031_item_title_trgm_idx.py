@@ -0,0 +1,33 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+import core.models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. It avoids locking
+    # writes on the item table while the index is being built.
+    atomic = False
+
+    dependencies = [
+        ('core', '0030_itemsearchdocument'),
+    ]
+
+    operations = [
+        # unaccent is only STABLE (its dictionary can change), it can not be used in an
+        # index. The wrapper pins the dictionary and is declared IMMUTABLE.
+        migrations.RunSQL(
+            sql="""
+                CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+                AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+            """,
+            reverse_sql="DROP FUNCTION IF EXISTS immutable_unaccent(text);",
+        ),
+        AddIndexConcurrently(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(core.models.SearchableText('title'), name='gin_trgm_ops'), name='item_title_trgm_idx'),
+        ),
+    ]
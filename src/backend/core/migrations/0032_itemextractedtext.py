@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_item_title_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemExtractedText',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='core.item')),
+                ('content_version', models.CharField(max_length=255)),
+                ('extractor', models.CharField(max_length=255)),
+                ('text', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Item extracted text',
+                'verbose_name_plural': 'Item extracted texts',
+                'db_table': 'drive_item_extracted_text',
+            },
+        ),
+    ]
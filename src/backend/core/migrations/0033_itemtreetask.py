@@ -0,0 +1,35 @@
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_itemextractedtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemTreeTask',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='primary key for the record as UUID', primary_key=True, serialize=False, verbose_name='id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='date and time at which a record was created', verbose_name='created on')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='date and time at which a record was last updated', verbose_name='updated on')),
+                ('kind', models.CharField(choices=[('move', 'Move')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=25)),
+                ('source_path', models.TextField(blank=True, null=True)),
+                ('target_path', models.TextField(blank=True, null=True)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('done', models.PositiveIntegerField(default=0)),
+                ('error_details', models.TextField(blank=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tree_tasks', to='core.item')),
+            ],
+            options={
+                'verbose_name': 'Item tree task',
+                'verbose_name_plural': 'Item tree tasks',
+                'db_table': 'drive_item_tree_task',
+                'indexes': [models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['item'], name='item_tree_task_unfinished_idx')],
+            },
+        ),
+    ]
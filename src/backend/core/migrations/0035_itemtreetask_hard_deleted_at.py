@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_item_subtree_operation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemtreetask',
+            name='hard_deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='subtree_operation',
+            field=models.CharField(blank=True, choices=[('move', 'Move'), ('soft_delete', 'Soft delete'), ('restore', 'Restore'), ('hard_delete', 'Hard delete')], help_text='Operation being applied to the descendants in the background.', max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='itemtreetask',
+            name='kind',
+            field=models.CharField(choices=[('move', 'Move'), ('soft_delete', 'Soft delete'), ('restore', 'Restore'), ('hard_delete', 'Hard delete')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+import core.models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. It avoids locking
+    # writes on the item table while the index is being built.
+    atomic = False
+
+    dependencies = [
+        ("core", "0036_invitationemailoutbox"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="item",
+            index=models.Index(
+                core.models.ParentPath("path"), "title", name="item_parent_path_title_idx"
+            ),
+        ),
+    ]
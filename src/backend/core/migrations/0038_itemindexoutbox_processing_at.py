@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_item_parent_path_title_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemindexoutbox',
+            name='processing_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
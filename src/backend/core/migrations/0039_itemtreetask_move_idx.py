@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("core", "0038_itemindexoutbox_processing_at"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="itemtreetask",
+            index=models.Index(
+                condition=models.Q(("kind", "move"), models.Q(("status", "completed"), _negated=True)),
+                fields=["source_path", "target_path"],
+                name="item_tree_task_move_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_itemtreetask_move_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitationemailoutbox',
+            name='processing_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+import core.models
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("core", "0040_invitationemailoutbox_processing_at"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="itemtreetask",
+            name="item_tree_task_move_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="itemtreetask",
+            index=django.contrib.postgres.indexes.GistIndex(
+                core.models.TextToPath("source_path"),
+                condition=models.Q(("kind", "move"), models.Q(("status", "completed"), _negated=True)),
+                name="item_tree_task_move_source_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="itemtreetask",
+            index=django.contrib.postgres.indexes.GistIndex(
+                core.models.TextToPath("target_path"),
+                condition=models.Q(("kind", "move"), models.Q(("status", "completed"), _negated=True)),
+                name="item_tree_task_move_target_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_itemtreetask_move_gist_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemIndexCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('run', models.CharField(max_length=100)),
+                ('shard', models.PositiveIntegerField()),
+                ('last_id', models.UUIDField(blank=True, null=True)),
+                ('done', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Item index checkpoint',
+                'verbose_name_plural': 'Item index checkpoints',
+                'db_table': 'drive_item_index_checkpoint',
+                'constraints': [models.UniqueConstraint(fields=('run', 'shard'), name='unique_item_index_checkpoint_run_shard')],
+            },
+        ),
+    ]
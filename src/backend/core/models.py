@@ -3,10 +3,12 @@ Declare and configure the models for the drive core application
 """
 # pylint: disable=too-many-lines
 
+import hashlib
 import smtplib
 import uuid
 from datetime import timedelta
 from enum import StrEnum
+from itertools import batched
 from logging import getLogger
 from os.path import splitext
 
@@ -14,7 +16,8 @@ from django.conf import settings
 from django.contrib.auth import models as auth_models
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.postgres.fields import ArrayField
-from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.sites.models import Site
 from django.core import mail, validators
 from django.core.cache import cache
@@ -22,12 +25,14 @@ from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.db import models, transaction
 from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Lag, RowNumber
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import get_language, override
 from django.utils.translation import gettext_lazy as _
 
+from django_ltree.fields import PathField
 from django_ltree.functions import NLevel
 from django_ltree.managers import TreeManager, TreeQuerySet
 from django_ltree.models import TreeModel
@@ -43,6 +48,7 @@ from pydantic import BaseModel as PydanticBaseModel
 from timezone_field import TimeZoneField
 
 from core.storage.cache import invalidate_storage_used_cache
+from core.utils.item_title import lock_titles
 from core.utils.item_title import manage_unique_title as manage_unique_title_utils
 from wopi.conversion.policy import target_extension_for
 
@@ -97,6 +103,138 @@ class MirrorItemTaskStatusChoices(models.TextChoices):
     FAILED = "failed", _("Failed")
 
 
+class ItemTreeTaskKindChoices(models.TextChoices):
+    """Defines the operations applied to a subtree in the background."""
+
+    MOVE = "move", _("Move")
+    SOFT_DELETE = "soft_delete", _("Soft delete")
+    RESTORE = "restore", _("Restore")
+    HARD_DELETE = "hard_delete", _("Hard delete")
+
+
+class ItemTreeTaskStatusChoices(models.TextChoices):
+    """Defines the possible statuses for a subtree operation."""
+
+    PENDING = "pending", _("Pending")
+    PROCESSING = "processing", _("Processing")
+    COMPLETED = "completed", _("Completed")
+    FAILED = "failed", _("Failed")
+
+
+class ItemIndexChangeChoices(models.TextChoices):
+    """Defines the kinds of item changes waiting for their indexation."""
+
+    ITEM = "item", _("Item")
+    SUBTREE = "subtree", _("Item and descendants")
+
+
+class SearchableText(models.Func):
+    """
+    Lowercased and unaccented text, as indexed by the trigram index of the item titles.
+    `immutable_unaccent` is an immutable wrapper of `unaccent` usable in an index.
+    """
+
+    function = "immutable_unaccent"
+    template = "%(function)s(lower(%(expressions)s))"
+    output_field = models.TextField()
+
+
+class ParentPath(models.Func):
+    """Path of the parent of an item, empty for the root items."""
+
+    function = "subpath"
+    template = "%(function)s(%(expressions)s, 0, nlevel(%(expressions)s) - 1)"
+    output_field = PathField()
+
+
+# Path of an item under the source path of a background move in progress, rewritten
+# under its target path, NULL when there is no such move. The moves in progress are
+# matched on the partial GiST indexes of their paths, see ItemTreeTask.
+MOVED_TO_TARGET_PATH_SQL = (
+    "(SELECT text2ltree(task.target_path) || "
+    "subpath(%(expressions)s, nlevel(text2ltree(task.source_path))) "
+    "FROM drive_item_tree_task AS task "
+    "WHERE task.kind = 'move' AND task.status <> 'completed' "
+    "AND %(expressions)s <@ text2ltree(task.source_path) LIMIT 1)"
+)
+# Path of an item under the target path of a background move in progress, rewritten
+# under its source path, NULL when there is no such move.
+MOVED_TO_SOURCE_PATH_SQL = (
+    "(SELECT text2ltree(task.source_path) || "
+    "subpath(%(expressions)s, nlevel(text2ltree(task.target_path))) "
+    "FROM drive_item_tree_task AS task "
+    "WHERE task.kind = 'move' AND task.status <> 'completed' "
+    "AND %(expressions)s <@ text2ltree(task.target_path) LIMIT 1)"
+)
+
+
+class RepeatedPathFunc(models.Func):
+    """Function of a path repeated in its template, the path params are repeated along."""
+
+    output_field = PathField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, list(params) * self.template.count("%(expressions)s")
+
+
+class EffectivePath(RepeatedPathFunc):
+    """
+    Path of an item once the background move in progress in its subtree is completed.
+    Until the move task rewrites them, the descendants of a moved item keep their
+    path under the previous path of the moved item.
+    """
+
+    template = f"COALESCE({MOVED_TO_TARGET_PATH_SQL}, %(expressions)s)"
+
+
+class MovedPath(RepeatedPathFunc):
+    """
+    Path of an item on the other side of the background move in progress in its
+    subtree: its new path if it was not rewritten yet, its previous path otherwise.
+    NULL when there is no such move.
+    """
+
+    template = f"COALESCE({MOVED_TO_TARGET_PATH_SQL}, {MOVED_TO_SOURCE_PATH_SQL})"
+
+
+class TextToPath(models.Func):
+    """Path stored as text, matched along the paths of the items."""
+
+    function = "text2ltree"
+    output_field = PathField()
+
+
+class PathIds(models.Func):
+    """Subquery of the ids of the items of a path: the item and its ancestors."""
+
+    template = "(SELECT unnest(string_to_array(ltree2text(%(expressions)s), '.'))::uuid)"
+    output_field = models.UUIDField()
+
+
+def get_path_value(path):
+    """Return a path as an ltree expression."""
+    return Cast(models.Value(str(path)), output_field=PathField())
+
+
+def get_children_filter(path):
+    """
+    Filter on the children of the item at the given path expression. While a move is
+    in progress in its subtree, the children on the other side of the move are
+    included: those not rewritten yet for a moved item, those already rewritten for
+    an item not moved yet.
+    """
+    moved_path = MovedPath(path)
+    return models.Q(path__descendants=path, path__depth=NLevel(path) + 1) | models.Q(
+        path__descendants=moved_path, path__depth=NLevel(moved_path) + 1
+    )
+
+
+def is_path_in_subtree(path, root_path):
+    """Return True if the path is the root path or one of its descendants."""
+    return path == root_path or path.startswith(f"{root_path}.")
+
+
 class DuplicateEmailError(Exception):
     """Raised when an email is already associated with a pre-existing user."""
 
@@ -331,6 +469,10 @@ class User(AbstractBaseUser, BaseModel, auth_models.PermissionsMixin):
             ]
         )
 
+        # The bulk create bypasses ItemAccess.save() invalidating the number of accesses
+        for invitation in valid_invitations:
+            invitation.item.invalidate_nb_accesses_cache()
+
         # Set creator of items if not yet set (e.g. items created via server-to-server API)
         item_ids = [invitation.item_id for invitation in valid_invitations]
         Item.objects.filter(id__in=item_ids, creator__isnull=True).update(creator=self)
@@ -515,6 +657,8 @@ class UserReconciliation(BaseModel):
         if removed_linktraces:
             ids_to_delete = [entry.id for entry in removed_linktraces]
             LinkTrace.objects.filter(id__in=ids_to_delete).delete()
+        # The bulk operations bypass LinkTrace.save() and LinkTrace.delete()
+        LinkTrace.invalidate_item_ids_cache(self.active_user_id, self.inactive_user_id)
 
         Item.objects.bulk_update(updated_items, ["creator"])
         # The bulk update bypasses Item.save() invalidating the
@@ -783,9 +927,11 @@ class AnnotateUserRoleQuerySetMixin:
         output_field = ArrayField(base_field=models.CharField())
 
         if user.is_authenticated:
+            # The accesses are inherited along the path the item has once a move in
+            # progress in its subtree is completed
             user_roles_subquery = ItemAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                item__path__ancestors=models.OuterRef(self.path_property),
+                item_id__in=PathIds(EffectivePath(models.OuterRef(self.path_property))),
             ).values_list("role", flat=True)
 
             return self.annotate(
@@ -820,15 +966,89 @@ class ItemQuerySet(AnnotateUserRoleQuerySetMixin, TreeQuerySet):
 
         return self.filter(models.Q(link_reach=LinkReachChoices.PUBLIC))
 
-    def filter_non_deleted(self, **kwargs):
+    def filter_non_deleted(self, *args, **kwargs):
         """Filter the non deleted items"""
         return self.filter(
             models.Q(
                 models.Q(deleted_at__isnull=True) | models.Q(ancestors_deleted_at__isnull=True),
             ),
+            *args,
             **kwargs,
         )
 
+    def filter_parent_path(self, parent_path):
+        """
+        Filter the children of the item at the given path, the root items for an empty
+        path, through the index on the parent path and the title of the items.
+        """
+        return self.alias(parent_path=ParentPath("path")).filter(parent_path=str(parent_path))
+
+    def filter_path_items(self, path):
+        """
+        Filter the items of the given path, the item and its ancestors, along the path
+        it has once a move in progress in its subtree is completed. The items are
+        annotated with their own effective path to be ordered along it.
+        """
+        return self.filter(id__in=PathIds(EffectivePath(get_path_value(path)))).annotate(
+            effective_path=EffectivePath("path")
+        )
+
+    def filter_subtrees(self, root_paths):
+        """
+        Filter the items in the subtrees of the given root paths, along the paths the
+        items have once the moves in progress are completed. The descendants of an
+        item moved in the background keep their previous path until they are
+        rewritten: they are matched under the subtrees holding the target path of the
+        move, and not under those holding only its source path.
+        """
+        if not root_paths:
+            return self.none()
+
+        moves = list(
+            ItemTreeTask.objects.filter(kind=ItemTreeTaskKindChoices.MOVE)
+            .exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+            .values_list("source_path", "target_path")
+        )
+
+        # A root item not rewritten yet has its subtree under the target path
+        root_paths = [str(path) for path in root_paths]
+        for source_path, target_path in moves:
+            root_paths = [
+                f"{target_path}{path[len(source_path) :]}"
+                if is_path_in_subtree(path, source_path)
+                else path
+                for path in root_paths
+            ]
+
+        subtrees = models.Q()
+        for path in root_paths:
+            subtrees |= models.Q(path__descendants=path)
+
+        moved_out = models.Q()
+        for source_path, target_path in moves:
+            if any(is_path_in_subtree(target_path, path) for path in root_paths):
+                subtrees |= models.Q(path__descendants=source_path)
+                continue
+
+            # The subtrees rooted under the target path are still under the source path
+            moved_in = models.Q()
+            for path in root_paths:
+                if is_path_in_subtree(path, target_path):
+                    moved_in |= models.Q(
+                        path__descendants=f"{source_path}{path[len(target_path) :]}"
+                    )
+            subtrees |= moved_in
+
+            if any(is_path_in_subtree(source_path, path) for path in root_paths):
+                moved_out |= (
+                    models.Q(path__descendants=source_path) & ~moved_in
+                    if moved_in
+                    else models.Q(path__descendants=source_path)
+                )
+
+        queryset = self.filter(subtrees)
+        return queryset.exclude(moved_out) if moved_out else queryset
+
     def created_by(self, user):
         """Filter items created by the given user."""
         return self.filter(creator=user)
@@ -852,7 +1072,7 @@ class ItemQuerySet(AnnotateUserRoleQuerySetMixin, TreeQuerySet):
         owner_access = ItemAccess.objects.filter(
             models.Q(user=user) | models.Q(team__in=user.teams),
             role=RoleChoices.OWNER,
-            item__path__ancestors=models.OuterRef("path"),
+            item_id__in=PathIds(EffectivePath(models.OuterRef("path"))),
         )
         return self.filter(models.Exists(owner_access))
 
@@ -868,45 +1088,17 @@ class ItemQuerySet(AnnotateUserRoleQuerySetMixin, TreeQuerySet):
 
         return self.annotate(is_favorite=models.Value(False))
 
-    def annotate_user_roles(self, user):
-        """
-        Annotate item queryset with the roles of the current user
-        on the item or its ancestors.
-        """
-        output_field = ArrayField(base_field=models.CharField())
-
-        if user.is_authenticated:
-            user_roles_subquery = ItemAccess.objects.filter(
-                models.Q(user=user) | models.Q(team__in=user.teams),
-                item__path__ancestors=models.OuterRef("path"),
-            ).values_list("role", flat=True)
-
-            return self.annotate(
-                user_roles=models.Func(
-                    user_roles_subquery, function="ARRAY", output_field=output_field
-                )
-            )
-
-        return self.annotate(
-            user_roles=models.Value([], output_field=output_field),
-        )
-
     def annotate_with_numchild(self):
         """
         Annotate queryset with the count of direct non-deleted children (_numchild)
         and folder children (_numchild_folder).
         Uses two correlated subqueries; the Item.numchild property reads these annotations.
         """
-        direct_children_qs = (
-            Item.objects.filter(
-                path__descendants=models.OuterRef("path"),
-                deleted_at__isnull=True,
-                ancestors_deleted_at__isnull=True,
-            )
-            .annotate(_depth_diff=NLevel("path") - NLevel(models.OuterRef("path")))
-            .filter(_depth_diff=1)
-            .order_by()
-        )
+        direct_children_qs = Item.objects.filter(
+            get_children_filter(models.OuterRef("path")),
+            deleted_at__isnull=True,
+            ancestors_deleted_at__isnull=True,
+        ).order_by()
 
         numchild_sq = models.Subquery(
             # .values(group_key=...) introduces a GROUP BY on a constant, collapsing
@@ -933,6 +1125,15 @@ class ItemQuerySet(AnnotateUserRoleQuerySetMixin, TreeQuerySet):
             _numchild_folder=numchild_folder_sq,
         )
 
+    def get_creator_ids(self):
+        """Return the ids of the creators of the items, deduplicated by the database."""
+        return (
+            self.filter(creator__isnull=False)
+            .order_by()
+            .values_list("creator_id", flat=True)
+            .distinct()
+        )
+
 
 class ItemManager(TreeManager.from_queryset(ItemQuerySet)):
     """Custom manager for Item model overriding create_child method."""
@@ -952,20 +1153,17 @@ class ItemManager(TreeManager.from_queryset(ItemQuerySet)):
     def create_child(self, parent=None, **kwargs):
         """
         Check if the item can have children before adding one and if the title is
-        unique in the same path.
+        unique in the same path. The titles of the children of the parent are locked
+        while the item is created so concurrent creations cannot pick the same title.
         """
-        if parent:
-            if parent.type != ItemTypeChoices.FOLDER:
-                raise ValidationError(
-                    {
-                        "type": ValidationError(
-                            _("Only folders can have children."),
-                            code="item_create_child_type_folder_only",
-                        )
-                    }
-                )
-            kwargs["title"] = manage_unique_title_utils(
-                self.children(parent.path), kwargs.get("title")
+        if parent and parent.type != ItemTypeChoices.FOLDER:
+            raise ValidationError(
+                {
+                    "type": ValidationError(
+                        _("Only folders can have children."),
+                        code="item_create_child_type_folder_only",
+                    )
+                }
             )
 
         if not kwargs.get("id"):
@@ -973,12 +1171,17 @@ class ItemManager(TreeManager.from_queryset(ItemQuerySet)):
 
         kwargs["path"] = str(kwargs["id"])
 
-        if parent:
-            kwargs["path"] = f"{parent.path!s}.{kwargs['id']!s}"
+        if not parent:
+            return self.create(**kwargs)
 
-        item = self.create(**kwargs)
+        kwargs["path"] = f"{parent.path!s}.{kwargs['id']!s}"
 
-        return item
+        with transaction.atomic():
+            lock_titles(parent.path)
+            kwargs["title"] = manage_unique_title_utils(
+                self.filter_parent_path(parent.path), kwargs.get("title")
+            )
+            return self.create(**kwargs)
 
 
 # pylint: disable=too-many-public-methods
@@ -1032,6 +1235,13 @@ class Item(TreeModel, BaseModel):
         default=dict,
         help_text=_("Malware detection info when the analysis status is unsafe."),
     )
+    subtree_operation = models.CharField(
+        max_length=20,
+        choices=ItemTreeTaskKindChoices.choices,
+        null=True,
+        blank=True,
+        help_text=_("Operation being applied to the descendants in the background."),
+    )
 
     label_size = 7
 
@@ -1054,6 +1264,13 @@ class Item(TreeModel, BaseModel):
         indexes = [
             GistIndex(fields=["path"]),
             models.Index(NLevel(models.F("path")), name="drive_item_path_nlevel_idx"),
+            # Covers the substring and similarity searches on the title.
+            GinIndex(
+                OpClass(SearchableText("title"), name="gin_trgm_ops"),
+                name="item_title_trgm_idx",
+            ),
+            # Covers the lookup of the titles of the siblings of an item.
+            models.Index(ParentPath("path"), "title", name="item_parent_path_title_idx"),
             # Covers the storage used computation by creator.
             models.Index(
                 fields=["creator"],
@@ -1132,8 +1349,20 @@ class Item(TreeModel, BaseModel):
         return super().delete(using, keep_parents)
 
     def ancestors(self):
-        """Return the ancestors of the item excluding the item itself."""
-        return super().ancestors().exclude(id=self.id)
+        """
+        Return the ancestors of the item excluding the item itself. While a move is in
+        progress in its subtree, they are the ancestors the item has once it is moved.
+        """
+        return self._meta.model.objects.filter(
+            id__in=PathIds(EffectivePath(get_path_value(self.path)))
+        ).exclude(id=self.id)
+
+    def children(self):
+        """
+        Return the children of the item, on either side of a move in progress in
+        its subtree.
+        """
+        return self._meta.model.objects.filter(get_children_filter(get_path_value(self.path)))
 
     def descendants(self):
         """Return the descendants of the item excluding the item itself."""
@@ -1176,14 +1405,59 @@ class Item(TreeModel, BaseModel):
         """Return the depth of the item in the tree."""
         return len(self.path)
 
-    def get_nb_accesses_cache_key(self):
-        """Generate a unique cache key for each item."""
-        return f"item_{self.id!s}_nb_accesses"
+    @staticmethod
+    def get_nb_accesses_generation_cache_key(item_id):
+        """Return the cache key of the generation of the accesses of an item."""
+        return f"item_{item_id!s}_nb_accesses_generation"
+
+    @staticmethod
+    def delete_nb_accesses_generations(item_ids):
+        """
+        Remove the generations of the accesses of items from the cache, by batches of
+        ITEM_SUBTREE_CHUNK_SIZE keys.
+        """
+        for batch in batched(item_ids, settings.ITEM_SUBTREE_CHUNK_SIZE, strict=False):
+            cache.delete_many(
+                [Item.get_nb_accesses_generation_cache_key(item_id) for item_id in batch]
+            )
+
+    def _get_nb_accesses_generations(self):
+        """
+        Return the generations of the accesses of the item and of its ancestors, whose
+        ids make the path of the item, and those missing from the cache. A missing
+        generation is initialized so that an evicted generation cannot bring back a
+        stale number of accesses, it is up to the caller to store it.
+        """
+        keys = [self.get_nb_accesses_generation_cache_key(item_id) for item_id in list(self.path)]
+        generations = cache.get_many(keys)
+        missing = {key: uuid.uuid4().hex for key in keys if key not in generations}
+        generations.update(missing)
+        return [generations[key] for key in keys], missing
+
+    def get_nb_accesses_generations(self):
+        """Return the generations of the accesses of the item and of its ancestors."""
+        generations, missing = self._get_nb_accesses_generations()
+        if missing:
+            cache.set_many(missing, timeout=settings.ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT)
+        return generations
+
+    def get_nb_accesses_cache_key(self, generations=None):
+        """
+        Generate the cache key of the number of accesses of an item. It changes with the
+        generation of the accesses of the item or of any of its ancestors.
+        """
+        generations = ":".join(generations or self.get_nb_accesses_generations())
+        return f"item_{self.id!s}_nb_accesses:{hashlib.sha256(generations.encode()).hexdigest()}"
 
     def manage_unique_title(self, title):
-        """Manage the unique title in the same path."""
+        """
+        Manage the unique title in the same path. The titles of the siblings are locked
+        until the end of the transaction in which the item should be saved.
+        """
+        parent_path = self.path[:-1]
+        lock_titles(parent_path)
         return manage_unique_title_utils(
-            self.siblings(),
+            Item.objects.filter_parent_path(parent_path).exclude(pk=self.pk),
             title,
         )
 
@@ -1193,13 +1467,18 @@ class Item(TreeModel, BaseModel):
         try:
             return self._nb_accesses
         except AttributeError:
-            cache_key = self.get_nb_accesses_cache_key()
-            nb_accesses = cache.get(cache_key)
+            generations, missing = self._get_nb_accesses_generations()
+            cache_key = self.get_nb_accesses_cache_key(generations)
+            # A new generation has no cached number of accesses yet, it is not looked up
+            # and the generation is stored along with the number of accesses.
+            nb_accesses = None if missing else cache.get(cache_key)
 
             if nb_accesses is None:
                 nb_accesses = ItemAccess.objects.filter(
-                    item__path__ancestors=self.path,
+                    item_id__in=PathIds(EffectivePath(get_path_value(self.path))),
                 ).count()
+                if missing:
+                    cache.set_many(missing, timeout=settings.ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT)
                 cache.set(cache_key, nb_accesses)
 
             return nb_accesses
@@ -1225,11 +1504,15 @@ class Item(TreeModel, BaseModel):
 
     def invalidate_nb_accesses_cache(self):
         """
-        Invalidate the cache for number of accesses, including on affected descendants.
+        Invalidate the cache for number of accesses, including on affected descendants,
+        by renewing the generation of the accesses of the item: the cache keys of the
+        item and its descendants change without walking the descendants.
         """
-        for item in self._meta.model.objects.filter(path__descendants=self.path).only("id"):
-            cache_key = item.get_nb_accesses_cache_key()
-            cache.delete(cache_key)
+        cache.set(
+            self.get_nb_accesses_generation_cache_key(self.id),
+            uuid.uuid4().hex,
+            timeout=settings.ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT,
+        )
 
     def get_role(self, user):
         """Return the role a user has on an item."""
@@ -1241,7 +1524,7 @@ class Item(TreeModel, BaseModel):
         except AttributeError:
             roles = ItemAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                item__path__ancestors=self.path,
+                item_id__in=PathIds(EffectivePath(get_path_value(self.path))),
             ).values_list("role", flat=True)
 
         return RoleChoices.max(*roles)
@@ -1410,6 +1693,29 @@ class Item(TreeModel, BaseModel):
             "convert": can_convert,
         }
 
+    def _render_email(self, subject, context, language):
+        """Render the subject and the plain text and html bodies of an email about the item."""
+        base_url = settings.EMAIL_URL_APP or Site.objects.get_current().domain
+        context = {
+            **context,
+            "brandname": settings.EMAIL_BRAND_NAME,
+            "item": self,
+            "domain": base_url,
+            "link": (
+                f"{base_url}/explorer/items/files/{self.id}/"
+                if self.type == ItemTypeChoices.FILE
+                else f"{base_url}/explorer/items/{self.id}/"
+            ),
+            "logo_img": settings.EMAIL_LOGO_IMG,
+        }
+
+        with override(language):
+            msg_html = render_to_string("mail/html/invitation.html", context)
+            msg_plain = render_to_string("mail/text/invitation.txt", context)
+            subject = str(subject)  # Force translation
+
+        return subject.capitalize(), msg_plain, msg_html
+
     def send_email(self, subject, emails, context=None, language=None):
         """Generate and send email from a template."""
 
@@ -1417,43 +1723,23 @@ class Item(TreeModel, BaseModel):
             logger.debug("EMAIL_HOST host is not set, skipping email sending")
             return
 
-        context = context or {}
-        base_url = settings.EMAIL_URL_APP or Site.objects.get_current().domain
         language = language or get_language()
-        context.update(
-            {
-                "brandname": settings.EMAIL_BRAND_NAME,
-                "item": self,
-                "domain": base_url,
-                "link": (
-                    f"{base_url}/explorer/items/files/{self.id}/"
-                    if self.type == ItemTypeChoices.FILE
-                    else f"{base_url}/explorer/items/{self.id}/"
-                ),
-                "logo_img": settings.EMAIL_LOGO_IMG,
-            }
-        )
-
-        with override(language):
-            msg_html = render_to_string("mail/html/invitation.html", context)
-            msg_plain = render_to_string("mail/text/invitation.txt", context)
-            subject = str(subject)  # Force translation
+        subject, msg_plain, msg_html = self._render_email(subject, context or {}, language)
 
-            try:
-                send_mail(
-                    subject.capitalize(),
-                    msg_plain,
-                    settings.EMAIL_FROM,
-                    emails,
-                    html_message=msg_html,
-                    fail_silently=False,
-                )
-            except smtplib.SMTPException as exception:
-                logger.error("invitation to %s was not sent: %s", emails, exception)
+        try:
+            send_mail(
+                subject,
+                msg_plain,
+                settings.EMAIL_FROM,
+                emails,
+                html_message=msg_html,
+                fail_silently=False,
+            )
+        except smtplib.SMTPException as exception:
+            logger.error("invitation to %s was not sent: %s", emails, exception)
 
-    def send_invitation_email(self, email, role, sender, language=None):
-        """Method allowing a user to send an email invitation to another user for a item."""
-        language = language or get_language()
+    def _get_invitation_email(self, role, sender, language):
+        """Return the subject and the context of the email inviting a user with a role."""
         role = RoleChoices(role).label
         sender_name = sender.full_name or sender.email
         sender_name_email = (
@@ -1471,13 +1757,30 @@ class Item(TreeModel, BaseModel):
                 name=sender_name, title=self.title
             )
 
+        return subject, context
+
+    def send_invitation_email(self, email, role, sender, language=None):
+        """Method allowing a user to send an email invitation to another user for a item."""
+        language = language or get_language()
+        subject, context = self._get_invitation_email(role, sender, language)
         self.send_email(subject, [email], context, language)
 
+    def render_invitation_email(self, role, sender, language):
+        """
+        Render the subject and the plain text and html bodies of the email inviting
+        a user with a role.
+        """
+        subject, context = self._get_invitation_email(role, sender, language)
+        return self._render_email(subject, context, language)
+
     @transaction.atomic
     def soft_delete(self):
         """
         Soft delete the item, marking the deletion on descendants.
         We still keep the .delete() method untouched for programmatic purposes.
+
+        Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, they are marked in the
+        background by the returned tree task. Returns None when the deletion is complete.
         """
         if self.deleted_at or self.ancestors_deleted_at:
             raise RuntimeError("This item is already deleted or has deleted ancestors.")
@@ -1488,20 +1791,41 @@ class Item(TreeModel, BaseModel):
                 "Cannot delete this item because one or more ancestors are already deleted."
             )
 
+        if self.has_tree_task_in_progress():
+            raise ValidationError(
+                {
+                    "deleted_at": ValidationError(
+                        _("An operation is still in progress on this part of the tree"),
+                        code="item_soft_delete_tree_task_in_progress",
+                    )
+                }
+            )
+
         self.ancestors_deleted_at = self.deleted_at = timezone.now()
 
         self.save(update_fields=["deleted_at", "ancestors_deleted_at"])
 
+        if self.type != ItemTypeChoices.FOLDER:
+            return None
+
         # Mark all descendants as soft deleted
-        if self.type == ItemTypeChoices.FOLDER:
-            self.descendants().filter(ancestors_deleted_at__isnull=True).update(
-                ancestors_deleted_at=self.ancestors_deleted_at,
+        descendants = self.descendants().filter(ancestors_deleted_at__isnull=True)
+        if self._is_large_subtree(descendants):
+            return self._start_tree_task(
+                ItemTreeTaskKindChoices.SOFT_DELETE, ancestors_deleted_at=self.deleted_at
             )
 
+        descendants.update(ancestors_deleted_at=self.ancestors_deleted_at)
+        return None
+
+    @transaction.atomic
     def hard_delete(self):
         """
         Hard delete the item, marking the deletion on descendants.
         We still keep the .delete() method untouched for programmatic purposes.
+
+        Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, they are marked in the
+        background by the returned tree task. Returns None when the deletion is complete.
         """
         if self.hard_deleted_at:
             raise ValidationError(
@@ -1523,27 +1847,55 @@ class Item(TreeModel, BaseModel):
                 }
             )
 
-        # Collect the creators impacted before marking the tree as hard deleted:
-        # descendants can have different creators and their bulk update below
-        # bypasses Item.save() invalidating the storage used cache.
-        creator_ids = set(
-            self.descendants()
-            .filter(hard_deleted_at__isnull=True)
-            .values_list("creator_id", flat=True)
-        )
-        creator_ids.add(self.creator_id)
+        # The tasks of the item are processed in order, a hard delete can follow a
+        # soft delete still in progress but the descendants moved in the background
+        # must be rewritten first.
+        if self.has_move_in_progress():
+            raise ValidationError(
+                {
+                    "hard_deleted_at": ValidationError(
+                        _("An operation is still in progress on this part of the tree"),
+                        code="item_hard_delete_tree_task_in_progress",
+                    )
+                }
+            )
 
         self.hard_deleted_at = timezone.now()
         self.save(update_fields=["hard_deleted_at"])
 
         # Mark all descendants as hard deleted
-        self.descendants().update(hard_deleted_at=self.hard_deleted_at)
+        descendants = self.descendants().filter(hard_deleted_at__isnull=True)
+        if self._is_large_subtree(descendants):
+            # The generations of the descendants are removed by the task, chunk by chunk
+            transaction.on_commit(lambda: self.delete_nb_accesses_generations([self.id]))
+            return self._start_tree_task(
+                ItemTreeTaskKindChoices.HARD_DELETE, hard_deleted_at=self.hard_deleted_at
+            )
+
+        # Collect the creators impacted before marking the tree as hard deleted:
+        # descendants can have different creators and their bulk update below
+        # bypasses Item.save() invalidating the storage used cache.
+        creator_ids = list(descendants.get_creator_ids())
+        # The generations of the accesses of the hard deleted items are not read anymore
+        item_ids = [self.id, *descendants.values_list("id", flat=True)]
+        descendants.update(hard_deleted_at=self.hard_deleted_at)
+
+        def invalidate_caches():
+            invalidate_storage_used_cache(creator_ids)
+            self.delete_nb_accesses_generations(item_ids)
 
-        transaction.on_commit(lambda: invalidate_storage_used_cache(creator_ids))
+        transaction.on_commit(invalidate_caches)
+        return None
 
     @transaction.atomic
     def restore(self):
-        """Cancelling a soft delete with checks."""
+        """
+        Cancelling a soft delete with checks.
+
+        Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, or when the item is moved
+        in the background, the descendants are restored in the background by the
+        returned tree task. Returns None when the restoration is complete.
+        """
         # This should not happen
         if self.deleted_at is None:
             raise ValidationError(
@@ -1571,9 +1923,21 @@ class Item(TreeModel, BaseModel):
                 }
             )
 
+        self._supersede_failed_soft_delete()
+
+        if self.has_tree_task_in_progress():
+            raise ValidationError(
+                {
+                    "deleted_at": ValidationError(
+                        _("An operation is still in progress on this part of the tree"),
+                        code="item_restore_tree_task_in_progress",
+                    )
+                }
+            )
+
         # save the current deleted_at value to exclude it from the descendants update
         current_deleted_at = self.deleted_at
-        has_ancestors_deleted = False
+        move_task = None
 
         if self.depth > 1:
             has_ancestors_deleted = self.ancestors().filter(deleted_at__isnull=False).exists()
@@ -1581,7 +1945,7 @@ class Item(TreeModel, BaseModel):
             if has_ancestors_deleted:
                 # if it has ancestors deleted, try to move it to the top level ancestor
                 highest_ancestor = self.ancestors().filter(path__depth=1).get()
-                self.move(highest_ancestor)
+                move_task = self.move(highest_ancestor)
 
         # Restore the current item
         self.deleted_at = None
@@ -1589,15 +1953,103 @@ class Item(TreeModel, BaseModel):
 
         self.save(update_fields=["deleted_at", "ancestors_deleted_at"])
 
-        self.descendants().exclude(
-            models.Q(deleted_at__isnull=False)
-            | models.Q(ancestors_deleted_at__lt=current_deleted_at)
-        ).update(ancestors_deleted_at=None)
+        # The descendants moved in the background are restored once they are moved
+        descendants = self.descendants().filter(
+            deleted_at__isnull=True, ancestors_deleted_at__gte=current_deleted_at
+        )
+        if move_task or self._is_large_subtree(descendants):
+            return self._start_tree_task(
+                ItemTreeTaskKindChoices.RESTORE, ancestors_deleted_at=current_deleted_at
+            )
+
+        descendants.update(ancestors_deleted_at=None)
+        return None
+
+    def _supersede_failed_soft_delete(self):
+        """
+        Mark the failed soft delete of the item completed, the restore unmarks the
+        descendants it already marked. The folder would otherwise stay half deleted
+        and could not be restored until the soft delete is resumed.
+        """
+        if ItemTreeTask.objects.filter(
+            item=self,
+            kind=ItemTreeTaskKindChoices.SOFT_DELETE,
+            status=ItemTreeTaskStatusChoices.FAILED,
+            ancestors_deleted_at=self.deleted_at,
+        ).update(status=ItemTreeTaskStatusChoices.COMPLETED, updated_at=timezone.now()):
+            self._meta.model.objects.filter(
+                pk=self.pk, subtree_operation=ItemTreeTaskKindChoices.SOFT_DELETE
+            ).update(subtree_operation=None)
+            self.subtree_operation = None
+
+    @staticmethod
+    def _is_large_subtree(descendants):
+        """Return True if there are more descendants than ITEM_SUBTREE_ASYNC_THRESHOLD."""
+        threshold = settings.ITEM_SUBTREE_ASYNC_THRESHOLD
+        return (
+            bool(threshold)
+            and descendants.order_by().values("id")[: threshold + 1].count() > threshold
+        )
+
+    def _start_tree_task(self, kind, **kwargs):
+        """
+        Create the task applying an operation to the descendants in the background.
+        The operation of the first task is marked on the item, the next ones are
+        marked when the previous ones are completed.
+        """
+        if self._meta.model.objects.filter(pk=self.pk, subtree_operation__isnull=True).update(
+            subtree_operation=kind
+        ):
+            self.subtree_operation = kind
+        return ItemTreeTask.objects.create(item=self, kind=kind, **kwargs)
+
+    def _get_move_in_progress_filter(self):
+        """
+        Filter of the moves in progress on a part of the tree holding the item. The
+        descendants of an item moved in the background keep their previous path until
+        they are rewritten: such a move is in progress for the items whose path is an
+        ancestor or a descendant of the previous path of the moved item.
+        """
+        ancestors_paths = [".".join(self.path[:depth]) for depth in range(1, self.depth + 1)]
+        return models.Q(
+            models.Q(source_path__in=ancestors_paths)
+            | models.Q(source_path__startswith=f"{self.path!s}."),
+            kind=ItemTreeTaskKindChoices.MOVE,
+        )
+
+    def has_tree_task_in_progress(self):
+        """
+        Return True if a background operation is not completed on the subtree of the
+        item, of one of its ancestors or of one of its descendants, or if a move is in
+        progress on a part of the tree holding the item.
+        """
+        return (
+            ItemTreeTask.objects.exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+            .filter(
+                models.Q(item_id__in=list(self.path))
+                | models.Q(item__path__descendants=self.path)
+                | self._get_move_in_progress_filter()
+            )
+            .exists()
+        )
+
+    def has_move_in_progress(self):
+        """Return True if a move is in progress on a part of the tree holding the item."""
+        return (
+            ItemTreeTask.objects.exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+            .filter(self._get_move_in_progress_filter())
+            .exists()
+        )
 
     @transaction.atomic
     def move(self, target):
         """
         Move an item to a new position in the tree.
+
+        The paths of the descendants are rewritten along, unless there are more than
+        ITEM_SUBTREE_ASYNC_THRESHOLD of them: the item is then moved right away and
+        the returned tree task rewrites the paths of its descendants by chunks in the
+        background. Returns None when the move is complete.
         """
         if target and target.type != ItemTypeChoices.FOLDER:
             raise ValidationError(
@@ -1609,6 +2061,26 @@ class Item(TreeModel, BaseModel):
                 }
             )
 
+        if target and str(self.id) in target.path:
+            raise ValidationError(
+                {
+                    "target": ValidationError(
+                        _("An item cannot be moved inside itself"),
+                        code="item_move_target_in_subtree",
+                    )
+                }
+            )
+
+        if self.has_tree_task_in_progress() or (target and target.has_tree_task_in_progress()):
+            raise ValidationError(
+                {
+                    "target": ValidationError(
+                        _("An operation is still in progress on this part of the tree"),
+                        code="item_move_tree_task_in_progress",
+                    )
+                }
+            )
+
         old_path = self.path
         if target:
             self.path = f"{target.path!s}.{self.id!s}"
@@ -1616,13 +2088,27 @@ class Item(TreeModel, BaseModel):
             self.path = str(self.id)
 
         self.save(update_fields=["path"])
+        # The accesses inherited by the item and its descendants change with their
+        # ancestors.
+        self.invalidate_nb_accesses_cache()
+
+        if self.type != ItemTypeChoices.FOLDER:
+            return None
 
-        if self.type == ItemTypeChoices.FOLDER:
-            # https://patshaughnessy.net/2017/12/14/manipulating-trees-using-sql-and-the-postgres-ltree-extension
-            self._meta.model.objects.filter(path__descendants=old_path).update(
-                path=RawSQL("%s || subpath(path, nlevel(%s))", (str(self.path), str(old_path)))
+        descendants = self._meta.model.objects.filter(path__descendants=old_path)
+        if self._is_large_subtree(descendants):
+            return self._start_tree_task(
+                ItemTreeTaskKindChoices.MOVE,
+                source_path=str(old_path),
+                target_path=str(self.path),
             )
 
+        # https://patshaughnessy.net/2017/12/14/manipulating-trees-using-sql-and-the-postgres-ltree-extension
+        descendants.update(
+            path=RawSQL("%s || subpath(path, nlevel(%s))", (str(self.path), str(old_path)))
+        )
+        return None
+
 
 class MirrorItemTask(BaseModel):
     """Model managing a status for a mirroring task."""
@@ -1649,6 +2135,348 @@ class MirrorItemTask(BaseModel):
         return f"Mirror task for item {self.item!s} with status {self.status!s}"
 
 
+class ItemTreeTask(BaseModel):
+    """
+    Operation applied in the background to the descendants of an item, by chunks
+    of ITEM_SUBTREE_CHUNK_SIZE descendants in id order, each in its own short
+    transaction. The item itself is updated synchronously.
+
+    The processed descendants leave the set of the descendants to process, so the
+    operation can be resumed after a failure. Until it is completed, the items of
+    the subtree cannot be moved, deleted or restored. The tasks of an item are
+    processed one after the other, its `subtree_operation` is the kind of the
+    task in progress.
+    """
+
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="tree_tasks",
+    )
+    kind = models.CharField(max_length=20, choices=ItemTreeTaskKindChoices.choices)
+    status = models.CharField(
+        max_length=25,
+        choices=ItemTreeTaskStatusChoices.choices,
+        default=ItemTreeTaskStatusChoices.PENDING,
+    )
+    # Paths of the item before and after a move
+    source_path = models.TextField(null=True, blank=True)
+    target_path = models.TextField(null=True, blank=True)
+    # Deletion date marked on the descendants, or cleared from them
+    ancestors_deleted_at = models.DateTimeField(null=True, blank=True)
+    hard_deleted_at = models.DateTimeField(null=True, blank=True)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    done = models.PositiveIntegerField(default=0)
+    error_details = models.TextField(null=True, blank=True)
+
+    class Meta:
+        db_table = "drive_item_tree_task"
+        verbose_name = _("Item tree task")
+        verbose_name_plural = _("Item tree tasks")
+        indexes = [
+            models.Index(
+                fields=["item"],
+                condition=~models.Q(status=ItemTreeTaskStatusChoices.COMPLETED),
+                name="item_tree_task_unfinished_idx",
+            ),
+            # Matched along the paths of the items while they are moved
+            GistIndex(
+                TextToPath("source_path"),
+                condition=models.Q(kind=ItemTreeTaskKindChoices.MOVE)
+                & ~models.Q(status=ItemTreeTaskStatusChoices.COMPLETED),
+                name="item_tree_task_move_source_idx",
+            ),
+            GistIndex(
+                TextToPath("target_path"),
+                condition=models.Q(kind=ItemTreeTaskKindChoices.MOVE)
+                & ~models.Q(status=ItemTreeTaskStatusChoices.COMPLETED),
+                name="item_tree_task_move_target_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Tree task ({self.kind!s}) for item {self.item_id!s} with status {self.status!s}"
+
+    @property
+    def progress(self):
+        """Percentage of the descendants processed, None until they are counted."""
+        if self.status == ItemTreeTaskStatusChoices.COMPLETED:
+            return 100
+        if self.total is None:
+            return None
+        return min(100, 100 * self.done // self.total) if self.total else 100
+
+    def get_queryset(self):
+        """Return the descendants still to process."""
+        if self.kind == ItemTreeTaskKindChoices.MOVE:
+            return Item.objects.filter(path__descendants=self.source_path)
+
+        descendants = self.item.descendants()
+        if self.kind == ItemTreeTaskKindChoices.SOFT_DELETE:
+            return descendants.filter(ancestors_deleted_at__isnull=True)
+        if self.kind == ItemTreeTaskKindChoices.HARD_DELETE:
+            return descendants.filter(hard_deleted_at__isnull=True)
+        return descendants.filter(
+            deleted_at__isnull=True, ancestors_deleted_at__gte=self.ancestors_deleted_at
+        )
+
+    def apply(self, queryset):
+        """Apply the operation to a chunk of descendants, returns the number of updated rows."""
+        if self.kind == ItemTreeTaskKindChoices.MOVE:
+            return queryset.update(
+                path=RawSQL("%s || subpath(path, nlevel(%s))", (self.target_path, self.source_path))
+            )
+        if self.kind == ItemTreeTaskKindChoices.SOFT_DELETE:
+            return queryset.update(ancestors_deleted_at=self.ancestors_deleted_at)
+        if self.kind == ItemTreeTaskKindChoices.HARD_DELETE:
+            return queryset.update(hard_deleted_at=self.hard_deleted_at)
+        return queryset.update(ancestors_deleted_at=None)
+
+    def get_previous_tasks(self):
+        """Return the unfinished tasks of the item created before this one."""
+        return ItemTreeTask.objects.filter(
+            item_id=self.item_id, created_at__lt=self.created_at
+        ).exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+
+    def get_next_task(self):
+        """Return the next pending task of the item, None if there is none."""
+        return (
+            ItemTreeTask.objects.filter(
+                item_id=self.item_id,
+                created_at__gt=self.created_at,
+                status=ItemTreeTaskStatusChoices.PENDING,
+            )
+            .order_by("created_at")
+            .first()
+        )
+
+    def process_chunk(self, chunk_size, after=None):
+        """
+        Process the first `chunk_size` descendants with an id greater than `after`
+        in a transaction and record the progress. Returns the id of the last
+        processed descendant, None if there was none.
+        """
+        queryset = self.get_queryset().order_by("id")
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+
+        with transaction.atomic():
+            # The task is locked first, a task superseded meanwhile stops here
+            if (
+                not ItemTreeTask.objects.select_for_update()
+                .filter(pk=self.pk)
+                .exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+                .exists()
+            ):
+                self.status = ItemTreeTaskStatusChoices.COMPLETED
+                return None
+
+            ids = list(queryset.values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                return None
+            # The filter of the descendants to process is checked again on the locked rows
+            count = self.apply(self.get_queryset().filter(id__in=ids))
+            ItemTreeTask.objects.filter(pk=self.pk).update(
+                done=models.F("done") + count, updated_at=timezone.now()
+            )
+        self.done += count
+        if self.kind == ItemTreeTaskKindChoices.HARD_DELETE:
+            Item.delete_nb_accesses_generations(ids)
+        return ids[-1]
+
+    def process(self, chunk_size):
+        """
+        Process all the descendants by chunks and mark the operation completed.
+        Returns the next task of the item to process, if any.
+        """
+        if self.total is None:
+            self.total = self.get_queryset().count()
+        # A task superseded by another task of the item is not processed
+        if (
+            not ItemTreeTask.objects.filter(pk=self.pk)
+            .exclude(status=ItemTreeTaskStatusChoices.COMPLETED)
+            .update(
+                status=ItemTreeTaskStatusChoices.PROCESSING,
+                total=self.total,
+                updated_at=timezone.now(),
+            )
+        ):
+            return None
+        self.status = ItemTreeTaskStatusChoices.PROCESSING
+
+        after = None
+        while True:
+            after = self.process_chunk(chunk_size, after)
+            if self.status == ItemTreeTaskStatusChoices.COMPLETED:
+                return None
+            # Descendants may have been added before the cursor meanwhile, start over
+            if after is None and not self.get_queryset().exists():
+                break
+
+        self.status = ItemTreeTaskStatusChoices.COMPLETED
+        self.save(update_fields=["status", "updated_at"])
+
+        if self.kind == ItemTreeTaskKindChoices.HARD_DELETE:
+            # The bulk updates bypass Item.save() invalidating the storage used cache.
+            # All the creators of the subtree are invalidated, in case the task was resumed.
+            invalidate_storage_used_cache(self.item.descendants().get_creator_ids())
+
+        next_task = self.get_next_task()
+        Item.objects.filter(pk=self.item_id).update(
+            subtree_operation=next_task.kind if next_task else None
+        )
+        return next_task
+
+
+class ItemIndexOutbox(models.Model):
+    """
+    Durable queue of the item changes waiting to be pushed to the search indexer.
+    Rows are recorded in the transaction of the change and drained in order.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="index_changes",
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=ItemIndexChangeChoices.choices,
+        default=ItemIndexChangeChoices.ITEM,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    processing_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "drive_item_index_outbox"
+        verbose_name = _("Item index change")
+        verbose_name_plural = _("Item index changes")
+
+    def __str__(self):
+        return f"Index change ({self.kind!s}) of item {self.item_id!s}"
+
+
+class InvitationEmailOutbox(models.Model):
+    """
+    Durable queue of the invitation emails waiting to be sent. Rows are recorded
+    in the transaction of the share, leased by a worker and sent in the background
+    by batches.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name="invitation_emails",
+    )
+    email = models.EmailField(_("email address"))
+    role = models.CharField(max_length=20, choices=RoleChoices.choices)
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="sent_invitation_emails",
+    )
+    language = models.CharField(max_length=10)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    processing_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "drive_invitation_email_outbox"
+        verbose_name = _("Invitation email")
+        verbose_name_plural = _("Invitation emails")
+
+    def __str__(self):
+        return f"Invitation email to {self.email:s} on item {self.item_id!s}"
+
+
+class ItemSearchDocument(models.Model):
+    """
+    Weighted full-text search vector of an item, maintained by the PostgreSQL
+    search indexer.
+    """
+
+    item = models.OneToOneField(
+        Item,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    search_vector = SearchVectorField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "drive_item_search_document"
+        verbose_name = _("Item search document")
+        verbose_name_plural = _("Item search documents")
+        indexes = [
+            GinIndex(fields=["search_vector"], name="item_search_vector_gin_idx"),
+        ]
+
+    def __str__(self):
+        return f"Search document of item {self.item_id!s}"
+
+
+class ItemIndexCheckpoint(models.Model):
+    """
+    Progress of a shard of a reindexation run by the index command, saved after each
+    batch so an interrupted run can be resumed. The checkpoints of a run are deleted
+    once all its shards are indexed.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    run = models.CharField(max_length=100)
+    shard = models.PositiveIntegerField()
+    last_id = models.UUIDField(null=True, blank=True)
+    done = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "drive_item_index_checkpoint"
+        verbose_name = _("Item index checkpoint")
+        verbose_name_plural = _("Item index checkpoints")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run", "shard"],
+                name="unique_item_index_checkpoint_run_shard",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Index checkpoint of shard {self.shard:d} of run {self.run:s}"
+
+
+class ItemExtractedText(models.Model):
+    """
+    Text extracted from the file of an item for its indexation, reused by the
+    indexers as long as the version of the file content and the extractor match.
+    """
+
+    item = models.OneToOneField(
+        Item,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="extracted_text",
+    )
+    # ETag of the file object in the storage
+    content_version = models.CharField(max_length=255)
+    # Name and version of the extractor
+    extractor = models.CharField(max_length=255)
+    text = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "drive_item_extracted_text"
+        verbose_name = _("Item extracted text")
+        verbose_name_plural = _("Item extracted texts")
+
+    def __str__(self):
+        return f"Extracted text of item {self.item_id!s}"
+
+
 class LinkTrace(BaseModel):
     """
     Relation model to trace accesses to an item via a link by a logged-in user.
@@ -1678,6 +2506,38 @@ class LinkTrace(BaseModel):
     def __str__(self):
         return f"{self.user!s} trace on item {self.item!s}"
 
+    def save(self, *args, **kwargs):
+        """Override save to clear the cache of the ids of the items traced for the user."""
+        super().save(*args, **kwargs)
+        self.invalidate_item_ids_cache(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        """Override delete to clear the cache of the ids of the items traced for the user."""
+        super().delete(*args, **kwargs)
+        self.invalidate_item_ids_cache(self.user_id)
+
+    @staticmethod
+    def get_item_ids_cache_key(user_id):
+        """Generate a unique cache key for the items traced for each user."""
+        return f"user_{user_id!s}_link_trace_item_ids"
+
+    @classmethod
+    def get_item_ids(cls, user):
+        """Return the ids of the items traced for a user, cached until a trace changes."""
+        cache_key = cls.get_item_ids_cache_key(user.id)
+        item_ids = cache.get(cache_key)
+
+        if item_ids is None:
+            item_ids = list(cls.objects.filter(user=user).values_list("item_id", flat=True))
+            cache.set(cache_key, item_ids)
+
+        return item_ids
+
+    @classmethod
+    def invalidate_item_ids_cache(cls, *user_ids):
+        """Invalidate the cache of the ids of the items traced for the users."""
+        cache.delete_many([cls.get_item_ids_cache_key(user_id) for user_id in user_ids])
+
 
 class ItemFavorite(BaseModel):
     """Relation model to store a user's favorite items."""
@@ -1713,6 +2573,68 @@ class ItemAccessQuerySet(AnnotateUserRoleQuerySetMixin, models.QuerySet):
 
     path_property = "item__path"
 
+    @staticmethod
+    def _role_priority():
+        """Return an expression computing the priority of the role of an access."""
+        return models.Case(
+            *[
+                models.When(role=role, then=models.Value(RoleChoices.get_priority(role)))
+                for role in RoleChoices.values
+            ],
+            output_field=models.IntegerField(),
+        )
+
+    def annotate_max_ancestors_role(self):
+        """
+        Annotate the accesses with the max role of their target (user or team) on the
+        ancestors of their item and the item of the deepest access giving it, so
+        reading max_ancestors_role does not query the ancestors of each access.
+        """
+        ancestors_accesses = (
+            ItemAccess.objects.filter(
+                models.Q(user=models.OuterRef("user"))
+                | models.Q(team=models.OuterRef("team"), team__gt=""),
+                item_id__in=PathIds(EffectivePath(models.OuterRef("item__path"))),
+                item__ancestors_deleted_at__isnull=True,
+            )
+            .exclude(item=models.OuterRef("item"))
+            .order_by(self._role_priority().desc(), NLevel(EffectivePath("item__path")).desc())
+        )
+
+        return self.annotate(
+            max_ancestors_role=models.Subquery(ancestors_accesses.values("role")[:1]),
+            max_ancestors_role_item_id=models.Subquery(ancestors_accesses.values("item_id")[:1]),
+        )
+
+    def filter_deepest_by_target(self):
+        """
+        Keep only the deepest access of each target (user or team) among the accesses
+        of the queryset, computed in SQL with window functions over the accesses of
+        each target ordered by depth. The accesses are annotated with:
+        - max_ancestors_role_priority: the priority of the max role among the
+          shallower accesses of the target, None if there are none
+        - previous_item_id: the item of the access of the target right above it
+        """
+        target = [models.F("user_id"), models.F("team")]
+        depth = NLevel("item__path")
+
+        return self.annotate(
+            max_ancestors_role_priority=models.Window(
+                models.Max(self._role_priority()),
+                partition_by=target,
+                order_by=depth.asc(),
+                frame=models.RowRange(start=None, end=-1),
+            ),
+            previous_item_id=models.Window(
+                Lag("item_id", output_field=models.UUIDField()),
+                partition_by=target,
+                order_by=depth.asc(),
+            ),
+            target_depth_rank=models.Window(
+                RowNumber(), partition_by=target, order_by=depth.desc()
+            ),
+        ).filter(target_depth_rank=1)
+
 
 class ItemAccessManager(models.Manager.from_queryset(ItemAccessQuerySet)):
     """Manager for ItemAccess model."""
@@ -1847,7 +2769,7 @@ class ItemAccess(BaseModel):
         except AttributeError:
             roles = ItemAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                item__path__ancestors=self.item.path,
+                item_id__in=PathIds(EffectivePath(get_path_value(self.item.path))),
             ).values_list("role", flat=True)
 
         return RoleChoices.max(*roles)
@@ -1980,7 +2902,7 @@ class Invitation(BaseModel):
         except AttributeError:
             roles = ItemAccess.objects.filter(
                 models.Q(user=user) | models.Q(team__in=user.teams),
-                item__path__ancestors=self.item.path,
+                item_id__in=PathIds(EffectivePath(get_path_value(self.item.path))),
             ).values_list("role", flat=True)
 
         return RoleChoices.max(*roles)
@@ -5,6 +5,8 @@ from django.db import transaction
 from django.db.models.functions import Lower
 
 from core import models
+from core.services.search_cache import invalidate_user_search_results
+from core.tasks.search import record_index_change
 
 
 def batch_share_process_rows(item, issuer, rows):
@@ -48,49 +50,63 @@ def batch_share_process_rows(item, issuer, rows):
 
     skipped = []
     created_accesses = []
-    created_invitations = []
+    accesses = []
+    invitations = []
+    for email, role in rows.items():
+        if user := users_by_email.get(email):
+            max_ancestors_role = max_role_by_user_id.get(user.id)
+            if user.id in users_with_explicit_access or models.RoleChoices.get_priority(
+                max_ancestors_role
+            ) >= models.RoleChoices.get_priority(role):
+                skipped.append({"email": email, "reason": "already_shared"})
+                continue
+            accesses.append(models.ItemAccess(item=item, user=user, role=role))
+            created_accesses.append((email, role))
+        elif email in already_invited:
+            skipped.append({"email": email, "reason": "already_invited"})
+        else:
+            invitations.append(models.Invitation(item=item, email=email, role=role, issuer=issuer))
+
+    # The rows were validated above: the accesses and invitations are created in
+    # bulk, without the per instance validation and side effects of their save.
     with transaction.atomic():
-        for email, role in rows.items():
-            if user := users_by_email.get(email):
-                max_ancestors_role = max_role_by_user_id.get(user.id)
-                if user.id in users_with_explicit_access or models.RoleChoices.get_priority(
-                    max_ancestors_role
-                ) >= models.RoleChoices.get_priority(role):
-                    skipped.append({"email": email, "reason": "already_shared"})
-                    continue
-                access = models.ItemAccess.objects.create(item=item, user=user, role=role)
-                synchronize_descendants_accesses(item, access)
-                created_accesses.append((email, role))
-            elif email in already_invited:
-                skipped.append({"email": email, "reason": "already_invited"})
-            else:
-                models.Invitation.objects.create(item=item, email=email, role=role, issuer=issuer)
-                created_invitations.append((email, role))
+        models.ItemAccess.objects.bulk_create(accesses)
+        models.Invitation.objects.bulk_create(invitations)
+        synchronize_descendants_accesses(item, *accesses)
+        if accesses:
+            record_index_change(item, models.ItemIndexChangeChoices.SUBTREE)
+            invalidate_user_search_results(*(access.user_id for access in accesses))
+            item.invalidate_nb_accesses_cache()
 
+    created_invitations = [(invitation.email, invitation.role) for invitation in invitations]
     return created_accesses, created_invitations, skipped
 
 
-def synchronize_descendants_accesses(item, access):
+def synchronize_descendants_accesses(item, *accesses):
     """
     Syncronize the accesses of the descendants of the item
-    by removing accesses with roles lower than the current user's role.
+    by removing accesses with roles lower than the roles of the given accesses,
+    in a single query.
     """
-    descendants = item.descendants().filter(ancestors_deleted_at__isnull=True)
-
     condition_filter = db.Q()
-    if access.user:
-        condition_filter |= db.Q(user=access.user)
-    if access.team:
-        condition_filter |= db.Q(team=access.team)
-
-    role_priority = models.RoleChoices.get_priority(access.role)
-
-    lower_roles = [
-        role
-        for role in models.RoleChoices.values
-        if models.RoleChoices.get_priority(role) <= role_priority
-    ]
-
-    models.ItemAccess.objects.filter(
-        condition_filter, item__in=descendants, role__in=lower_roles
-    ).delete()
+    for access in accesses:
+        role_priority = models.RoleChoices.get_priority(access.role)
+        lower_roles = [
+            role
+            for role in models.RoleChoices.values
+            if models.RoleChoices.get_priority(role) <= role_priority
+        ]
+
+        actor_filter = db.Q()
+        if access.user:
+            actor_filter |= db.Q(user=access.user)
+        if access.team:
+            actor_filter |= db.Q(team=access.team)
+
+        condition_filter |= actor_filter & db.Q(role__in=lower_roles)
+
+    if not condition_filter:
+        return
+
+    descendants = item.descendants().filter(ancestors_deleted_at__isnull=True)
+    models.ItemAccess.objects.filter(condition_filter, item__in=descendants).delete()
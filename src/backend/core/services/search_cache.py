@@ -0,0 +1,108 @@
+"""Short-lived per-user cache of the results of the title search"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+SEARCH_CACHE_PREFIX = "search_results"
+
+
+def get_search_version_key(user_id):
+    """Cache key of the version of the search results of a user."""
+    return f"{SEARCH_CACHE_PREFIX}:{user_id!s}:version"
+
+
+def invalidate_user_search_results(*user_ids):
+    """
+    Invalidate the cached search results of the users: their keys embed a version
+    which is renewed.
+    """
+    cache.delete_many([get_search_version_key(user_id) for user_id in user_ids if user_id])
+
+
+class SearchResultsCache:
+    """
+    Cache the ordered ids of the items matching a title search of a user for
+    SEARCH_RESULTS_CACHE_TIMEOUT seconds.
+
+    The entries are keyed by the user, the version of their search results, the
+    other filters and the searched text. An entry is complete when it holds all the
+    matching items, at most SEARCH_RESULTS_CACHE_MAX_SIZE.
+
+    While typing, the text of a search extends the text of the previous one: the
+    results of the longer text are among the complete results of the longest cached
+    prefix. They are matched and ranked by `rank` in the database, which normalizes
+    the titles and the text with the same functions as the search.
+
+    Args:
+        user (User): The user searching.
+        filters (dict): The other filters of the search.
+        rank (callable): Called with the searched text and the ids of the results of
+            a prefix, returns the ids of those matching the text, ranked for the text.
+    """
+
+    def __init__(self, user, filters, rank):
+        self.user = user
+        self.filters = json.dumps(filters, sort_keys=True, default=str)
+        self.rank = rank
+        self.timeout = settings.SEARCH_RESULTS_CACHE_TIMEOUT
+        self.max_size = settings.SEARCH_RESULTS_CACHE_MAX_SIZE
+        # Prefixes can only be refined when all the results contain the searched text
+        self.can_refine = not settings.SEARCH_TITLE_MIN_SIMILARITY
+        self._version = None
+
+    @property
+    def version(self):
+        """Version of the search results of the user, renewed on invalidation."""
+        if self._version is None:
+            self._version = cache.get_or_set(
+                get_search_version_key(self.user.id), uuid.uuid4().hex, timeout=None
+            )
+        return self._version
+
+    def get_key(self, text):
+        """Cache key of the results of a search."""
+        digest = hashlib.sha256(f"{self.filters}\n{text}".encode()).hexdigest()
+        return f"{SEARCH_CACHE_PREFIX}:{self.user.id!s}:{self.version}:{digest}"
+
+    def get(self, text):
+        """
+        Return the cached entry of a search, {"complete": bool, "results": list}, or
+        None if the search is unknown. The entry of a longer text refined from a
+        prefix is cached as well.
+        """
+        prefixes = (
+            [text[:length] for length in range(len(text), 0, -1)] if self.can_refine else [text]
+        )
+        keys = {prefix: self.get_key(prefix) for prefix in prefixes}
+        entries = cache.get_many(keys.values())
+
+        if (entry := entries.get(keys[text])) is not None:
+            return entry
+
+        for prefix in prefixes[1:]:
+            entry = entries.get(keys[prefix])
+            if entry is not None and entry["complete"]:
+                return self.refine(text, entry["results"])
+
+        return None
+
+    def refine(self, text, results):
+        """Cache and return the results of a search among the results of a prefix."""
+        entry = {"complete": True, "results": self.rank(text, results) if results else []}
+        cache.set(self.get_key(text), entry, timeout=self.timeout)
+        return entry
+
+    def set(self, text, results):
+        """
+        Cache the ids of the results of a search, holding at most one result more
+        than SEARCH_RESULTS_CACHE_MAX_SIZE. Only the completeness of the results is
+        kept when there are more.
+        """
+        complete = len(results) <= self.max_size
+        entry = {"complete": complete, "results": results if complete else []}
+        cache.set(self.get_key(text), entry, timeout=self.timeout)
+        return entry
@@ -1,25 +1,49 @@
 """Document search index management utilities and indexers"""
 
+import gzip
+import json
 import logging
+import random
+import subprocess
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import cache
+from pathlib import Path
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache as django_cache
 from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
 from django.core.files.storage import default_storage
-from django.db.models import Subquery
+from django.db import connection
+from django.db.models import Count, F, Func, Q, Value
 from django.utils.module_loading import import_string
 
 import requests
 
 from core import models
+from core.services.text_extractors import get_text_extractor
 
 logger = logging.getLogger(__name__)
 
+# Directory of the Django project, from which the isolated extractors are imported
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 SERVICE_NAME = "drive"
 
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+PUSH_METRICS_PREFIX = "search_indexer:push"
+PUSH_COUNTER = f"{PUSH_METRICS_PREFIX}:count"
+PUSH_BYTES_COUNTER = f"{PUSH_METRICS_PREFIX}:bytes"
+PUSH_LATENCY_COUNTER = f"{PUSH_METRICS_PREFIX}:latency_ms"
+PUSH_ERRORS_COUNTER = f"{PUSH_METRICS_PREFIX}:errors"
+PUSH_RETRIES_COUNTER = f"{PUSH_METRICS_PREFIX}:retries"
+
 
 @cache
 def get_file_indexer():
@@ -92,31 +116,135 @@ def get_batch_accesses_by_users_and_teams(items):
     return dict(access_by_document_path)
 
 
+def get_batch_numchild(items):
+    """
+    Count the direct children of a list of items in a single grouped query.
+
+    Returns:
+        dict[str, int]: Mapping from item path to its number of children.
+    """
+    children_filter = Q()
+    for item in items:
+        # Each descendants condition is matched on the GiST index of the path
+        children_filter |= Q(path__descendants=item.path, path__depth=len(item.path) + 1)
+    if not children_filter:
+        return {}
+
+    children_qs = (
+        models.Item.objects.filter(children_filter)
+        .annotate(parent_path=models.ParentPath("path"))
+        .order_by()
+        .values("parent_path")
+        .annotate(count=Count("pk"))
+        .values_list("parent_path", "count")
+    )
+
+    return {str(path): count for path, count in children_qs}
+
+
+def _incr_counter(key, delta=1):
+    """Increment a push metrics counter, creating it if missing."""
+    django_cache.add(key, 0, timeout=None)
+    try:
+        django_cache.incr(key, delta)
+    except ValueError:
+        django_cache.add(key, delta, timeout=None)
+
+
+def record_push_metrics(nb_bytes, latency, error=False):
+    """Record the bytes sent and the latency of a push to the search backend."""
+    _incr_counter(PUSH_COUNTER)
+    _incr_counter(PUSH_BYTES_COUNTER, nb_bytes)
+    _incr_counter(PUSH_LATENCY_COUNTER, round(latency * 1000))
+    if error:
+        _incr_counter(PUSH_ERRORS_COUNTER)
+
+
+def record_push_retry():
+    """Record a retried push to the search backend."""
+    _incr_counter(PUSH_RETRIES_COUNTER)
+
+
+def get_push_stats():
+    """
+    Return the metrics of the pushes to the search backend:
+    - pushes: number of requests sent, retries excluded
+    - bytes_sent: number of bytes sent (compressed if enabled)
+    - errors: number of pushes failed after their retries
+    - retries: number of retried requests
+    - latency_ms: mean latency of a push in milliseconds
+    """
+    counters = django_cache.get_many(
+        [
+            PUSH_COUNTER,
+            PUSH_BYTES_COUNTER,
+            PUSH_LATENCY_COUNTER,
+            PUSH_ERRORS_COUNTER,
+            PUSH_RETRIES_COUNTER,
+        ]
+    )
+    pushes = counters.get(PUSH_COUNTER, 0)
+
+    return {
+        "pushes": pushes,
+        "bytes_sent": counters.get(PUSH_BYTES_COUNTER, 0),
+        "errors": counters.get(PUSH_ERRORS_COUNTER, 0),
+        "retries": counters.get(PUSH_RETRIES_COUNTER, 0),
+        "latency_ms": counters.get(PUSH_LATENCY_COUNTER, 0) / pushes if pushes else None,
+    }
+
+
 def get_visited_items_ids_of(queryset, user):
     """
     Returns the ids of the documents that have a linktrace to the user and NOT owned.
     It will be use to limit the opensearch responses to the public documents already
     "visited" by the user.
+
+    The ids of the items traced for the user are cached, see LinkTrace.get_item_ids.
     """
     if isinstance(user, AnonymousUser):
         return []
 
-    qs = models.LinkTrace.objects.filter(user=user)
+    traced_ids = models.LinkTrace.get_item_ids(user)
+    if not traced_ids:
+        return []
 
-    docs = (
-        queryset.exclude(accesses__user=user)
-        .filter(
-            deleted_at__isnull=True,
-            ancestors_deleted_at__isnull=True,
-        )
-        .filter(pk__in=Subquery(qs.values("item_id")))
-        .order_by("pk")
-        .distinct("pk")
+    docs = queryset.exclude(accesses__user=user).filter(
+        pk__in=traced_ids,
+        deleted_at__isnull=True,
+        ancestors_deleted_at__isnull=True,
     )
 
     return [str(id) for id in docs.values_list("pk", flat=True)]
 
 
+class SearchResults:
+    """
+    Sequence of the ids of the items matching a search, by relevance, for the
+    paginators: only the windows sliced by the paginator are fetched.
+
+    Args:
+        fetch (callable): Called with an offset and a limit, returns the ids.
+        count (callable): Returns the number of results, called at most once.
+    """
+
+    def __init__(self, fetch, count):
+        self._fetch = fetch
+        self._count = count
+        self._total = None
+
+    def __len__(self):
+        if self._total is None:
+            self._total = self._count()
+        return self._total
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("Search results only support slicing")
+        start, stop, _step = index.indices(len(self))
+        return self._fetch(start, stop - start) if stop > start else []
+
+
 def match_mimetype_glob(mimetype, pattern):
     """
     Returns true if the mimetype match with the pattern.
@@ -149,26 +277,23 @@ class BaseItemIndexer(ABC):
     `serialize_item()` and `push()` to define backend-specific behavior.
     """
 
+    # The search is authenticated on a remote service with the OIDC token of the user
+    requires_oidc_token = True
+
     def __init__(self):
         """
         Initialize the indexer.
         """
         self.batch_size = settings.SEARCH_INDEXER_BATCH_SIZE
         self.max_content_size = settings.SEARCH_INDEXER_CONTENT_MAX_SIZE
-        self.indexer_url = settings.SEARCH_INDEXER_URL
-        self.indexer_secret = settings.SEARCH_INDEXER_SECRET
-        self.search_url = settings.SEARCH_INDEXER_QUERY_URL
         self.search_limit = settings.SEARCH_INDEXER_QUERY_LIMIT
         self.allowed_mimetypes = settings.SEARCH_INDEXER_ALLOWED_MIMETYPES
-
-        if not self.indexer_url:
-            raise ImproperlyConfigured("SEARCH_INDEXER_URL must be set in Django settings.")
-
-        if not self.indexer_secret:
-            raise ImproperlyConfigured("SEARCH_INDEXER_SECRET must be set in Django settings.")
-
-        if not self.search_url:
-            raise ImproperlyConfigured("SEARCH_INDEXER_QUERY_URL must be set in Django settings.")
+        self.content_workers = settings.SEARCH_INDEXER_CONTENT_WORKERS
+        self.text_cache = settings.SEARCH_INDEXER_TEXT_CACHE
+        self.extractor_workers = settings.SEARCH_INDEXER_EXTRACTOR_WORKERS
+        self.extractor_timeout = settings.SEARCH_INDEXER_EXTRACTOR_TIMEOUT
+        self.extractor_memory_limit = settings.SEARCH_INDEXER_EXTRACTOR_MEMORY_LIMIT
+        self.extraction_slots = threading.BoundedSemaphore(self.extractor_workers)
 
         if not self.allowed_mimetypes:
             raise ImproperlyConfigured(
@@ -180,7 +305,7 @@ class BaseItemIndexer(ABC):
                 "SEARCH_INDEXER_ALLOWED_MIMETYPES Django setting must be a list."
             )
 
-    def index(self, queryset=None, batch_size=None):
+    def index(self, queryset=None, batch_size=None, start_after=None, callback=None):
         """
         Fetch documents in batches, serialize them, and push to the search backend.
 
@@ -189,13 +314,18 @@ class BaseItemIndexer(ABC):
                 Defaults to all documents without the main workspaces.
             batch_size (int, optional): Number of documents per batch.
                 Defaults to settings.SEARCH_INDEXER_BATCH_SIZE.
+            start_after (UUID, optional): Only index the documents with a greater id,
+                to resume an indexation.
+            callback (callable, optional): Called with the number of documents and the
+                last id of each batch once pushed.
         """
-        last_id = None
+        last_id = start_after
         count = 0
         batch_size = batch_size or self.batch_size
-        queryset = queryset or models.Item.objects.filter(
-            main_workspace=False,
-        )
+        if queryset is None:
+            queryset = models.Item.objects.filter(
+                main_workspace=False,
+            )
         queryset = queryset.order_by("id")
 
         while True:
@@ -210,15 +340,186 @@ class BaseItemIndexer(ABC):
             last_id = items_batch[-1].id
             accesses_by_item_path = get_batch_accesses_by_users_and_teams(items_batch)
 
-            serialized_batch = [
-                self.serialize_item(item, accesses_by_item_path) for item in items_batch
-            ]
+            serialized_batch = self.serialize_batch(items_batch, accesses_by_item_path)
 
             self.push(serialized_batch)
             count += len(serialized_batch)
 
+            if callback:
+                callback(len(serialized_batch), last_id)
+
         return count
 
+    def to_text(self, item):
+        """
+        Convert a file content into an indexable text with the extractor supporting
+        its mimetype, reading at most SEARCH_INDEXER_CONTENT_MAX_SIZE bytes.
+
+        The isolated extractors are run in a dedicated process, with time and memory
+        limits.
+        """
+        extractor = get_text_extractor(item.mimetype)
+
+        if extractor is None:
+            raise SuspiciousFileOperation(f"Unrecognized mimetype {item.mimetype}")
+
+        with default_storage.open(item.file_key, "rb") as fd:
+            if not extractor.isolated:
+                return extractor.extract(fd, self.max_content_size)
+            data = fd.read(self.max_content_size)
+
+        return self.extract_isolated(item, extractor, data)
+
+    def extract_isolated(self, item, extractor, data):
+        """
+        Extract the text of a file in a new Python process, at most
+        SEARCH_INDEXER_EXTRACTOR_WORKERS at a time. A file failing to be parsed within
+        the time and memory limits is indexed without content, the process is killed
+        when it times out.
+
+        A subprocess is used rather than a multiprocessing pool: Celery prefork workers
+        are daemonic and can not have children of their own.
+        """
+        extractor_class = extractor.__class__
+        command = [
+            sys.executable,
+            "-m",
+            "core.services.text_extractors",
+            f"{extractor_class.__module__}.{extractor_class.__qualname__}",
+            str(self.max_content_size),
+            str(self.extractor_memory_limit),
+        ]
+        with self.extraction_slots:
+            try:
+                result = subprocess.run(  # noqa: S603
+                    command,
+                    input=data,
+                    capture_output=True,
+                    timeout=self.extractor_timeout,
+                    check=True,
+                    cwd=BACKEND_DIR,
+                )
+            except subprocess.TimeoutExpired:
+                logger.warning(
+                    "Text extraction of item %s timed out after %ss",
+                    item.id,
+                    self.extractor_timeout,
+                )
+                return ""
+            except subprocess.CalledProcessError as error:
+                logger.error(
+                    "Text extraction of item %s failed: %s",
+                    item.id,
+                    error.stderr.decode("utf-8", "replace")[-1000:],
+                )
+                return ""
+
+        return result.stdout.decode("utf-8")
+
+    def get_content_version(self, item):
+        """Return the ETag of the file of an item, identifying the version of its content."""
+        head = default_storage.connection.meta.client.head_object(
+            Bucket=default_storage.bucket_name, Key=item.file_key
+        )
+        return head["ETag"]
+
+    def get_content(self, item, cached):
+        """
+        Return the text of an item and the extracted text to save in the cache, None
+        if the cached text is reused or the cache is disabled.
+
+        A file failing to be read or converted is indexed without content, so it does
+        not prevent the indexation of the other items of the batch.
+        """
+        extractor = get_text_extractor(item.mimetype)
+
+        try:
+            if not self.text_cache:
+                return self.to_text(item), None
+
+            version = self.get_content_version(item)
+            if (
+                cached is not None
+                and cached.content_version == version
+                and cached.extractor == extractor.name
+            ):
+                return cached.text, None
+
+            text = self.to_text(item)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Unable to get the content of item %s", item.id)
+            return "", None
+
+        return text, models.ItemExtractedText(
+            item=item, content_version=version, extractor=extractor.name, text=text
+        )
+
+    def get_contents(self, items):
+        """
+        Download and convert the contents of the eligible items of a batch with
+        a pool of SEARCH_INDEXER_CONTENT_WORKERS threads.
+
+        With SEARCH_INDEXER_TEXT_CACHE, the texts are saved with the version of the
+        file contents and reused while the files are unchanged: a reindexation then
+        only requests the metadata of the files from the storage.
+
+        Returns:
+            dict[str, str]: Mapping from item id to its indexable text.
+        """
+        eligible_items = [item for item in items if self.can_serialize_content(item)]
+        if not eligible_items:
+            return {}
+
+        cached_texts = (
+            models.ItemExtractedText.objects.in_bulk([item.id for item in eligible_items])
+            if self.text_cache
+            else {}
+        )
+        with ThreadPoolExecutor(max_workers=self.content_workers) as executor:
+            results = list(
+                executor.map(
+                    lambda item: self.get_content(item, cached_texts.get(item.id)),
+                    eligible_items,
+                )
+            )
+
+        extracted_texts = [extracted for _text, extracted in results if extracted is not None]
+        if extracted_texts:
+            models.ItemExtractedText.objects.bulk_create(
+                extracted_texts,
+                update_conflicts=True,
+                unique_fields=["item"],
+                update_fields=["content_version", "extractor", "text", "updated_at"],
+            )
+
+        return {
+            str(item.id): text
+            for item, (text, _extracted) in zip(eligible_items, results, strict=True)
+        }
+
+    def can_serialize_content(self, item):
+        """
+        Return True if the file mimetype can be converted into text for indexation
+        """
+        mimetype = item.mimetype or ""
+        filesize = item.size or 0
+
+        return (
+            item.upload_state == models.ItemUploadStateChoices.READY
+            and item.type == models.ItemTypeChoices.FILE
+            and filesize < self.max_content_size
+            and is_allowed_mimetype(mimetype, self.allowed_mimetypes)
+            and get_text_extractor(mimetype) is not None
+        )
+
+    def serialize_batch(self, items, accesses) -> list:
+        """
+        Convert a batch of Item instances to a JSON-serializable format for indexing.
+
+        Subclasses may override it to load the data of the whole batch at once.
+        """
+        return [self.serialize_item(item, accesses) for item in items]
+
     @abstractmethod
     def serialize_item(self, item, accesses) -> dict:
         """
@@ -235,9 +536,51 @@ class BaseItemIndexer(ABC):
         Must be implemented by subclasses.
         """
 
+    def search_ids(self, text, token, queryset, user):
+        """
+        Return the ids of the items of the queryset matching the text, by relevance.
+
+        Args:
+            text (str): Text search content.
+            token (str): OIDC Authentication token.
+            queryset (QuerySet): The items the user can access.
+            user (User): The user searching.
+        """
+        return [
+            result["_id"]
+            for result in self.search(
+                text=text, token=token, visited=get_visited_items_ids_of(queryset, user)
+            )
+        ]
+
+    def search_results(self, text, token, queryset, user):
+        """
+        Return the lazy sequence of the ids of the items of the queryset matching the
+        text, by relevance, to paginate them before loading the items.
+
+        The search backend does not know the queryset: its results are requested
+        once and those outside of the queryset are dropped with a single query on
+        their ids.
+
+        The offset and the size of the page are not passed to the backend: counting
+        the results in the queryset needs all of them, so every page requests up to
+        SEARCH_INDEXER_QUERY_LIMIT results. Indexers able to filter on the queryset
+        override this method to fetch the page alone.
+        """
+        result_ids = self.search_ids(text=text, token=token, queryset=queryset, user=user)
+        allowed_ids = {
+            str(pk) for pk in queryset.filter(pk__in=result_ids).values_list("pk", flat=True)
+        }
+        result_ids = [id for id in result_ids if id in allowed_ids]
+
+        return SearchResults(
+            fetch=lambda offset, limit: result_ids[offset : offset + limit],
+            count=lambda: len(result_ids),
+        )
+
     # pylint: disable-next=too-many-arguments,too-many-positional-arguments
     @abstractmethod
-    def search(self, text, token, visited=(), nb_results=None) -> dict:
+    def search(self, text, token, visited=(), nb_results=None, offset=0) -> dict:
         """
         Search for documents in Find app.
         Ensure the same default ordering as "Docs" list : -updated_at
@@ -253,6 +596,7 @@ class BaseItemIndexer(ABC):
             nb_results (int, optional):
                 The number of results to return per page.
                 Defaults to settings.SEARCH_INDEXER_QUERY_LIMIT.
+            offset (int, optional): The number of results to skip.
 
         Must be implemented by subclasses.
         """
@@ -263,45 +607,64 @@ class SearchIndexer(BaseItemIndexer):
     File indexer that pushes text content from files to La Suite Find app.
     """
 
-    def to_text(self, item):
+    def __init__(self):
         """
-        Convert a file content into an indexable text.
+        Initialize the indexer and check the Find app settings.
         """
-        mimetype = item.mimetype or ""
+        super().__init__()
+        self.indexer_url = settings.SEARCH_INDEXER_URL
+        self.indexer_secret = settings.SEARCH_INDEXER_SECRET
+        self.search_url = settings.SEARCH_INDEXER_QUERY_URL
 
-        if mimetype.startswith("text/"):
-            with default_storage.open(item.file_key, "rb") as fd:
-                return fd.read().decode()
+        if not self.indexer_url:
+            raise ImproperlyConfigured("SEARCH_INDEXER_URL must be set in Django settings.")
 
-        raise SuspiciousFileOperation(f"Unrecognized mimetype {mimetype}")
+        if not self.indexer_secret:
+            raise ImproperlyConfigured("SEARCH_INDEXER_SECRET must be set in Django settings.")
 
-    def can_serialize_content(self, item):
+        if not self.search_url:
+            raise ImproperlyConfigured("SEARCH_INDEXER_QUERY_URL must be set in Django settings.")
+
+        self.push_max_bytes = settings.SEARCH_INDEXER_PUSH_MAX_BYTES
+        self.push_concurrency = settings.SEARCH_INDEXER_PUSH_CONCURRENCY
+        self.push_gzip = settings.SEARCH_INDEXER_PUSH_GZIP
+        self.push_retries = settings.SEARCH_INDEXER_PUSH_RETRIES
+        self.push_retry_backoff = settings.SEARCH_INDEXER_PUSH_RETRY_BACKOFF
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def serialize_batch(self, items, accesses):
         """
-        Return True if the file mimetype can be converted into text for indexation
+        Convert a batch of items with a single query for the children counts
+        and concurrent downloads of the contents.
         """
-        mimetype = item.mimetype or ""
-        filesize = item.size or 0
-
-        return (
-            item.upload_state == models.ItemUploadStateChoices.READY
-            and item.type == models.ItemTypeChoices.FILE
-            and filesize < self.max_content_size
-            and is_allowed_mimetype(mimetype, self.allowed_mimetypes)
-        )
+        numchild_by_path = get_batch_numchild(items)
+        contents = self.get_contents(items)
+
+        return [
+            self.serialize_item(
+                item,
+                accesses,
+                numchild=numchild_by_path.get(str(item.path), 0),
+                content=contents.get(str(item.id), ""),
+            )
+            for item in items
+        ]
 
-    def serialize_item(self, item, accesses):
+    def serialize_item(self, item, accesses, numchild=None, content=None):
         """
         Convert a Document to the JSON format expected by La Suite Find.
 
         Args:
             document (Document): The document instance.
             accesses (dict): Mapping of document ID to user/team access.
+            numchild (int, optional): Precomputed number of children.
+            content (str, optional): Precomputed indexable text.
 
         Returns:
             dict: A JSON-serializable dictionary.
         """
         doc_path = str(item.path)
-        content = ""
 
         # The deleted items are still accessible in Drive (not in Docs !)
         # See in V2 for handling hard deleted ones
@@ -309,8 +672,13 @@ class SearchIndexer(BaseItemIndexer):
 
         # There is no endpoint in Find API for inactive items so we index it
         # again with an empty content.
-        if is_active and self.can_serialize_content(item):
-            content = self.to_text(item)
+        if content is None:
+            content = ""
+            if is_active and self.can_serialize_content(item):
+                content = self.to_text(item)
+
+        if numchild is None:
+            numchild = item.children().count()
 
         return {
             "id": str(item.id),
@@ -320,7 +688,7 @@ class SearchIndexer(BaseItemIndexer):
             "content": content,
             "depth": item.depth,
             "path": str(item.path),
-            "numchild": item.children().count(),
+            "numchild": numchild,
             "created_at": item.created_at.isoformat(),
             "updated_at": item.updated_at.isoformat(),
             "users": list(accesses.get(doc_path, {}).get("users", set())),
@@ -331,7 +699,7 @@ class SearchIndexer(BaseItemIndexer):
         }
 
     # pylint: disable-next=too-many-arguments,too-many-positional-arguments
-    def search(self, text, token, visited=(), nb_results=None):
+    def search(self, text, token, visited=(), nb_results=None, offset=0):
         """
         Search for documents in Find app.
         Ensure the same default ordering as "Docs" list : -updated_at
@@ -347,37 +715,264 @@ class SearchIndexer(BaseItemIndexer):
             nb_results (int, optional):
                 The number of results to return per page.
                 Defaults to settings.SEARCH_INDEXER_QUERY_LIMIT.
+            offset (int, optional): The number of results to skip. Find has no
+                offset: the first `offset + nb_results` results are requested.
 
         Returns:
             dict: A JSON-serializable dictionary.
         """
         nb_results = nb_results or self.search_limit
-        response = requests.post(
+        response = self.session.post(
             self.search_url,
             json={
                 "q": text,
                 "visited": visited,
                 "services": [SERVICE_NAME],
-                "nb_results": nb_results,
+                "nb_results": offset + nb_results,
             },
             headers={"Authorization": f"Bearer {token}"},
             timeout=10,
         )
 
         response.raise_for_status()
-        return response.json()
+        return response.json()[offset:] if offset else response.json()
+
+    @property
+    def session(self):
+        """
+        HTTP session shared by the requests to the Find app, keeping alive a pool of
+        connections. Created lazily, so forked processes do not share sockets.
+        """
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=max(self.push_concurrency, 10)
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+        return self._session
+
+    def split_payloads(self, data):
+        """
+        Serialize the documents into JSON arrays of at most SEARCH_INDEXER_PUSH_MAX_BYTES
+        bytes. A document bigger than the limit is sent alone.
+        """
+        chunk = []
+        chunk_size = 2  # brackets of the array
+
+        for document in data:
+            encoded = json.dumps(document, separators=(",", ":")).encode()
+            if chunk and chunk_size + len(encoded) + 1 > self.push_max_bytes:
+                yield b"[" + b",".join(chunk) + b"]"
+                chunk = []
+                chunk_size = 2
+            chunk.append(encoded)
+            chunk_size += len(encoded) + 1
+
+        if chunk:
+            yield b"[" + b",".join(chunk) + b"]"
+
+    def push_payload(self, payload):
+        """
+        Send a JSON payload to the Find backend, gzipped if SEARCH_INDEXER_PUSH_GZIP
+        is set. Connection errors, timeouts and 429/5xx responses are retried with
+        an exponential backoff and full jitter.
+        """
+        headers = {
+            "Authorization": f"Bearer {self.indexer_secret}",
+            "Content-Type": "application/json",
+        }
+        if self.push_gzip:
+            payload = gzip.compress(payload)
+            headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(self.push_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.indexer_url, data=payload, headers=headers, timeout=10
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.push_retries:
+                    record_push_metrics(len(payload), time.perf_counter() - start, error=True)
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or (
+                    attempt == self.push_retries
+                ):
+                    record_push_metrics(
+                        len(payload), time.perf_counter() - start, error=not response.ok
+                    )
+                    response.raise_for_status()
+                    return
+
+            delay = random.uniform(0, self.push_retry_backoff * 2**attempt)  # noqa: S311
+            logger.warning("Retry push to the search indexer in %.2f seconds", delay)
+            record_push_retry()
+            time.sleep(delay)
 
     def push(self, data):
         """
-        Push a batch of documents to the Find backend.
+        Push a batch of documents to the Find backend, split in payloads bounded in
+        bytes and sent by SEARCH_INDEXER_PUSH_CONCURRENCY concurrent requests. No more
+        payloads than concurrent requests are built ahead of their sending.
 
         Args:
             data (list): List of document dictionaries.
         """
-        response = requests.post(
-            self.indexer_url,
-            json=data,
-            headers={"Authorization": f"Bearer {self.indexer_secret}"},
-            timeout=10,
+        with ThreadPoolExecutor(max_workers=self.push_concurrency) as executor:
+            pending = set()
+            try:
+                for payload in self.split_payloads(data):
+                    if len(pending) >= self.push_concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    pending.add(executor.submit(self.push_payload, payload))
+
+                for future in pending:
+                    future.result()
+            except Exception:
+                for future in pending:
+                    future.cancel()
+                raise
+
+
+class PostgresSearchIndexer(BaseItemIndexer):
+    """
+    File indexer storing a weighted full-text search vector of the title (A),
+    description (B) and text content (C) of the items in PostgreSQL.
+    """
+
+    requires_oidc_token = False
+    upsert_sql = """
+        INSERT INTO drive_item_search_document (item_id, search_vector, updated_at)
+        VALUES (
+            %(id)s,
+            setweight(to_tsvector(%(config)s::regconfig, unaccent(%(title)s)), 'A')
+            || setweight(to_tsvector(%(config)s::regconfig, unaccent(%(description)s)), 'B')
+            || setweight(to_tsvector(%(config)s::regconfig, unaccent(%(content)s)), 'C'),
+            now()
         )
-        response.raise_for_status()
+        ON CONFLICT (item_id) DO UPDATE
+        SET search_vector = EXCLUDED.search_vector, updated_at = EXCLUDED.updated_at
+    """
+
+    def __init__(self):
+        """
+        Initialize the indexer.
+        """
+        super().__init__()
+        self.search_config = settings.SEARCH_INDEXER_POSTGRES_CONFIG
+
+    def serialize_batch(self, items, accesses):
+        """
+        Convert a batch of items with concurrent downloads of the contents.
+        """
+        contents = self.get_contents(items)
+
+        return [
+            self.serialize_item(item, accesses, content=contents.get(str(item.id), ""))
+            for item in items
+        ]
+
+    def serialize_item(self, item, accesses, content=None):
+        """
+        Convert an item to the texts of its search vector. The accesses are not
+        indexed, the search is run on the items the user can access.
+        """
+        if content is None:
+            content = self.to_text(item) if self.can_serialize_content(item) else ""
+
+        return {
+            "id": str(item.id),
+            "title": item.title or "",
+            "description": item.description or "",
+            "content": content,
+        }
+
+    def push(self, data):
+        """
+        Insert or update the search vectors of a batch of items.
+
+        Args:
+            data (list): List of item dictionaries.
+        """
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                self.upsert_sql, [{**document, "config": self.search_config} for document in data]
+            )
+
+    def get_search_queryset(self, text, queryset=None):
+        """
+        Return the search documents matching the text, ranked by relevance.
+        """
+        query = SearchQuery(
+            Func(Value(text), function="unaccent"),
+            config=self.search_config,
+            search_type="websearch",
+        )
+        search_queryset = models.ItemSearchDocument.objects.filter(search_vector=query)
+
+        if queryset is not None:
+            search_queryset = search_queryset.filter(item_id__in=queryset.values("pk"))
+
+        return search_queryset.annotate(rank=SearchRank(F("search_vector"), query)).order_by(
+            "-rank", "item_id"
+        )
+
+    def search_ids(self, text, token, queryset, user):
+        """
+        Return the ids of the items of the queryset matching the text, by relevance.
+        The search is restricted to the queryset in the database.
+        """
+        return [
+            str(item_id)
+            for item_id in self.get_search_queryset(text, queryset).values_list(
+                "item_id", flat=True
+            )[: self.search_limit]
+        ]
+
+    def search_results(self, text, token, queryset, user):
+        """
+        Return the lazy sequence of the ids of the items of the queryset matching the
+        text, by relevance. The search is restricted to the queryset and paginated in
+        the database.
+        """
+        search_queryset = self.get_search_queryset(text, queryset)
+
+        def fetch(offset, limit):
+            stop = min(offset + limit, self.search_limit)
+            return [
+                str(item_id)
+                for item_id in search_queryset.values_list("item_id", flat=True)[offset:stop]
+            ]
+
+        return SearchResults(
+            fetch=fetch, count=lambda: min(search_queryset.count(), self.search_limit)
+        )
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def search(self, text, token, visited=(), nb_results=None, offset=0):
+        """
+        Search for items in the search documents, by relevance.
+
+        Args:
+            text (str): Text search content.
+            token (str): Unused, no remote service is queried.
+            visited (list, optional): Unused, access is checked by the caller.
+            nb_results (int, optional):
+                The number of results to return.
+                Defaults to settings.SEARCH_INDEXER_QUERY_LIMIT.
+            offset (int, optional): The number of results to skip.
+
+        Returns:
+            list: The ids and scores of the matching items.
+        """
+        nb_results = nb_results or self.search_limit
+        return [
+            {"_id": str(document.item_id), "_score": document.rank}
+            for document in self.get_search_queryset(text)[offset : offset + nb_results]
+        ]
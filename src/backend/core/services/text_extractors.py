@@ -0,0 +1,179 @@
+"""Extractors converting the content of the files into indexable text"""
+
+import codecs
+import io
+import logging
+import re
+import resource
+import sys
+import zipfile
+from functools import cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from defusedxml import ElementTree
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_text_extractors():
+    """Returns instances of the extractors listed in SEARCH_INDEXER_TEXT_EXTRACTORS."""
+    return [import_string(classpath)() for classpath in settings.SEARCH_INDEXER_TEXT_EXTRACTORS]
+
+
+def get_text_extractor(mimetype):
+    """Returns the first extractor supporting the mimetype, None if there is none."""
+    for extractor in get_text_extractors():
+        if extractor.accepts(mimetype or ""):
+            return extractor
+    return None
+
+
+def limit_resources(memory_limit):
+    """Limit the memory of an extraction process."""
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def extract_isolated(argv=None):
+    """
+    Entry point of an isolated extraction process, run with
+    `python -m core.services.text_extractors <extractor class> <max size> <memory limit>`:
+    the file is read from the standard input and its text written to the standard
+    output. Django is not set up, the extractors must not depend on it.
+    """
+    classpath, max_size, memory_limit = argv or sys.argv[1:]
+    limit_resources(int(memory_limit))
+    text = import_string(classpath)().extract(io.BytesIO(sys.stdin.buffer.read()), int(max_size))
+    sys.stdout.buffer.write(text.encode("utf-8"))
+
+
+class BaseTextExtractor:
+    """
+    Base class for text extractors.
+
+    Extractors declaring `isolated = True` parse untrusted formats. They are run in
+    a dedicated process with time and memory limits, from the bytes of the file
+    read by the indexer, and must not depend on Django being set up.
+    """
+
+    mimetypes = ()
+    isolated = False
+    # Bump to invalidate the texts extracted by a previous version of the extractor.
+    version = 1
+
+    @property
+    def name(self):
+        """Identify the extractor and its version in the extracted text cache."""
+        return f"{self.__class__.__module__}.{self.__class__.__qualname__}:{self.version}"
+
+    def accepts(self, mimetype):
+        """Return True if the extractor supports the mimetype."""
+        return any(
+            mimetype.startswith(pattern) if pattern.endswith("/") else mimetype == pattern
+            for pattern in self.mimetypes
+        )
+
+    def extract(self, file, max_size):
+        """
+        Return the text of a binary file object, reading at most `max_size` bytes.
+
+        Must be implemented by subclasses.
+        """
+        raise NotImplementedError
+
+
+class PlainTextExtractor(BaseTextExtractor):
+    """Decode text files as UTF-8."""
+
+    mimetypes = ("text/",)
+    chunk_size = 64 * 1024
+
+    def extract(self, file, max_size):
+        """
+        The file is streamed and decoded chunk by chunk, reading stops once
+        `max_size` bytes have been read.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        remaining = max_size
+        text = []
+
+        while remaining > 0:
+            chunk = file.read(min(self.chunk_size, remaining))
+            if not chunk:
+                return "".join(text) + decoder.decode(b"", final=True)
+            remaining -= len(chunk)
+            text.append(decoder.decode(chunk))
+
+        # The content was truncated, drop the trailing incomplete character if any.
+        logger.info("Content truncated to %s bytes", max_size)
+        return "".join(text)
+
+
+class OfficeDocumentExtractor(BaseTextExtractor):
+    """
+    Extract the paragraphs of the Office Open XML and OpenDocument text documents,
+    presentations and spreadsheets.
+    """
+
+    parts_by_mimetype = {
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": (
+            r"word/document\.xml"
+        ),
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation": (
+            r"ppt/slides/slide\d+\.xml"
+        ),
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": (
+            r"xl/sharedStrings\.xml"
+        ),
+        "application/vnd.oasis.opendocument.text": r"content\.xml",
+        "application/vnd.oasis.opendocument.presentation": r"content\.xml",
+        "application/vnd.oasis.opendocument.spreadsheet": r"content\.xml",
+    }
+    mimetypes = tuple(parts_by_mimetype)
+    isolated = True
+    # Local names of the paragraph, heading and shared string elements
+    paragraph_tags = {"p", "h", "si"}
+
+    def extract(self, file, max_size):
+        """Extract the text of the parts of the archive holding the document text."""
+        paragraphs = []
+        length = 0
+
+        with zipfile.ZipFile(file) as archive:
+            for part in sorted(self.get_parts(archive), key=natural_sort_key):
+                root = ElementTree.fromstring(archive.read(part))
+                for element in root.iter():
+                    if element.tag.rsplit("}", 1)[-1] not in self.paragraph_tags:
+                        continue
+                    paragraph = "".join(element.itertext()).strip()
+                    if not paragraph:
+                        continue
+                    paragraphs.append(paragraph)
+                    length += len(paragraph) + 1
+                    if length >= max_size:
+                        return "\n".join(paragraphs)[:max_size]
+
+        return "\n".join(paragraphs)
+
+    def get_parts(self, archive):
+        """
+        Return the names of the archive members holding the document text. The
+        patterns of the different formats do not overlap.
+        """
+        patterns = set(self.parts_by_mimetype.values())
+        return [
+            name
+            for name in archive.namelist()
+            if any(re.fullmatch(pattern, name) for pattern in patterns)
+        ]
+
+
+def natural_sort_key(name):
+    """Sort slide2.xml before slide10.xml."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+if __name__ == "__main__":
+    extract_isolated()
@@ -2,30 +2,76 @@
 Declare and configure the signals for the impress core application
 """
 
-from functools import partial
-
 from django.db import transaction
 from django.db.models import signals
 from django.dispatch import receiver
 
 from . import models
-from .tasks.search import trigger_batch_file_indexer
+from .services.search_cache import invalidate_user_search_results
+from .tasks.item import process_item_tree_task
+from .tasks.search import record_index_change
+
+# Changes of these fields also change the indexed data of the descendants
+SUBTREE_INDEX_FIELDS = {"path", "deleted_at", "ancestors_deleted_at", "link_reach", "link_role"}
 
 
 @receiver(signals.post_save, sender=models.Item)
-def file_post_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+def file_post_save(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
     """
-    Asynchronous call to the document indexer at the end of the transaction.
+    Record the change in the index outbox, in the transaction of the change. The
+    outbox is processed asynchronously at the end of the transaction.
     Note : Within the transaction we can have an empty content and a serialization
     error.
     """
-    transaction.on_commit(partial(trigger_batch_file_indexer, instance))
+    kind = models.ItemIndexChangeChoices.ITEM
+    if (
+        instance.type == models.ItemTypeChoices.FOLDER
+        and update_fields
+        and SUBTREE_INDEX_FIELDS.intersection(update_fields)
+    ):
+        kind = models.ItemIndexChangeChoices.SUBTREE
+
+    record_index_change(instance, kind)
+
+
+@receiver(signals.post_save, sender=models.ItemAccess)
+def file_access_post_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Accesses are inherited by the descendants, record the change of the whole subtree.
+    """
+    record_index_change(instance.item, models.ItemIndexChangeChoices.SUBTREE)
+
+
+@receiver(signals.post_delete, sender=models.ItemAccess)
+def file_access_post_delete(sender, instance, origin=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Accesses are inherited by the descendants, record the change of the whole subtree.
+    """
+    # The accesses of a deleted item are deleted along with it
+    if isinstance(origin, models.Item):
+        return
+
+    record_index_change(instance.item, models.ItemIndexChangeChoices.SUBTREE)
 
 
 @receiver(signals.post_save, sender=models.ItemAccess)
-def file_access_post_save(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+@receiver(signals.post_delete, sender=models.ItemAccess)
+def invalidate_search_results_on_access_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """The items a user can search change with their accesses."""
+    invalidate_user_search_results(instance.user_id)
+
+
+@receiver(signals.post_save, sender=models.Item)
+def invalidate_search_results_on_item_save(sender, instance, **kwargs):  # pylint: disable=unused-argument
     """
-    Asynchronous call to the document indexer at the end of the transaction.
+    A user searching for the item they just created or renamed should find it. The
+    changes made by other users are seen once the cached results expire.
     """
-    if not created:
-        transaction.on_commit(partial(trigger_batch_file_indexer, instance.item))
+    invalidate_user_search_results(instance.creator_id)
+
+
+@receiver(signals.post_save, sender=models.ItemTreeTask)
+def item_tree_task_post_save(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Process the descendants in the background once the item change is committed."""
+    if created:
+        transaction.on_commit(lambda: process_item_tree_task.delay(instance.id))
@@ -1,8 +1,12 @@
 """Cache helpers for per-user storage usage values."""
 
+from itertools import batched
+
 from django.core.cache import cache
 
 STORAGE_USED_CACHE_KEY_PREFIX = "storage_used:user:"
+# Number of users whose usage caches are invalidated per call to the backends
+INVALIDATION_BATCH_SIZE = 1000
 
 
 def get_storage_used_cache_key(user_id):
@@ -11,13 +15,20 @@ def get_storage_used_cache_key(user_id):
 
 
 def invalidate_storage_used_cache(user_ids):
-    """Invalidate the per-user usage caches (storage used + entitlements)."""
-    user_ids = [user_id for user_id in user_ids if user_id]
+    """
+    Invalidate the per-user usage caches (storage used + entitlements) by batches,
+    so invalidating the creators of a large subtree does not send all their keys at
+    once.
+    """
+    user_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
     if not user_ids:
         return
-    cache.delete_many([get_storage_used_cache_key(user_id) for user_id in user_ids])
+
     # Imported lazily: the local entitlements backend imports this module.
     # pylint: disable-next=import-outside-toplevel
     from core.entitlements import get_entitlements_backend  # noqa: PLC0415
 
-    get_entitlements_backend().invalidate_cache(user_ids)
+    backend = get_entitlements_backend()
+    for batch in batched(user_ids, INVALIDATION_BATCH_SIZE, strict=False):
+        cache.delete_many([get_storage_used_cache_key(user_id) for user_id in batch])
+        backend.invalidate_cache(list(batch))
@@ -0,0 +1,248 @@
+"""Send the invitation emails of the email outbox using celery tasks."""
+
+import smtplib
+import time
+from datetime import timedelta
+from logging import getLogger
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import models
+
+from drive.celery_app import app
+
+logger = getLogger(__file__)
+
+EMAILS_SENT_COUNTER = "email_outbox:sent"
+EMAILS_LATENCY_COUNTER = "email_outbox:latency_ms"
+EMAILS_ERRORS_COUNTER = "email_outbox:errors"
+EMAILS_ABANDONED_COUNTER = "email_outbox:abandoned"
+
+
+def _incr_counter(key, delta=1):
+    """Increment an email metrics counter, creating it if missing."""
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, delta, timeout=None)
+
+
+def get_email_stats():
+    """
+    Return the metrics of the emails sent from the outbox:
+    - sent: number of emails sent
+    - errors: number of failed sending attempts
+    - abandoned: number of emails removed from the outbox after their last attempt
+    - latency_ms: mean duration of the sending of an email in milliseconds
+    """
+    counters = cache.get_many(
+        [
+            EMAILS_SENT_COUNTER,
+            EMAILS_LATENCY_COUNTER,
+            EMAILS_ERRORS_COUNTER,
+            EMAILS_ABANDONED_COUNTER,
+        ]
+    )
+    sent = counters.get(EMAILS_SENT_COUNTER, 0)
+
+    return {
+        "sent": sent,
+        "errors": counters.get(EMAILS_ERRORS_COUNTER, 0),
+        "abandoned": counters.get(EMAILS_ABANDONED_COUNTER, 0),
+        "latency_ms": counters.get(EMAILS_LATENCY_COUNTER, 0) / sent if sent else None,
+    }
+
+
+def queue_invitation_emails(item, invitations, sender, language):
+    """
+    Record the emails of invitations to an item in the outbox and schedule their
+    sending once the current transaction, if any, is committed.
+
+    Args:
+        item (Item): The shared item.
+        invitations (list): The (email, role) of the invited users.
+        sender (User): The user sharing the item.
+        language (str): The language of the emails.
+    """
+    if not settings.EMAIL_HOST:
+        logger.debug("EMAIL_HOST host is not set, skipping email sending")
+        return
+
+    if not invitations:
+        return
+
+    models.InvitationEmailOutbox.objects.bulk_create(
+        [
+            models.InvitationEmailOutbox(
+                item=item, email=email, role=role, sender=sender, language=language
+            )
+            for email, role in invitations
+        ]
+    )
+    transaction.on_commit(process_email_outbox_task.delay)
+
+
+def _record_failure(outbox_email, exc):
+    """
+    Postpone the next attempt of a failed email with an exponential backoff and
+    release its lease.
+    """
+    outbox_email.attempts += 1
+    outbox_email.send_after = timezone.now() + timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_COUNTDOWN * 2 ** (outbox_email.attempts - 1)
+    )
+    outbox_email.processing_at = None
+    outbox_email.save(update_fields=["attempts", "send_after", "processing_at"])
+    _incr_counter(EMAILS_ERRORS_COUNTER)
+
+    if outbox_email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        _incr_counter(EMAILS_ABANDONED_COUNTER)
+        logger.error(
+            "invitation to %s was not sent after %d attempts: %s",
+            outbox_email.email,
+            outbox_email.attempts,
+            exc,
+        )
+    else:
+        logger.warning(
+            "invitation to %s was not sent, will be retried: %s", outbox_email.email, exc
+        )
+
+
+def claim_email_outbox(batch_size):
+    """
+    Lease the oldest emails of the outbox due for sending to the current worker, in a
+    short transaction so no row lock is held while talking to the email server.
+    Emails leased for more than EMAIL_OUTBOX_LEASE_TIMEOUT seconds are claimed again,
+    their worker is assumed to be gone.
+
+    Returns:
+        list: The emails claimed.
+    """
+    now = timezone.now()
+    lease_expired_at = now - timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_TIMEOUT)
+
+    with transaction.atomic():
+        outbox_emails = list(
+            models.InvitationEmailOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(processing_at__isnull=True) | Q(processing_at__lt=lease_expired_at),
+                attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+                send_after__lte=now,
+            )
+            .select_related("item", "sender")
+            .order_by("id")[:batch_size]
+        )
+        models.InvitationEmailOutbox.objects.filter(
+            id__in=[outbox_email.id for outbox_email in outbox_emails]
+        ).update(processing_at=now)
+
+    return outbox_emails
+
+
+def process_email_outbox_batch(connection, batch_size=None):
+    """
+    Send the oldest emails of the outbox due for sending through an open connection
+    and remove them. Emails are leased before being sent so concurrent workers send
+    distinct batches, and they are removed once sent in a separate transaction. The
+    email of an item is rendered once per role, sender and language.
+
+    The batch stops at the first email failing to be sent, it is retried later and
+    the lease of the emails not sent yet is released.
+
+    Returns:
+        int: The number of emails sent, None if an email failed to be sent.
+    """
+    outbox_emails = claim_email_outbox(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+
+    rendered_emails = {}
+    sent_ids = []
+    failed = False
+    for outbox_email in outbox_emails:
+        key = (
+            outbox_email.item_id,
+            outbox_email.role,
+            outbox_email.sender_id,
+            outbox_email.language,
+        )
+        if key not in rendered_emails:
+            rendered_emails[key] = outbox_email.item.render_invitation_email(
+                outbox_email.role, outbox_email.sender, outbox_email.language
+            )
+        subject, msg_plain, msg_html = rendered_emails[key]
+
+        message = mail.EmailMultiAlternatives(
+            subject, msg_plain, settings.EMAIL_FROM, [outbox_email.email]
+        )
+        message.attach_alternative(msg_html, "text/html")
+
+        start = time.perf_counter()
+        try:
+            connection.send_messages([message])
+        except (smtplib.SMTPException, OSError) as exc:
+            _record_failure(outbox_email, exc)
+            failed = True
+            break
+        _incr_counter(EMAILS_SENT_COUNTER)
+        _incr_counter(EMAILS_LATENCY_COUNTER, round((time.perf_counter() - start) * 1000))
+        sent_ids.append(outbox_email.id)
+
+    with transaction.atomic():
+        models.InvitationEmailOutbox.objects.filter(id__in=sent_ids).delete()
+        if failed:
+            models.InvitationEmailOutbox.objects.filter(
+                id__in=[outbox_email.id for outbox_email in outbox_emails]
+            ).update(processing_at=None)
+
+    return None if failed else len(sent_ids)
+
+
+def purge_email_outbox():
+    """
+    Remove the emails which reached EMAIL_OUTBOX_MAX_ATTEMPTS, each of them was
+    logged as abandoned after its last attempt.
+
+    Returns:
+        int: The number of emails removed.
+    """
+    count, _ = models.InvitationEmailOutbox.objects.filter(
+        attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    ).delete()
+    return count
+
+
+@app.task
+def process_email_outbox_task():
+    """
+    Celery Task : Send the emails of the outbox by batches, reusing a single
+    connection to the email server.
+    """
+    count = 0
+    with mail.get_connection(fail_silently=False) as connection:
+        while processed := process_email_outbox_batch(connection):
+            count += processed
+
+    purge_email_outbox()
+    logger.info("Sent %d outbox emails, email stats: %s", count, get_email_stats())
+
+    if processed is None:
+        # Retry once the first failed email is due, the emails over the max
+        # attempts were purged.
+        send_after = (
+            models.InvitationEmailOutbox.objects.filter(
+                attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+            )
+            .order_by("send_after")
+            .values_list("send_after", flat=True)
+            .first()
+        )
+        if send_after is not None:
+            process_email_outbox_task.apply_async(
+                countdown=max((send_after - timezone.now()).total_seconds(), 0)
+            )
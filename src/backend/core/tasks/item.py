@@ -9,6 +9,7 @@ from os.path import splitext
 
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import DatabaseError
 from django.utils import timezone
 
 import boto3
@@ -16,7 +17,16 @@ import botocore
 from lasuite.malware_detection.models import MalwareDetection
 
 from core.api.utils import sanitize_filename
-from core.models import Item, ItemTypeChoices, ItemUploadStateChoices
+from core.models import (
+    Item,
+    ItemIndexChangeChoices,
+    ItemTreeTask,
+    ItemTreeTaskKindChoices,
+    ItemTreeTaskStatusChoices,
+    ItemTypeChoices,
+    ItemUploadStateChoices,
+)
+from core.tasks.search import record_index_change
 
 from drive.celery_app import app
 
@@ -219,3 +229,69 @@ def duplicate_file(self, item_to_duplicate_id, duplicated_item_id):
 
     duplicated_item.upload_state = ItemUploadStateChoices.READY
     duplicated_item.save(update_fields=["upload_state", "updated_at"])
+
+
+def _mark_item_tree_task_failed(tree_task, exc):
+    """Record the failure of a tree task, it is resumed from the descendants left."""
+    tree_task.status = ItemTreeTaskStatusChoices.FAILED
+    tree_task.error_details = str(exc)
+    tree_task.save(update_fields=["status", "error_details", "updated_at"])
+
+
+@app.task(bind=True, max_retries=5)
+def process_item_tree_task(self, tree_task_id):
+    """
+    Process the descendants of an item by chunks in short transactions, see
+    ItemTreeTask. This task can be retried without harm: the descendants already
+    processed are skipped.
+    """
+    try:
+        tree_task = ItemTreeTask.objects.select_related("item").get(id=tree_task_id)
+    except ItemTreeTask.DoesNotExist:
+        logger.error("Item tree task %s does not exist", tree_task_id)
+        return
+
+    if tree_task.status == ItemTreeTaskStatusChoices.COMPLETED:
+        logger.info("Item tree task %s is already completed", tree_task_id)
+        return
+
+    # The previous task of the item runs this one once completed
+    if tree_task.get_previous_tasks().exists():
+        logger.info("Item tree task %s waits for the previous tasks of its item", tree_task_id)
+        return
+
+    try:
+        next_task = tree_task.process(settings.ITEM_SUBTREE_CHUNK_SIZE)
+    except DatabaseError as exc:
+        logger.error(
+            "Item tree task %s failed after %s/%s descendants (retries %d on %d). Error: %s",
+            tree_task_id,
+            tree_task.done,
+            tree_task.total,
+            self.request.retries,
+            self.max_retries,
+            exc,
+        )
+        _mark_item_tree_task_failed(tree_task, exc)
+        raise self.retry(exc=exc, countdown=2**self.request.retries) from exc
+    except Exception as exc:
+        # Not retried, the resume_item_tree_tasks command resumes the failed tasks
+        logger.exception(
+            "Item tree task %s failed after %s/%s descendants",
+            tree_task_id,
+            tree_task.done,
+            tree_task.total,
+        )
+        _mark_item_tree_task_failed(tree_task, exc)
+        raise
+
+    logger.info("Item tree task %s completed on %s descendants", tree_task_id, tree_task.done)
+
+    # The descendants may have been indexed before being processed
+    record_index_change(tree_task.item, ItemIndexChangeChoices.SUBTREE)
+
+    if tree_task.kind == ItemTreeTaskKindChoices.HARD_DELETE:
+        process_item_purge.delay(tree_task.item_id)
+
+    if next_task:
+        process_item_tree_task.delay(next_task.id)
@@ -0,0 +1,128 @@
+"""
+Coalesce the malware analyses of files updated in bursts (WOPI autosave).
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from lasuite.malware_detection import malware_detection
+
+from core.models import Item
+
+from drive.celery_app import app
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_PREFIX = "malware_analysis"
+# Versions must outlive the analyses in flight, whatever the backend queue length.
+ANALYSIS_VERSION_TIMEOUT = 60 * 60 * 24
+ANALYSIS_REQUESTED_COUNTER = f"{ANALYSIS_CACHE_PREFIX}:requested"
+ANALYSIS_SUBMITTED_COUNTER = f"{ANALYSIS_CACHE_PREFIX}:submitted"
+ANALYSIS_PENDING_COUNTER = f"{ANALYSIS_CACHE_PREFIX}:pending"
+
+
+def _get_version_key(item_id):
+    return f"{ANALYSIS_CACHE_PREFIX}:version:{item_id}"
+
+
+def _get_scheduled_key(item_id):
+    return f"{ANALYSIS_CACHE_PREFIX}:scheduled:{item_id}"
+
+
+def _incr(key, delta=1, timeout=None):
+    """Atomically increment a cache counter, creating it if missing."""
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key expired between add and incr
+        cache.add(key, delta, timeout=timeout)
+        return delta
+
+
+def get_analysis_version(item_id):
+    """Return the version of the last analysis requested for an item."""
+    return cache.get(_get_version_key(item_id))
+
+
+def is_analysis_superseded(item_id, analysis_version):
+    """Check if a more recent analysis has been requested for the item."""
+    current_version = get_analysis_version(item_id)
+    return current_version is not None and current_version > analysis_version
+
+
+def schedule_item_file_analysis(item):
+    """
+    Request the malware analysis of an item file. Requests for the same item received
+    within MALWARE_DETECTION_COALESCE_COUNTDOWN seconds are collapsed into a single
+    trailing analysis of the latest version of the file.
+    """
+    version = _incr(_get_version_key(item.id), timeout=ANALYSIS_VERSION_TIMEOUT)
+    _incr(ANALYSIS_REQUESTED_COUNTER)
+
+    countdown = settings.MALWARE_DETECTION_COALESCE_COUNTDOWN
+    if countdown <= 0:
+        _submit_analysis(item, version)
+        return
+
+    # Only the first request of a burst schedules the task, the following ones only
+    # bump the version the task will analyse.
+    if not cache.add(_get_scheduled_key(item.id), version, timeout=countdown * 10):
+        logger.info("Coalesce malware analysis of item %s (version %s)", item.id, version)
+        return
+
+    _incr(ANALYSIS_PENDING_COUNTER)
+    analyse_item_file.apply_async(args=[str(item.id)], countdown=countdown)
+
+
+def _submit_analysis(item, version):
+    """Submit the analysis of the item file to the malware detection backend."""
+    _incr(ANALYSIS_SUBMITTED_COUNTER)
+    malware_detection.analyse_file(item.file_key, item_id=item.id, analysis_version=version)
+
+
+@app.task
+def analyse_item_file(item_id):
+    """Submit the trailing analysis of a burst of requests for an item file."""
+    # Release the flag first, a request received from now on schedules a new task.
+    cache.delete(_get_scheduled_key(item_id))
+    _incr(ANALYSIS_PENDING_COUNTER, delta=-1)
+
+    try:
+        item = Item.objects.get(id=item_id)
+    except Item.DoesNotExist:
+        logger.info("Item %s does not exist anymore, skip malware analysis", item_id)
+        return
+
+    version = get_analysis_version(item_id) or 0
+    _submit_analysis(item, version)
+    logger.info(
+        "Submitted malware analysis of item %s (version %s), stats: %s",
+        item_id,
+        version,
+        get_analysis_stats(),
+    )
+
+
+def get_analysis_stats():
+    """
+    Return the metrics of the coalesced malware analyses:
+    - queue_depth: number of items waiting for their trailing analysis
+    - requested: number of analyses requested
+    - submitted: number of analyses submitted to the malware detection backend
+    - coalescing_ratio: number of requests per submitted analysis
+    """
+    counters = cache.get_many(
+        [ANALYSIS_REQUESTED_COUNTER, ANALYSIS_SUBMITTED_COUNTER, ANALYSIS_PENDING_COUNTER]
+    )
+    requested = counters.get(ANALYSIS_REQUESTED_COUNTER, 0)
+    submitted = counters.get(ANALYSIS_SUBMITTED_COUNTER, 0)
+
+    return {
+        "queue_depth": max(counters.get(ANALYSIS_PENDING_COUNTER, 0), 0),
+        "requested": requested,
+        "submitted": submitted,
+        "coalescing_ratio": requested / submitted if submitted else None,
+    }
@@ -1,14 +1,18 @@
-"""Trigger document indexation using celery task."""
+"""Trigger document indexation using celery task and the index outbox."""
 
+from datetime import timedelta
 from logging import getLogger
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
 from django_redis.cache import RedisCache
 
 from core import models
-from core.services.search_indexers import get_file_indexer
+from core.services.search_indexers import get_file_indexer, get_push_stats
 
 from drive.celery_app import app
 
@@ -49,50 +53,155 @@ def file_indexer_task(item_id):
         logger.info("Start file %s indexation", item_id)
 
 
-@app.task
-def batch_file_indexer_task(timestamp):
-    """Celery Task : Sends indexation query for a batch of documents."""
-    indexer = get_file_indexer()
+def record_index_change(item, kind=models.ItemIndexChangeChoices.ITEM):
+    """
+    Record an item change in the index outbox, in the transaction of the change,
+    and schedule the processing of the outbox once the transaction is committed.
 
-    if indexer:
-        queryset = models.Item.objects.filter(
-            updated_at__gte=timestamp,
-            main_workspace=False,
-        )
+    Args:
+        item (Item): The changed item.
+        kind (str): ITEM to index the item alone, SUBTREE to index its descendants too.
+    """
+    # DO NOT record changes if indexation if disabled
+    if not settings.SEARCH_INDEXER_CLASS:
+        return
+
+    # Ignore changes of workspace items created along users
+    if item.main_workspace:
+        return
 
-        count = indexer.index(queryset)
-        logger.info("Indexed %d files", count)
+    models.ItemIndexOutbox.objects.create(item=item, kind=kind)
+    transaction.on_commit(trigger_index_outbox_processing)
 
 
-def trigger_batch_file_indexer(item):
+def trigger_index_outbox_processing():
     """
-    Trigger indexation task with debounce a delay set by the SEARCH_INDEXER_COUNTDOWN setting.
-
-    Args:
-        item (Item): The file item instance.
+    Trigger the outbox processing task with debounce a delay set by the
+    SEARCH_INDEXER_COUNTDOWN setting.
     """
     countdown = int(settings.SEARCH_INDEXER_COUNTDOWN)
 
-    # DO NOT create a task if indexation if disabled
-    if not settings.SEARCH_INDEXER_CLASS:
+    if countdown <= 0:
+        process_index_outbox_task.apply()
         return
 
-    # Ignore triggres from workspace items created along users
-    if item.main_workspace:
-        return
+    if batch_indexer_throttle_acquire(timeout=countdown):
+        logger.info("Add task for index outbox processing in %d seconds", countdown)
+        process_index_outbox_task.apply_async(countdown=countdown)
+    else:
+        logger.info("Skip task for index outbox processing")
 
-    if countdown > 0:
-        # Each time this method is called during a countdown, we increment the
-        # counter and each task decrease it, so the index be run only once.
-        if batch_indexer_throttle_acquire(timeout=countdown):
-            logger.info(
-                "Add task for batch file indexation from updated_at=%s in %d seconds",
-                item.updated_at.isoformat(),
-                countdown,
+
+def claim_index_outbox_changes(batch_size):
+    """
+    Lease the oldest changes of the outbox to the current worker, in a short transaction
+    so no row lock is held while indexing. Changes leased for more than
+    SEARCH_INDEXER_OUTBOX_LEASE_TIMEOUT seconds are claimed again, their worker is
+    assumed to be gone.
+
+    Returns:
+        list: The id, item id, item path and kind of the changes claimed.
+    """
+    now = timezone.now()
+    lease_expired_at = now - timedelta(seconds=settings.SEARCH_INDEXER_OUTBOX_LEASE_TIMEOUT)
+
+    with transaction.atomic():
+        changes = list(
+            models.ItemIndexOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(processing_at__isnull=True) | Q(processing_at__lt=lease_expired_at),
+                attempts__lt=settings.SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS,
             )
+            .order_by("id")
+            .values_list("id", "item_id", "item__path", "kind")[:batch_size]
+        )
+        models.ItemIndexOutbox.objects.filter(
+            id__in=[change_id for change_id, *_ in changes]
+        ).update(processing_at=now)
+
+    return changes
 
-            batch_file_indexer_task.apply_async(args=[item.updated_at], countdown=countdown)
+
+def process_index_outbox_batch(indexer, batch_size=None):
+    """
+    Index the items of the oldest changes of the outbox and remove these changes.
+    Changes are leased before being processed so concurrent workers drain distinct
+    batches. Changes of the same item are deduplicated and subtree changes are
+    expanded to the descendants of the item.
+
+    Returns:
+        int: The number of changes processed, None if the indexation failed.
+    """
+    changes = claim_index_outbox_changes(batch_size or settings.SEARCH_INDEXER_OUTBOX_BATCH_SIZE)
+
+    if not changes:
+        return 0
+
+    change_ids = [change_id for change_id, *_ in changes]
+    item_ids = set()
+    subtree_paths = set()
+    for _, item_id, item_path, kind in changes:
+        if kind == models.ItemIndexChangeChoices.SUBTREE:
+            subtree_paths.add(str(item_path))
         else:
-            logger.info("Skip task for batch file %s indexation", item.pk)
-    else:
-        file_indexer_task.apply(args=[item.pk])
+            item_ids.add(item_id)
+
+    items_filter = Q(id__in=item_ids)
+    for path in subtree_paths:
+        items_filter |= Q(path__descendants=path)
+
+    try:
+        indexer.index(models.Item.objects.filter(items_filter, main_workspace=False))
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Unable to index %d outbox changes", len(changes))
+        models.ItemIndexOutbox.objects.filter(id__in=change_ids).update(
+            attempts=F("attempts") + 1, processing_at=None
+        )
+        return None
+
+    models.ItemIndexOutbox.objects.filter(id__in=change_ids).delete()
+    return len(changes)
+
+
+def purge_index_outbox():
+    """
+    Remove the changes which reached SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS. Their items
+    are logged so they can be indexed again with the "index" management command.
+
+    Returns:
+        int: The number of changes removed.
+    """
+    abandoned_changes = models.ItemIndexOutbox.objects.filter(
+        attempts__gte=settings.SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS
+    )
+    item_ids = sorted(
+        {str(item_id) for item_id in abandoned_changes.values_list("item_id", flat=True)}
+    )
+    if not item_ids:
+        return 0
+
+    logger.error("Abandon the indexation of the items %s", ", ".join(item_ids))
+    count, _ = abandoned_changes.delete()
+    return count
+
+
+@app.task
+def process_index_outbox_task():
+    """Celery Task : Drain the index outbox by batches."""
+    indexer = get_file_indexer()
+
+    if not indexer:
+        return
+
+    count = 0
+    while processed := process_index_outbox_batch(indexer):
+        count += processed
+
+    logger.info("Indexed %d outbox changes, push stats: %s", count, get_push_stats())
+    purge_index_outbox()
+
+    if processed is None:
+        # Retry the failed changes later, they are purged once over the max attempts.
+        process_index_outbox_task.apply_async(
+            countdown=settings.SEARCH_INDEXER_OUTBOX_RETRY_COUNTDOWN
+        )
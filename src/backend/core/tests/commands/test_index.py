@@ -3,15 +3,18 @@ Unit test for `index` command.
 """
 
 import logging
+import uuid
 from operator import itemgetter
 from unittest import mock
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db import transaction
 
 import pytest
+from freezegun import freeze_time
 
 from core import factories, models
+from core.management.commands.index import get_run, get_shard_bounds
 from core.services.search_indexers import SearchIndexer
 
 
@@ -86,3 +89,116 @@ def test_index_improperly_configured(indexer_settings, caplog):
     mock_push.assert_not_called()
 
     assert "The indexer is not enabled or properly configured." in caplog.messages
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("indexer_settings")
+def test_index_shards():
+    """Each item should be indexed once whatever the number of shards."""
+    items = factories.ItemFactory.create_batch(10)
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index", shards=4, batch_size=2)
+
+    indexed_ids = [data["id"] for call in mock_push.call_args_list for data in call.args[0]]
+    assert sorted(indexed_ids) == sorted(str(item.pk) for item in items)
+
+
+def test_index_shard_bounds():
+    """The shards should cover the whole id space without overlapping."""
+    bounds = [get_shard_bounds(shard, 3) for shard in range(3)]
+
+    assert bounds[0][0] == uuid.UUID(int=0)
+    assert bounds[0][1] == bounds[1][0]
+    assert bounds[1][1] == bounds[2][0]
+    assert bounds[2][1] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("indexer_settings")
+def test_index_resume():
+    """A resumed indexation should start after the checkpoint of each shard."""
+    items = sorted(factories.ItemFactory.create_batch(6), key=lambda item: item.pk)
+
+    # The first 4 items were indexed before an interruption
+    models.ItemIndexCheckpoint.objects.create(run=get_run(1, None), shard=0, last_id=items[3].pk)
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index", resume=True)
+
+    indexed_ids = [data["id"] for call in mock_push.call_args_list for data in call.args[0]]
+    assert indexed_ids == [str(items[4].pk), str(items[5].pk)]
+
+    # The checkpoints of a completed run are deleted, resuming starts a new run
+    assert not models.ItemIndexCheckpoint.objects.exists()
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index", resume=True)
+
+    assert len(mock_push.call_args[0][0]) == 6
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("indexer_settings")
+def test_index_resume_skips_completed_shards():
+    """A resumed indexation should skip the shards completed before the interruption."""
+    items = factories.ItemFactory.create_batch(6)
+    run = get_run(2, None)
+    models.ItemIndexCheckpoint.objects.create(run=run, shard=0, done=True)
+    # A checkpoint of another run is left as is
+    models.ItemIndexCheckpoint.objects.create(run=get_run(3, None), shard=0, done=True)
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index", "--shards", "2", resume=True)
+
+    lower, _upper = get_shard_bounds(1, 2)
+    indexed_ids = {data["id"] for call in mock_push.call_args_list for data in call.args[0]}
+    assert indexed_ids == {str(item.pk) for item in items if item.pk >= lower}
+    assert list(models.ItemIndexCheckpoint.objects.values_list("run", flat=True)) == [
+        get_run(3, None)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("indexer_settings")
+def test_index_interrupted_keeps_checkpoints():
+    """The checkpoints of the batches indexed before an error are kept for --resume."""
+    items = sorted(factories.ItemFactory.create_batch(4), key=lambda item: item.pk)
+
+    with (
+        mock.patch.object(SearchIndexer, "push", side_effect=[None, RuntimeError("down")]),
+        pytest.raises(CommandError),
+    ):
+        call_command("index", "--batch-size", "2")
+
+    checkpoint = models.ItemIndexCheckpoint.objects.get(run=get_run(1, None), shard=0)
+    assert checkpoint.last_id == items[1].pk
+    assert checkpoint.done is False
+
+    # Without --resume, the checkpoints are discarded and everything is indexed again
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index")
+
+    assert sum(len(call.args[0]) for call in mock_push.call_args_list) == 4
+    assert not models.ItemIndexCheckpoint.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("indexer_settings")
+def test_index_since():
+    """Only the items updated since the given date should be indexed."""
+    with freeze_time("2025-01-01"):
+        factories.ItemFactory()
+    with freeze_time("2025-03-01"):
+        recent_item = factories.ItemFactory()
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        call_command("index", "--since", "2025-02-01")
+
+    assert [data["id"] for data in mock_push.call_args[0][0]] == [str(recent_item.pk)]
+
+
+def test_index_since_invalid():
+    """An invalid --since value should be rejected."""
+    with pytest.raises(CommandError):
+        call_command("index", "--since", "yesterday")
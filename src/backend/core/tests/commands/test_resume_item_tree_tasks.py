@@ -0,0 +1,91 @@
+"""Tests for the resume_item_tree_tasks management command."""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+
+from core import factories, models
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_move(settings):
+    """Move a folder in the background, the on commit callbacks are not executed."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(2, parent=item, type=models.ItemTypeChoices.FILE)
+    target = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    return item.move(target), item
+
+
+def _backdate(tree_task, minutes):
+    """Set the last progress of a tree task some minutes ago."""
+    models.ItemTreeTask.objects.filter(pk=tree_task.pk).update(
+        updated_at=timezone.now() - timedelta(minutes=minutes)
+    )
+
+
+def test_resume_item_tree_tasks_none():
+    """Nothing happens when there are no tree tasks."""
+    call_command("resume_item_tree_tasks")
+
+
+@pytest.mark.parametrize(
+    "status",
+    [
+        models.ItemTreeTaskStatusChoices.PENDING,
+        models.ItemTreeTaskStatusChoices.PROCESSING,
+        models.ItemTreeTaskStatusChoices.FAILED,
+    ],
+)
+def test_resume_item_tree_tasks_stale(settings, status):
+    """The tasks left unfinished for longer than the threshold are processed again."""
+    tree_task, item = _create_move(settings)
+    models.ItemTreeTask.objects.filter(pk=tree_task.pk).update(status=status)
+    _backdate(tree_task, 31)
+
+    call_command("resume_item_tree_tasks")
+
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.COMPLETED
+    assert item.descendants().count() == 2
+    item.refresh_from_db()
+    assert item.subtree_operation is None
+
+
+def test_resume_item_tree_tasks_recent(settings):
+    """The tasks updated within the threshold are left to their worker."""
+    tree_task, _item = _create_move(settings)
+    _backdate(tree_task, 29)
+
+    with mock.patch("core.tasks.item.process_item_tree_task.delay") as process:
+        call_command("resume_item_tree_tasks")
+
+    process.assert_not_called()
+
+
+def test_resume_item_tree_tasks_minutes(settings):
+    """The threshold can be given in minutes."""
+    tree_task, _item = _create_move(settings)
+    _backdate(tree_task, 6)
+
+    with mock.patch("core.tasks.item.process_item_tree_task.delay") as process:
+        call_command("resume_item_tree_tasks", "--minutes", "5")
+
+    process.assert_called_once_with(tree_task.id)
+
+
+def test_resume_item_tree_tasks_completed(settings):
+    """The completed tasks are not processed again."""
+    tree_task, _item = _create_move(settings)
+    tree_task.process(10)
+    _backdate(tree_task, 60)
+
+    with mock.patch("core.tasks.item.process_item_tree_task.delay") as process:
+        call_command("resume_item_tree_tasks")
+
+    process.assert_not_called()
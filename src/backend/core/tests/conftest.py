@@ -27,12 +27,20 @@ def clear_cache():
     from core.entitlements import (  # pylint:disable=import-outside-toplevel # noqa: PLC0415
         get_entitlements_backend,
     )
+    from core.services.text_extractors import (  # pylint:disable=import-outside-toplevel # noqa: PLC0415
+        get_text_extractors,
+    )
     from core.storage import (  # pylint:disable=import-outside-toplevel # noqa: PLC0415
         get_storage_compute_backend,
     )
+    from wopi.utils import (  # pylint:disable=import-outside-toplevel # noqa: PLC0415
+        local_wopi_configuration,
+    )
 
     get_entitlements_backend.cache_clear()
     get_storage_compute_backend.cache_clear()
+    get_text_extractors.cache_clear()
+    local_wopi_configuration.clear()
 
 
 @pytest.fixture
@@ -497,6 +497,79 @@ def test_api_item_accesses_list_authenticated_related_same_team(roles, results,
     assert [result_dict[str(access.id)] for access in accesses] == results
 
 
+def test_api_item_accesses_list_search():
+    """The accesses can be searched by user email, user name or team."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    factories.UserItemAccessFactory(item=item, user=user, role="owner")
+    alice = factories.UserFactory(email="alice@example.com", full_name="Alice Martin")
+    factories.UserItemAccessFactory(item=parent, user=alice, role="reader")
+    alice_access = factories.UserItemAccessFactory(item=item, user=alice, role="editor")
+    team_access = factories.TeamItemAccessFactory(item=parent, team="martin-team", role="reader")
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/accesses/?q=alice@")
+
+    assert response.status_code == 200
+    [result] = response.json()
+    assert result["id"] == str(alice_access.id)
+    assert result["max_ancestors_role"] == "reader"
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/accesses/?q=martin")
+
+    assert response.status_code == 200
+    assert [result["id"] for result in response.json()] == [
+        str(team_access.id),
+        str(alice_access.id),
+    ]
+
+
+def test_api_item_accesses_list_paginated(django_assert_num_queries):
+    """
+    The accesses are paginated when a page is requested, the deepest access of each
+    target being selected before the pagination.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    admin_access = factories.UserItemAccessFactory(item=parent, user=user, role="administrator")
+    other_users = factories.UserFactory.create_batch(4)
+    for other_user in other_users:
+        factories.UserItemAccessFactory(item=parent, user=other_user, role="reader")
+    deepest_accesses = [
+        factories.UserItemAccessFactory(item=item, user=other_user, role="editor")
+        for other_user in other_users
+    ]
+
+    with django_assert_num_queries(4):
+        response = client.get(f"/api/v1.0/items/{item.id!s}/accesses/?page_size=3")
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 5
+    assert [result["id"] for result in content["results"]] == [
+        str(admin_access.id),
+        str(deepest_accesses[0].id),
+        str(deepest_accesses[1].id),
+    ]
+    assert content["results"][0]["max_ancestors_role"] == "administrator"
+    assert content["results"][0]["max_ancestors_role_item_id"] == str(parent.id)
+    assert content["results"][1]["max_ancestors_role"] == "reader"
+    assert content["results"][1]["max_ancestors_role_item_id"] == str(parent.id)
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/accesses/?page_size=3&page=2")
+
+    assert [result["id"] for result in response.json()["results"]] == [
+        str(access.id) for access in deepest_accesses[2:]
+    ]
+
+
 def test_api_item_accesses_retrieve_anonymous():
     """
     Anonymous users should not be allowed to retrieve an item access.
@@ -616,6 +689,33 @@ def test_api_item_accesses_retrieve_authenticated_related(via, user_role, mock_u
     }
 
 
+def test_api_item_accesses_retrieve_max_ancestors_role(django_assert_num_queries):
+    """
+    The max ancestors role of the retrieved access should be fetched along with it
+    instead of querying the ancestors of the access.
+    """
+    user = factories.UserFactory()
+
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    factories.UserItemAccessFactory(item=parent, user=user, role="administrator")
+    parent_access = factories.UserItemAccessFactory(item=parent, role="reader")
+    access = factories.UserItemAccessFactory(item=item, user=parent_access.user, role="editor")
+
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/v1.0/items/{item.id!s}/accesses/{access.id!s}/")
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["max_ancestors_role"] == "reader"
+    assert content["max_ancestors_role_item_id"] == str(parent.id)
+    assert content["max_role"] == "editor"
+    assert content["abilities"]["set_role_to"] == ["reader", "editor", "administrator"]
+
+
 ## Update --
 
 
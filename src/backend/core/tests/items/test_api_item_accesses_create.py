@@ -109,7 +109,7 @@ def test_api_item_accesses_create_authenticated_reader_or_editor(via, role, mock
 @pytest.mark.parametrize("depth", [1, 2, 3])
 @pytest.mark.parametrize("via", VIA)
 def test_api_item_accesses_create_authenticated_administrator(
-    via, depth, mock_user_teams, settings
+    via, depth, mock_user_teams, settings, django_capture_on_commit_callbacks
 ):
     """
     Administrators of an item (direct or by heritage) should be able to create item accesses
@@ -164,14 +164,15 @@ def test_api_item_accesses_create_authenticated_administrator(
 
     assert len(mail.outbox) == 0
 
-    response = client.post(
-        f"/api/v1.0/items/{item.id!s}/accesses/",
-        {
-            "user_id": str(other_user.id),
-            "role": role,
-        },
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/accesses/",
+            {
+                "user_id": str(other_user.id),
+                "role": role,
+            },
+            format="json",
+        )
 
     assert response.status_code == 201
     assert models.ItemAccess.objects.filter(user=other_user, item=item).count() == 1
@@ -207,7 +208,9 @@ def test_api_item_accesses_create_authenticated_administrator(
 
 @pytest.mark.parametrize("depth", [1, 2, 3])
 @pytest.mark.parametrize("via", VIA)
-def test_api_item_accesses_create_authenticated_owner(via, depth, mock_user_teams, settings):
+def test_api_item_accesses_create_authenticated_owner(
+    via, depth, mock_user_teams, settings, django_capture_on_commit_callbacks
+):
     """
     Owners of an item (direct or by heritage) should be able to create item accesses whatever
     the role.
@@ -236,14 +239,15 @@ def test_api_item_accesses_create_authenticated_owner(via, depth, mock_user_team
 
     assert len(mail.outbox) == 0
 
-    response = client.post(
-        f"/api/v1.0/items/{item.id!s}/accesses/",
-        {
-            "user_id": str(other_user.id),
-            "role": role,
-        },
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/accesses/",
+            {
+                "user_id": str(other_user.id),
+                "role": role,
+            },
+            format="json",
+        )
 
     assert response.status_code == 201
     assert models.ItemAccess.objects.filter(user=other_user, item=item).count() == 1
@@ -94,7 +94,9 @@ def test_api_item_batch_share_authenticated_reader_or_editor(role):
 
 @override_settings(ALLOW_SHARE_IMPORT_FILE=True)
 @pytest.mark.parametrize("role", ["administrator", "owner"])
-def test_api_item_batch_share_privileged_mixed_rows(role, settings):
+def test_api_item_batch_share_privileged_mixed_rows(
+    role, settings, django_capture_on_commit_callbacks
+):
     """
     Administrators and owners should be able to batch share an item. Emails
     matching an existing user get an access, unknown emails get an invitation,
@@ -107,16 +109,17 @@ def test_api_item_batch_share_privileged_mixed_rows(role, settings):
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(
-        batch_share_url(item),
-        {
-            "rows": [
-                {"email": "alice@example.com", "role": "editor"},
-                {"email": "bob@example.com", "role": "reader"},
-            ]
-        },
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            batch_share_url(item),
+            {
+                "rows": [
+                    {"email": "alice@example.com", "role": "editor"},
+                    {"email": "bob@example.com", "role": "reader"},
+                ]
+            },
+            format="json",
+        )
 
     assert response.status_code == 200
     assert response.json() == {
@@ -249,7 +252,7 @@ def test_api_item_batch_share_already_invited():
 
 
 @override_settings(ALLOW_SHARE_IMPORT_FILE=True)
-def test_api_item_batch_share_duplicated_rows():
+def test_api_item_batch_share_duplicated_rows(django_capture_on_commit_callbacks):
     """Duplicated emails in the payload should only create one share."""
     user = factories.UserFactory()
     item = factories.ItemFactory(users=[(user, "owner")])
@@ -257,16 +260,17 @@ def test_api_item_batch_share_duplicated_rows():
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(
-        batch_share_url(item),
-        {
-            "rows": [
-                {"email": "bob@example.com", "role": "editor"},
-                {"email": "Bob@example.com", "role": "reader"},
-            ]
-        },
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            batch_share_url(item),
+            {
+                "rows": [
+                    {"email": "bob@example.com", "role": "editor"},
+                    {"email": "Bob@example.com", "role": "reader"},
+                ]
+            },
+            format="json",
+        )
 
     assert response.status_code == 200
     assert response.json()["invitations_created"] == 1
@@ -374,3 +378,76 @@ def test_api_item_batch_share_synchronizes_descendants():
     assert response.status_code == 200
     assert models.ItemAccess.objects.filter(item=item, user=shared_user, role="editor").exists()
     assert not models.ItemAccess.objects.filter(item=child, user=shared_user).exists()
+
+
+@override_settings(ALLOW_SHARE_IMPORT_FILE=True)
+def test_api_item_batch_share_synchronizes_descendants_in_bulk():
+    """
+    The accesses of the descendants should be synchronized for all the new
+    accesses at once, keeping the accesses with a higher role.
+    """
+    user = factories.UserFactory()
+    item = factories.ItemFactory(users=[(user, "owner")], type=models.ItemTypeChoices.FOLDER)
+    child = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FOLDER)
+    alice = factories.UserFactory(email="alice@example.com")
+    carol = factories.UserFactory(email="carol@example.com")
+    factories.UserItemAccessFactory(item=child, user=alice, role="editor")
+    factories.UserItemAccessFactory(item=child, user=carol, role="editor")
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        batch_share_url(item),
+        {
+            "rows": [
+                {"email": "alice@example.com", "role": "administrator"},
+                {"email": "carol@example.com", "role": "reader"},
+            ]
+        },
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["accesses_created"] == 2
+    assert not models.ItemAccess.objects.filter(item=child, user=alice).exists()
+    assert models.ItemAccess.objects.filter(item=child, user=carol, role="editor").exists()
+
+
+@override_settings(ALLOW_SHARE_IMPORT_FILE=True)
+def test_api_item_batch_share_number_of_queries(
+    django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    """
+    The shares should be created in bulk: the number of queries should not depend
+    on the number of rows, and the emails should be queued in the outbox then sent
+    in the background after the commit.
+    """
+    user = factories.UserFactory()
+    item = factories.ItemFactory(users=[(user, "owner")], type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    users = factories.UserFactory.create_batch(20)
+    rows = [{"email": shared_user.email, "role": "reader"} for shared_user in users] + [
+        {"email": f"contact{index}@example.com", "role": "editor"} for index in range(20)
+    ]
+
+    client = APIClient()
+    client.force_login(user)
+
+    with (
+        django_capture_on_commit_callbacks() as callbacks,
+        django_assert_max_num_queries(30),
+    ):
+        response = client.post(batch_share_url(item), {"rows": rows}, format="json")
+
+    assert response.status_code == 200
+    assert response.json()["accesses_created"] == 20
+    assert response.json()["invitations_created"] == 20
+    assert models.InvitationEmailOutbox.objects.filter(item=item).count() == 40
+    assert len(mail.outbox) == 0
+
+    for callback in callbacks:
+        callback()
+
+    assert len(mail.outbox) == 40
+    assert not models.InvitationEmailOutbox.objects.exists()
@@ -348,7 +348,13 @@ def test_api_item_invitations_create_authenticated_outsider():
 )
 @pytest.mark.parametrize("via", VIA)
 def test_api_item_invitations_create_privileged_members(  # noqa: PLR0913
-    via, inviting, invited, response_code, mock_user_teams, settings
+    via,
+    inviting,
+    invited,
+    response_code,
+    mock_user_teams,
+    settings,
+    django_capture_on_commit_callbacks,
 ):
     """
     Only owners and administrators should be able to invite new users.
@@ -371,11 +377,12 @@ def test_api_item_invitations_create_privileged_members(  # noqa: PLR0913
 
     client = APIClient()
     client.force_login(user)
-    response = client.post(
-        f"/api/v1.0/items/{item.id!s}/invitations/",
-        invitation_values,
-        format="json",
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/invitations/",
+            invitation_values,
+            format="json",
+        )
 
     assert response.status_code == response_code
 
@@ -409,7 +416,9 @@ def test_api_item_invitations_create_privileged_members(  # noqa: PLR0913
         }
 
 
-def test_api_item_invitations_create_email_full_name_empty(settings):
+def test_api_item_invitations_create_email_full_name_empty(
+    settings, django_capture_on_commit_callbacks
+):
     """
     If the full name of the user is empty, it will display the email address.
     """
@@ -427,12 +436,13 @@ def test_api_item_invitations_create_email_full_name_empty(settings):
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(
-        f"/api/v1.0/items/{item.id!s}/invitations/",
-        invitation_values,
-        format="json",
-        headers={"Content-Language": "not-supported"},
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/invitations/",
+            invitation_values,
+            format="json",
+            headers={"Content-Language": "not-supported"},
+        )
 
     assert response.status_code == 201
     assert response.json()["email"] == "guest@example.com"
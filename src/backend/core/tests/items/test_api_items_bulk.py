@@ -0,0 +1,360 @@
+"""Test the bulk actions of the items API endpoint."""
+
+from uuid import uuid4
+
+import pytest
+from rest_framework.test import APIClient
+
+from core import factories, models
+from core.api.serializers import BULK_ACTION_MAX_ITEMS
+
+pytestmark = pytest.mark.django_db
+
+PERMISSION_DENIED = {
+    "status": 403,
+    "type": "client_error",
+    "errors": [
+        {
+            "attr": None,
+            "code": "permission_denied",
+            "detail": "You do not have permission to perform this action.",
+        },
+    ],
+}
+NOT_FOUND = {
+    "status": 404,
+    "type": "client_error",
+    "errors": [{"attr": None, "code": "not_found", "detail": "Not found."}],
+}
+
+
+@pytest.mark.parametrize(
+    "method, url",
+    [
+        ("post", "bulk-move"),
+        ("post", "bulk-delete"),
+        ("post", "bulk-restore"),
+        ("post", "bulk-favorite"),
+        ("delete", "bulk-favorite"),
+    ],
+)
+def test_api_items_bulk_anonymous(method, url):
+    """Anonymous users should not be able to run bulk actions."""
+    item = factories.ItemFactory(link_reach="public", link_role="editor")
+
+    response = getattr(APIClient(), method)(
+        f"/api/v1.0/items/{url}/", {"item_ids": [str(item.id)]}, format="json"
+    )
+
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("item_ids", [[], ["invalid"], [str(uuid4())] * 2])
+def test_api_items_bulk_invalid_item_ids(item_ids):
+    """The ids must be a non empty list of uuids, the duplicates are ignored."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post("/api/v1.0/items/bulk-delete/", {"item_ids": item_ids}, format="json")
+
+    if len(item_ids) == 2:
+        assert response.status_code == 200
+        assert response.json() == {"results": [{"id": item_ids[0], **NOT_FOUND}]}
+    else:
+        assert response.status_code == 400
+        assert response.json()["errors"][0]["attr"].startswith("item_ids")
+
+
+def test_api_items_bulk_too_many_items():
+    """The number of selected items is limited."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        "/api/v1.0/items/bulk-delete/",
+        {"item_ids": [str(uuid4()) for _ in range(BULK_ACTION_MAX_ITEMS + 1)]},
+        format="json",
+    )
+
+    assert response.status_code == 400
+
+
+def test_api_items_bulk_move():
+    """
+    The items the user can move should be moved, the results of the other ones
+    should be reported in the order of the selection.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    movable = factories.ItemFactory.create_batch(3, parent=folder, type=models.ItemTypeChoices.FILE)
+    read_only = factories.UserItemAccessFactory(
+        user=user, role="reader", item__type=models.ItemTypeChoices.FILE
+    ).item
+    target = factories.UserItemAccessFactory(
+        user=user, role="editor", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    unknown_id = uuid4()
+    item_ids = [str(read_only.id), *[str(item.id) for item in movable], str(unknown_id)]
+
+    response = client.post(
+        "/api/v1.0/items/bulk-move/",
+        {"item_ids": item_ids, "target_item_id": str(target.id)},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            {"id": str(read_only.id), **PERMISSION_DENIED},
+            *[{"id": str(item.id), "status": 200} for item in movable],
+            {"id": str(unknown_id), **NOT_FOUND},
+        ]
+    }
+    for item in movable:
+        item.refresh_from_db()
+        assert item.parent() == target
+    read_only.refresh_from_db()
+    assert read_only.depth == 1
+
+
+def test_api_items_bulk_move_nested():
+    """An item selected along with its parent is moved out of it to the target."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    child = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    grandchild = factories.ItemFactory(parent=child, type=models.ItemTypeChoices.FILE)
+    target = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+
+    response = client.post(
+        "/api/v1.0/items/bulk-move/",
+        {"item_ids": [str(parent.id), str(child.id)], "target_item_id": str(target.id)},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == [200, 200]
+    parent.refresh_from_db()
+    child.refresh_from_db()
+    grandchild.refresh_from_db()
+    assert parent.parent() == target
+    assert child.parent() == target
+    assert grandchild.parent() == child
+
+
+def test_api_items_bulk_move_target_missing_permission():
+    """The whole selection is rejected when the target does not accept children."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.UserItemAccessFactory(user=user, role="owner").item
+    target = factories.UserItemAccessFactory(
+        user=user, role="reader", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+
+    response = client.post(
+        "/api/v1.0/items/bulk-move/",
+        {"item_ids": [str(item.id)], "target_item_id": str(target.id)},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.json()["errors"][0]["code"] == "item_move_missing_permission"
+
+
+def test_api_items_bulk_move_error_rolls_back_the_item_only():
+    """An item failing to move is reported and does not prevent the others from moving."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    target = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    parent = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FILE)
+
+    response = client.post(
+        "/api/v1.0/items/bulk-move/",
+        {"item_ids": [str(target.id), str(item.id)], "target_item_id": str(target.id)},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == 400
+    assert results[0]["errors"][0]["code"] == "item_move_target_in_subtree"
+    assert results[1] == {"id": str(item.id), "status": 200}
+    item.refresh_from_db()
+    assert item.parent() == target
+
+
+def test_api_items_bulk_delete():
+    """
+    The selected items should be soft deleted, along with the items selected in
+    them, except the ones the user cannot delete.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    child = factories.ItemFactory(parent=folder, type=models.ItemTypeChoices.FILE)
+    other = factories.UserItemAccessFactory(user=user, role="owner").item
+    editable = factories.UserItemAccessFactory(user=user, role="editor").item
+
+    response = client.post(
+        "/api/v1.0/items/bulk-delete/",
+        {"item_ids": [str(child.id), str(folder.id), str(other.id), str(editable.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            {"id": str(child.id), "status": 204},
+            {"id": str(folder.id), "status": 204},
+            {"id": str(other.id), "status": 204},
+            {"id": str(editable.id), **PERMISSION_DENIED},
+        ]
+    }
+    folder.refresh_from_db()
+    child.refresh_from_db()
+    other.refresh_from_db()
+    editable.refresh_from_db()
+    assert folder.deleted_at is not None
+    assert child.deleted_at is None
+    assert child.ancestors_deleted_at == folder.deleted_at
+    assert other.deleted_at is not None
+    assert editable.deleted_at is None
+
+
+def test_api_items_bulk_delete_large_subtree_in_background(settings):
+    """The deletion of a large folder is reported with its tree task."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.UserItemAccessFactory(
+        user=user, role="owner", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    factories.ItemFactory.create_batch(2, parent=folder, type=models.ItemTypeChoices.FILE)
+
+    response = client.post(
+        "/api/v1.0/items/bulk-delete/", {"item_ids": [str(folder.id)]}, format="json"
+    )
+
+    assert response.status_code == 200
+    [result] = response.json()["results"]
+    assert result["status"] == 202
+    assert result["tree_task"]["kind"] == "soft_delete"
+
+
+def test_api_items_bulk_restore():
+    """The selected items owned by the user should be restored."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    items = [factories.UserItemAccessFactory(user=user, role="owner").item for _ in range(2)]
+    not_owned = factories.UserItemAccessFactory(user=user, role="administrator").item
+    not_deleted = factories.UserItemAccessFactory(user=user, role="owner").item
+    for item in [*items, not_owned]:
+        item.soft_delete()
+
+    item_ids = [str(item.id) for item in [*items, not_owned, not_deleted]]
+    response = client.post("/api/v1.0/items/bulk-restore/", {"item_ids": item_ids}, format="json")
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[:2] == [{"id": str(item.id), "status": 200} for item in items]
+    assert results[2] == {"id": str(not_owned.id), **NOT_FOUND}
+    assert results[3]["status"] == 400
+    assert results[3]["errors"][0]["code"] == "item_restore_not_deleted"
+    for item in items:
+        item.refresh_from_db()
+        assert item.deleted_at is None
+    not_owned.refresh_from_db()
+    assert not_owned.deleted_at is not None
+
+
+def test_api_items_bulk_favorite():
+    """The selected items should be marked then unmarked as favorite in a single query."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    items = factories.ItemFactory.create_batch(3, link_reach="public")
+    favorite = factories.ItemFactory(link_reach="authenticated")
+    models.ItemFavorite.objects.create(item=favorite, user=user)
+    restricted = factories.ItemFactory(link_reach="restricted")
+    item_ids = [str(item.id) for item in [*items, favorite, restricted]]
+
+    response = client.post("/api/v1.0/items/bulk-favorite/", {"item_ids": item_ids}, format="json")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            *[{"id": str(item.id), "status": 201} for item in items],
+            {
+                "id": str(favorite.id),
+                "status": 200,
+                "detail": "item already marked as favorite",
+            },
+            {"id": str(restricted.id), **PERMISSION_DENIED},
+        ]
+    }
+    assert set(models.ItemFavorite.objects.filter(user=user).values_list("item_id", flat=True)) == {
+        item.id for item in [*items, favorite]
+    }
+
+    response = client.delete(
+        "/api/v1.0/items/bulk-favorite/",
+        {"item_ids": [str(items[0].id), str(restricted.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["results"][0] == {"id": str(items[0].id), "status": 200}
+    assert not models.ItemFavorite.objects.filter(user=user, item=items[0]).exists()
+
+
+def test_api_items_bulk_favorite_number_of_queries(django_assert_max_num_queries):
+    """The number of queries should not depend on the number of selected items."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.UserItemAccessFactory(
+        user=user, role="reader", item__type=models.ItemTypeChoices.FOLDER
+    ).item
+    items = factories.ItemFactory.create_batch(30, parent=folder, type=models.ItemTypeChoices.FILE)
+
+    with django_assert_max_num_queries(12):
+        response = client.post(
+            "/api/v1.0/items/bulk-favorite/",
+            {"item_ids": [str(item.id) for item in items]},
+            format="json",
+        )
+
+    assert response.status_code == 200
+    assert models.ItemFavorite.objects.filter(user=user).count() == 30
@@ -74,6 +74,7 @@ def test_api_items_children_list_anonymous_public_standalone():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -118,6 +119,7 @@ def test_api_items_children_list_anonymous_public_standalone():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -196,6 +198,7 @@ def test_api_items_children_list_anonymous_public_parent():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -234,6 +237,7 @@ def test_api_items_children_list_anonymous_public_parent():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -332,6 +336,7 @@ def test_api_items_children_list_authenticated_unrelated_public_or_authenticated
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -376,6 +381,7 @@ def test_api_items_children_list_authenticated_unrelated_public_or_authenticated
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -457,6 +463,7 @@ def test_api_items_children_list_authenticated_public_or_authenticated_parent(
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -501,6 +508,7 @@ def test_api_items_children_list_authenticated_public_or_authenticated_parent(
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -607,6 +615,7 @@ def test_api_items_children_list_authenticated_related_direct():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -651,6 +660,7 @@ def test_api_items_children_list_authenticated_related_direct():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -735,6 +745,7 @@ def test_api_items_children_list_authenticated_related_parent():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -779,6 +790,7 @@ def test_api_items_children_list_authenticated_related_parent():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -920,6 +932,7 @@ def test_api_items_children_list_authenticated_related_team_members(
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -964,6 +977,7 @@ def test_api_items_children_list_authenticated_related_team_members(
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -1042,6 +1056,7 @@ def test_api_items_children_list_filter_type():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -1099,6 +1114,7 @@ def test_api_items_children_list_filter_type():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -1400,6 +1416,7 @@ def test_api_items_children_list_computed_link_reach_and_role():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             }
         ],
@@ -1448,6 +1465,7 @@ def test_api_items_children_list_computed_link_reach_and_role():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             }
         ],
@@ -102,6 +102,7 @@ def test_api_item_favorite_list_authenticated_with_favorite():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
                 "is_favorite": True,
             }
@@ -214,7 +215,7 @@ def test_api_item_favorite_list_filtering(django_assert_num_queries):
         update_upload_state=models.ItemUploadStateChoices.READY,
     )
 
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/items/favorites/?type=folder")
 
     assert response.status_code == 200
@@ -222,7 +223,7 @@ def test_api_item_favorite_list_filtering(django_assert_num_queries):
     assert content["count"] == 1
     assert content["results"][0]["id"] == str(child_item.id)
 
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(7):
         response = client.get("/api/v1.0/items/favorites/?type=file")
 
     assert response.status_code == 200
@@ -278,7 +279,7 @@ def test_api_item_favorite_list_ordering_by_fields(ordering, django_assert_num_q
     is_descending = ordering.startswith("-")
     querystring = f"?ordering={ordering}"
 
-    with django_assert_num_queries(6):
+    with django_assert_num_queries(7):
         response = client.get(f"/api/v1.0/items/favorites/{querystring:s}")
     assert response.status_code == 200
     results = response.json()["results"]
@@ -127,6 +127,7 @@ def test_api_items_list_format():
             "description": None,
             "deleted_at": None,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "is_wopi_supported": False,
         },
         {
@@ -165,6 +166,7 @@ def test_api_items_list_format():
             "description": None,
             "deleted_at": None,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "is_wopi_supported": False,
         },
         {
@@ -203,6 +205,7 @@ def test_api_items_list_format():
             "description": None,
             "deleted_at": None,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "is_wopi_supported": False,
         },
     ]
@@ -979,3 +979,155 @@ def test_api_items_move_missing_permission_posthog_event(settings):
         {},
         item=item,
     )
+
+
+def test_api_items_move_into_own_subtree_should_fail():
+    """An item cannot be moved inside itself or one of its descendants."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+    child = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FOLDER)
+
+    for target in [item, child]:
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/move/",
+            data={"target_item_id": str(target.id)},
+        )
+
+        assert response.status_code == 400
+        assert response.json()["errors"][0]["code"] == "item_move_target_in_subtree"
+
+    item.refresh_from_db()
+    assert item.depth == 1
+
+
+def test_api_items_move_large_subtree_in_background(settings, django_capture_on_commit_callbacks):
+    """
+    Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, the item is moved right away and
+    the paths of its descendants are rewritten by chunks in the background.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    settings.ITEM_SUBTREE_CHUNK_SIZE = 2
+
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+    folder = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FOLDER)
+    files = factories.ItemFactory.create_batch(2, parent=folder, type=models.ItemTypeChoices.FILE)
+    target = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/items/{item.id!s}/move/",
+            data={"target_item_id": str(target.id)},
+        )
+
+    assert response.status_code == 202
+    tree_task = models.ItemTreeTask.objects.get(item=item)
+    content = response.json()
+    assert content["id"] == str(tree_task.id)
+    assert content["kind"] == "move"
+    # The response is sent before the background task starts
+    assert content["status"] == "pending"
+    assert content["progress"] is None
+
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.COMPLETED
+    assert tree_task.total == tree_task.done == 3
+
+    item.refresh_from_db()
+    assert item.parent() == target
+    assert {str(descendant.id) for descendant in item.descendants()} == {
+        str(folder.id),
+        *(str(file.id) for file in files),
+    }
+    for file in files:
+        file.refresh_from_db()
+        assert str(file.path) == f"{target.path!s}.{item.id!s}.{folder.id!s}.{file.id!s}"
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/tree-task/")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["progress"] == 100
+
+
+def test_api_items_move_tree_task_in_progress_should_fail(settings):
+    """
+    The items of a subtree whose descendants are still moved in the background
+    cannot be moved, nor can items be moved into it.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+    folder = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory(parent=folder, type=models.ItemTypeChoices.FILE)
+    target = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+    other = factories.ItemFactory(
+        users=[(user, models.RoleChoices.OWNER)], type=models.ItemTypeChoices.FOLDER
+    )
+
+    # The task is not run: the on commit callbacks are not executed
+    response = client.post(
+        f"/api/v1.0/items/{item.id!s}/move/",
+        data={"target_item_id": str(target.id)},
+    )
+    assert response.status_code == 202
+
+    for moved, destination in [(folder, other), (other, folder), (target, other)]:
+        response = client.post(
+            f"/api/v1.0/items/{moved.id!s}/move/",
+            data={"target_item_id": str(destination.id)},
+        )
+
+        assert response.status_code == 400
+        assert response.json()["errors"][0]["code"] == "item_move_tree_task_in_progress"
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/tree-task/")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+
+
+def test_api_items_tree_task_none():
+    """A 404 is returned when no background operation was run on the item."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(users=[(user, models.RoleChoices.OWNER)])
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/tree-task/")
+
+    assert response.status_code == 404
+
+
+def test_api_items_tree_task_no_permission():
+    """Users who cannot retrieve the item cannot see the progress of its operations."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(link_reach=models.LinkReachChoices.RESTRICTED)
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/tree-task/")
+
+    assert response.status_code == 403
@@ -239,3 +239,39 @@ def test_api_items_restore_suspicious_item_should_work_for_creator():
     suspicious_item.refresh_from_db()
     assert suspicious_item.deleted_at is None
     assert suspicious_item.ancestors_deleted_at is None
+
+
+def test_api_items_restore_large_subtree_in_background(settings):
+    """
+    Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, the item is restored right away
+    and its descendants are restored in the background.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.UserItemAccessFactory(item=item, user=user, role="owner")
+    factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    item.soft_delete().process(10)
+
+    # The on commit callbacks are not executed, the task is not run
+    response = client.post(f"/api/v1.0/items/{item.id!s}/restore/")
+
+    assert response.status_code == 202
+    assert response.json()["kind"] == "restore"
+    assert response.json()["status"] == "pending"
+
+    item.refresh_from_db()
+    assert item.deleted_at is None
+    assert item.subtree_operation == "restore"
+
+    response = client.get(f"/api/v1.0/items/{item.id!s}/")
+    assert response.json()["subtree_operation"] == "restore"
+
+    # The item cannot be deleted again until its descendants are restored
+    response = client.delete(f"/api/v1.0/items/{item.id!s}/")
+
+    assert response.status_code == 400
+    assert response.json()["errors"][0]["code"] == "item_soft_delete_tree_task_in_progress"
@@ -66,6 +66,7 @@ def test_api_items_retrieve_anonymous_public_standalone():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -123,6 +124,7 @@ def test_api_items_retrieve_anonymous_public_parent():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -227,6 +229,7 @@ def test_api_items_retrieve_authenticated_unrelated_public_or_authenticated(reac
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
     assert models.LinkTrace.objects.filter(item=item, user=user).exists() is True
@@ -290,6 +293,7 @@ def test_api_items_retrieve_authenticated_public_or_authenticated_parent(reach):
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -431,6 +435,7 @@ def test_api_items_retrieve_authenticated_related_direct():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -498,6 +503,7 @@ def test_api_items_retrieve_authenticated_related_parent():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -675,6 +681,7 @@ def test_api_items_retrieve_authenticated_related_team_members(teams, role, mock
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -750,6 +757,7 @@ def test_api_items_retrieve_authenticated_related_team_administrators(teams, rol
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -825,6 +833,7 @@ def test_api_items_retrieve_authenticated_related_team_owners(teams, mock_user_t
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -1222,6 +1231,7 @@ def test_api_items_retrieve_file_with_url_property(upload_state):
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -1295,6 +1305,7 @@ def test_api_items_retrieve_file_with_url_property_non_previewable(upload_state)
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -1360,6 +1371,7 @@ def test_api_items_retrieve_file_with_url_property_with_spaces():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -1504,6 +1516,7 @@ def test_api_items_retrieve_file_analysing_not_creator():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
     }
 
 
@@ -2,6 +2,9 @@
 
 import random
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 import pytest
 from rest_framework.test import APIClient
 
@@ -70,6 +73,7 @@ def test_api_items_search_authenticated_without_filters():
             "description": None,
             "filename": None,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "id": str(top_parent.id),
             "is_favorite": False,
             "is_wopi_supported": False,
@@ -109,6 +113,7 @@ def test_api_items_search_authenticated_without_filters():
             "description": None,
             "filename": None,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "id": str(parent.id),
             "is_favorite": False,
             "is_wopi_supported": False,
@@ -121,42 +126,12 @@ def test_api_items_search_authenticated_without_filters():
             "numchild_folder": 0,
             "parents": [
                 {
-                    "abilities": top_parent.get_abilities(user),
-                    "ancestors_link_reach": top_parent.ancestors_link_reach,
-                    "ancestors_link_role": top_parent.ancestors_link_role,
-                    "computed_link_reach": top_parent.computed_link_reach,
-                    "computed_link_role": top_parent.computed_link_role,
-                    "created_at": top_parent.created_at.isoformat().replace("+00:00", "Z"),
-                    "creator": {
-                        "id": str(top_parent.creator.id),
-                        "full_name": top_parent.creator.full_name,
-                        "short_name": top_parent.creator.short_name,
-                    },
-                    "deleted_at": None,
-                    "depth": 1,
-                    "description": None,
-                    "filename": None,
-                    "hard_delete_at": None,
                     "id": str(top_parent.id),
-                    "is_favorite": False,
-                    "is_wopi_supported": False,
-                    "link_reach": top_parent.link_reach,
-                    "link_role": top_parent.link_role,
-                    "main_workspace": False,
-                    "mimetype": None,
-                    "nb_accesses": 1,
-                    "numchild": 1,
-                    "numchild_folder": 1,
-                    "path": str(top_parent.path),
-                    "size": None,
                     "title": "Item 1",
+                    "path": str(top_parent.path),
+                    "depth": 1,
                     "type": "folder",
-                    "updated_at": top_parent.updated_at.isoformat().replace("+00:00", "Z"),
-                    "upload_state": None,
-                    "url": None,
-                    "url_permalink": None,
-                    "url_preview": None,
-                    "user_role": top_parent_access.role,
+                    "main_workspace": False,
                 }
             ],
             "path": str(parent.path),
@@ -187,6 +162,7 @@ def test_api_items_search_authenticated_without_filters():
             "description": None,
             "filename": children.filename,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "id": str(children.id),
             "is_favorite": False,
             "is_wopi_supported": False,
@@ -199,80 +175,20 @@ def test_api_items_search_authenticated_without_filters():
             "numchild_folder": 0,
             "parents": [
                 {
-                    "abilities": top_parent.get_abilities(user),
-                    "ancestors_link_reach": top_parent.ancestors_link_reach,
-                    "ancestors_link_role": top_parent.ancestors_link_role,
-                    "computed_link_reach": top_parent.computed_link_reach,
-                    "computed_link_role": top_parent.computed_link_role,
-                    "created_at": top_parent.created_at.isoformat().replace("+00:00", "Z"),
-                    "creator": {
-                        "id": str(top_parent.creator.id),
-                        "full_name": top_parent.creator.full_name,
-                        "short_name": top_parent.creator.short_name,
-                    },
-                    "deleted_at": None,
-                    "depth": 1,
-                    "description": None,
-                    "filename": None,
-                    "hard_delete_at": None,
                     "id": str(top_parent.id),
-                    "is_favorite": False,
-                    "is_wopi_supported": False,
-                    "link_reach": top_parent.link_reach,
-                    "link_role": top_parent.link_role,
-                    "main_workspace": False,
-                    "mimetype": None,
-                    "nb_accesses": 1,
-                    "numchild": 1,
-                    "numchild_folder": 1,
-                    "path": str(top_parent.path),
-                    "size": None,
                     "title": "Item 1",
+                    "path": str(top_parent.path),
+                    "depth": 1,
                     "type": "folder",
-                    "updated_at": top_parent.updated_at.isoformat().replace("+00:00", "Z"),
-                    "upload_state": None,
-                    "url": None,
-                    "url_permalink": None,
-                    "url_preview": None,
-                    "user_role": top_parent_access.role,
+                    "main_workspace": False,
                 },
                 {
-                    "abilities": parent.get_abilities(user),
-                    "ancestors_link_reach": parent.ancestors_link_reach,
-                    "ancestors_link_role": parent.ancestors_link_role,
-                    "computed_link_reach": parent.computed_link_reach,
-                    "computed_link_role": parent.computed_link_role,
-                    "created_at": parent.created_at.isoformat().replace("+00:00", "Z"),
-                    "creator": {
-                        "id": str(parent.creator.id),
-                        "full_name": parent.creator.full_name,
-                        "short_name": parent.creator.short_name,
-                    },
-                    "deleted_at": None,
-                    "depth": 2,
-                    "description": None,
-                    "filename": None,
-                    "hard_delete_at": None,
                     "id": str(parent.id),
-                    "is_favorite": False,
-                    "is_wopi_supported": False,
-                    "link_reach": parent.link_reach,
-                    "link_role": parent.link_role,
-                    "main_workspace": False,
-                    "mimetype": None,
-                    "nb_accesses": 1,
-                    "numchild": 1,
-                    "numchild_folder": 0,
-                    "path": str(parent.path),
-                    "size": None,
                     "title": "Item 2",
+                    "path": str(parent.path),
+                    "depth": 2,
                     "type": "folder",
-                    "updated_at": parent.updated_at.isoformat().replace("+00:00", "Z"),
-                    "upload_state": None,
-                    "url": None,
-                    "url_permalink": None,
-                    "url_preview": None,
-                    "user_role": top_parent_access.role,
+                    "main_workspace": False,
                 },
             ],
             "path": str(children.path),
@@ -425,6 +341,64 @@ def test_api_items_search_authenticated_with_title_filter_on_top_level_file():
     assert response.data["count"] == 0
 
 
+def test_api_items_search_authenticated_with_title_filter_ranked():
+    """
+    Items matching the title should be ignoring case and accents, and ranked by
+    similarity with the searched text.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.ItemFactory(users=[user], type=models.ItemTypeChoices.FOLDER)
+    long_title, exact_title = (
+        factories.ItemFactory(
+            title=title,
+            parent=parent,
+            type=models.ItemTypeChoices.FILE,
+            update_upload_state=models.ItemUploadStateChoices.READY,
+        )
+        for title in ["Réunions d'équipe et comptes rendus", "Réunion"]
+    )
+
+    response = client.get("/api/v1.0/items/search/?title=reunion")
+
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["results"]] == [
+        str(exact_title.pk),
+        str(long_title.pk),
+    ]
+
+
+def test_api_items_search_authenticated_with_title_filter_min_similarity(settings):
+    """
+    Titles similar to the searched text should match when SEARCH_TITLE_MIN_SIMILARITY
+    is set.
+    """
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    parent = factories.ItemFactory(users=[user], type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(
+        title="Quarterly budget",
+        parent=parent,
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+
+    # Typo in the searched text
+    response = client.get("/api/v1.0/items/search/?title=budgett")
+    assert response.status_code == 200
+    assert response.data["count"] == 0
+
+    settings.SEARCH_TITLE_MIN_SIMILARITY = 0.6
+
+    response = client.get("/api/v1.0/items/search/?title=budgett")
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["results"]] == [str(item.pk)]
+
+
 def test_api_items_search_authenticated_by_type():
     """
     Authenticated users should be able to search for items by type.
@@ -871,3 +845,135 @@ def test_api_items_search_excludes_deleted_root_item_by_default():
 
     assert response.status_code == 200
     assert response.json()["results"] == []
+
+
+def _create_results_under_chain(user, depth):
+    """Create a chain of folders of the given depth with 2 matching files at the bottom."""
+    parent = factories.ItemFactory(
+        type=models.ItemTypeChoices.FOLDER, link_reach=models.LinkReachChoices.RESTRICTED
+    )
+    factories.UserItemAccessFactory(item=parent, user=user)
+    for i in range(depth - 1):
+        parent = factories.ItemFactory(
+            parent=parent,
+            type=models.ItemTypeChoices.FOLDER,
+            link_reach=models.LinkReachChoices.AUTHENTICATED if i == 1 else None,
+        )
+    return factories.ItemFactory.create_batch(
+        2,
+        parent=parent,
+        title="needle",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+
+
+def _search_queries(depth):
+    """Search the results under a chain of the given depth, return the response and queries."""
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+    results = _create_results_under_chain(user, depth)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/v1.0/items/search/?title=needle")
+
+    assert response.status_code == 200
+    assert {result["id"] for result in response.json()["results"]} == {
+        str(item.pk) for item in results
+    }
+    return user, response, len(queries)
+
+
+def test_api_items_search_parents_constant_queries():
+    """
+    The parents of the results should be loaded in a single query and the link
+    definitions of the results computed once per chain, whatever their depth.
+    """
+    _user, _response, shallow_queries = _search_queries(depth=2)
+    user, response, deep_queries = _search_queries(depth=6)
+
+    assert deep_queries == shallow_queries
+
+    for result in response.json()["results"]:
+        item = models.Item.objects.get(pk=result["id"])
+        assert result["ancestors_link_reach"] == item.ancestors_link_reach
+        assert result["computed_link_reach"] == item.computed_link_reach
+        assert result["abilities"] == item.get_abilities(user)
+        # The parents are serialized with the fields of their breadcrumb only
+        assert result["parents"] == [
+            {
+                "id": str(parent.id),
+                "title": parent.title,
+                "path": str(parent.path),
+                "depth": parent.depth,
+                "type": "folder",
+                "main_workspace": False,
+            }
+            for parent in sorted(item.ancestors(), key=lambda parent: parent.depth)
+        ]
+
+
+def test_api_items_search_cached_results(settings, django_assert_num_queries):
+    """
+    Title searches should be cached per user and the results of a longer text refined
+    from the results of its prefix, until the accesses of the user change.
+    """
+    settings.SEARCH_RESULTS_CACHE_TIMEOUT = 30
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, users=[user])
+    budget, budgets = (
+        factories.ItemFactory(
+            parent=folder,
+            title=title,
+            type=models.ItemTypeChoices.FILE,
+            update_upload_state=models.ItemUploadStateChoices.READY,
+        )
+        for title in ("Budget", "Budgets 2025")
+    )
+    bureau = factories.ItemFactory(
+        parent=folder,
+        title="Bureau",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+
+    response = client.get("/api/v1.0/items/search/?title=bu")
+    assert response.data["count"] == 3
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/v1.0/items/search/?title=bu")
+    assert response.data["count"] == 3
+    cached_queries = len(queries)
+
+    # The refinement only ranks the refined results
+    with django_assert_num_queries(cached_queries + 1):
+        response = client.get("/api/v1.0/items/search/?title=budg")
+    assert [result["id"] for result in response.json()["results"]] == [
+        str(budget.pk),
+        str(budgets.pk),
+    ]
+
+    # The items of a cached page are filtered again with their current state
+    models.Item.objects.filter(pk=bureau.pk).update(
+        upload_state=models.ItemUploadStateChoices.SUSPICIOUS
+    )
+    response = client.get("/api/v1.0/items/search/?title=bu")
+    assert str(bureau.pk) not in [result["id"] for result in response.json()["results"]]
+
+    # A new access of the user invalidates the cached results
+    other_folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    other = factories.ItemFactory(
+        parent=other_folder,
+        title="budget 2026",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+    factories.UserItemAccessFactory(item=other_folder, user=user)
+
+    response = client.get("/api/v1.0/items/search/?title=budg")
+    assert response.data["count"] == 3
+    assert str(other.pk) in [result["id"] for result in response.json()["results"]]
@@ -80,6 +80,7 @@ def test_api_items_search_authenticated_fulltext_query(indexer_settings):
             "description": None,
             "filename": item_b.filename,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "id": str(item_b.id),
             "is_favorite": False,
             "is_wopi_supported": False,
@@ -102,41 +103,12 @@ def test_api_items_search_authenticated_fulltext_query(indexer_settings):
             "user_role": folder_access.role,
             "parents": [
                 {
-                    "abilities": folder.get_abilities(user),
-                    "ancestors_link_reach": folder.ancestors_link_reach,
-                    "ancestors_link_role": folder.ancestors_link_role,
-                    "computed_link_reach": folder.computed_link_reach,
-                    "computed_link_role": folder.computed_link_role,
-                    "created_at": folder.created_at.isoformat().replace("+00:00", "Z"),
-                    "creator": {
-                        "id": str(folder.creator.id),
-                        "full_name": folder.creator.full_name,
-                        "short_name": folder.creator.short_name,
-                    },
-                    "deleted_at": None,
-                    "depth": 1,
-                    "description": None,
-                    "filename": None,
-                    "hard_delete_at": None,
                     "id": str(folder.id),
-                    "is_wopi_supported": False,
-                    "link_reach": folder.link_reach,
-                    "link_role": folder.link_role,
-                    "main_workspace": False,
-                    "mimetype": None,
-                    "nb_accesses": 1,
-                    "numchild": 3,
-                    "numchild_folder": 0,
-                    "path": str(folder.path),
-                    "size": None,
                     "title": folder.title,
+                    "path": str(folder.path),
+                    "depth": 1,
                     "type": "folder",
-                    "updated_at": folder.updated_at.isoformat().replace("+00:00", "Z"),
-                    "upload_state": None,
-                    "url": None,
-                    "url_permalink": None,
-                    "url_preview": None,
-                    "user_role": folder_access.role,
+                    "main_workspace": False,
                 },
             ],
         },
@@ -157,6 +129,7 @@ def test_api_items_search_authenticated_fulltext_query(indexer_settings):
             "description": None,
             "filename": item_c.filename,
             "hard_delete_at": None,
+            "subtree_operation": None,
             "id": str(item_c.id),
             "is_favorite": False,
             "is_wopi_supported": False,
@@ -179,41 +152,12 @@ def test_api_items_search_authenticated_fulltext_query(indexer_settings):
             "user_role": folder_access.role,
             "parents": [
                 {
-                    "abilities": folder.get_abilities(user),
-                    "ancestors_link_reach": folder.ancestors_link_reach,
-                    "ancestors_link_role": folder.ancestors_link_role,
-                    "computed_link_reach": folder.computed_link_reach,
-                    "computed_link_role": folder.computed_link_role,
-                    "created_at": folder.created_at.isoformat().replace("+00:00", "Z"),
-                    "creator": {
-                        "id": str(folder.creator.id),
-                        "full_name": folder.creator.full_name,
-                        "short_name": folder.creator.short_name,
-                    },
-                    "deleted_at": None,
-                    "depth": 1,
-                    "description": None,
-                    "filename": None,
-                    "hard_delete_at": None,
                     "id": str(folder.id),
-                    "is_wopi_supported": False,
-                    "link_reach": folder.link_reach,
-                    "link_role": folder.link_role,
-                    "main_workspace": False,
-                    "mimetype": None,
-                    "nb_accesses": 1,
-                    "numchild": 3,
-                    "numchild_folder": 0,
-                    "path": str(folder.path),
-                    "size": None,
                     "title": folder.title,
+                    "path": str(folder.path),
+                    "depth": 1,
                     "type": "folder",
-                    "updated_at": folder.updated_at.isoformat().replace("+00:00", "Z"),
-                    "upload_state": None,
-                    "url": None,
-                    "url_permalink": None,
-                    "url_preview": None,
-                    "user_role": folder_access.role,
+                    "main_workspace": False,
                 },
             ],
         },
@@ -511,3 +455,86 @@ def test_api_items_search_feature_disabled(indexer_settings):
     results = content.pop("results")
 
     assert [r["id"] for r in results] == [str(d.pk) for d in docs]
+
+
+def test_api_items_search_postgres_indexer(indexer_settings):
+    """
+    With the PostgreSQL indexer, results should be ranked by relevance and restricted
+    to the items the user can access.
+    """
+    indexer_settings.SEARCH_INDEXER_CLASS = "core.services.search_indexers.PostgresSearchIndexer"
+    indexer_settings.FEATURES_INDEXED_SEARCH = True
+
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, users=[user])
+    in_description = factories.ItemFactory(
+        parent=folder,
+        title="report",
+        description="quarterly budget",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+    in_title = factories.ItemFactory(
+        parent=folder,
+        title="Budget prévisionnel",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+    factories.ItemFactory(
+        parent=folder,
+        title="unrelated",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+    # Not accessible to the user
+    factories.ItemFactory(
+        title="budget",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+
+    get_file_indexer().index()
+
+    response = client.get("/api/v1.0/items/search/?title=budget")
+
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["results"]] == [
+        str(in_title.pk),
+        str(in_description.pk),
+    ]
+
+
+def test_api_items_search_postgres_indexer_pagination(indexer_settings):
+    """
+    With the PostgreSQL indexer, the results should be paginated in the database
+    and only the items of the requested page loaded.
+    """
+    indexer_settings.SEARCH_INDEXER_CLASS = "core.services.search_indexers.PostgresSearchIndexer"
+    indexer_settings.FEATURES_INDEXED_SEARCH = True
+
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, users=[user])
+    factories.ItemFactory.create_batch(
+        25,
+        parent=folder,
+        title="budget",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+    )
+
+    indexer = get_file_indexer()
+    indexer.index()
+    expected = [result["_id"] for result in indexer.search("budget", token=None)]
+
+    response = client.get("/api/v1.0/items/search/?title=budget&page=2")
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 25
+    assert [r["id"] for r in content["results"]] == expected[20:25]
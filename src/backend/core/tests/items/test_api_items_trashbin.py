@@ -103,6 +103,7 @@ def test_api_items_trashbin_format(settings):
         "size": None,
         "description": None,
         "hard_delete_at": ((now + timedelta(days=30)).isoformat()),
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -336,3 +337,41 @@ def test_api_items_trashbin_distinct():
     content = response.json()
     assert len(content["results"]) == 1
     assert content["results"][0]["id"] == str(item.id)
+
+
+def test_api_items_trashbin_subtree_operation(settings):
+    """
+    The items whose descendants are still being deleted in the background are
+    listed with their operation in progress.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    user = factories.UserFactory()
+    client = APIClient()
+    client.force_login(user)
+
+    large, small = factories.ItemFactory.create_batch(
+        2, users=[(user, "owner")], type=models.ItemTypeChoices.FOLDER
+    )
+    factories.ItemFactory.create_batch(3, parent=large, type=models.ItemTypeChoices.FILE)
+    factories.ItemFactory(parent=small, type=models.ItemTypeChoices.FILE)
+
+    # The on commit callbacks are not executed, the task is not run
+    tree_task = large.soft_delete()
+    assert small.soft_delete() is None
+
+    response = client.get("/api/v1.0/items/trashbin/")
+
+    assert response.status_code == 200
+    operations = {
+        result["id"]: result["subtree_operation"] for result in response.json()["results"]
+    }
+    assert operations == {str(large.id): "soft_delete", str(small.id): None}
+
+    tree_task.process(10)
+
+    response = client.get("/api/v1.0/items/trashbin/")
+
+    operations = {
+        result["id"]: result["subtree_operation"] for result in response.json()["results"]
+    }
+    assert operations == {str(large.id): None, str(small.id): None}
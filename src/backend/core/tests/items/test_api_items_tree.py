@@ -179,6 +179,7 @@ def test_items_api_anonymous_to_a_public_tree_structure():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -218,6 +219,7 @@ def test_items_api_anonymous_to_a_public_tree_structure():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -251,6 +253,7 @@ def test_items_api_anonymous_to_a_public_tree_structure():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -410,6 +413,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                         "description": None,
                         "deleted_at": None,
                         "hard_delete_at": None,
+                        "subtree_operation": None,
                         "is_wopi_supported": False,
                     },
                     {
@@ -463,6 +467,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                                 "description": None,
                                 "deleted_at": None,
                                 "hard_delete_at": None,
+                                "subtree_operation": None,
                                 "is_wopi_supported": False,
                             },
                         ],
@@ -496,6 +501,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                         "description": None,
                         "deleted_at": None,
                         "hard_delete_at": None,
+                        "subtree_operation": None,
                         "is_wopi_supported": False,
                     },
                 ],
@@ -529,6 +535,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -568,6 +575,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -607,6 +615,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
@@ -640,6 +649,7 @@ def test_items_api_tree_authenticated_direct_access(django_assert_num_queries):
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "is_wopi_supported": False,
     }
 
@@ -762,6 +772,7 @@ def test_api_items_tree_authenticated_with_access_authenticated():
         "description": None,
         "deleted_at": None,
         "hard_delete_at": None,
+        "subtree_operation": None,
         "children": [
             {
                 "abilities": level2_1.get_abilities(user),
@@ -800,6 +811,7 @@ def test_api_items_tree_authenticated_with_access_authenticated():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
             {
@@ -839,6 +851,7 @@ def test_api_items_tree_authenticated_with_access_authenticated():
                 "description": None,
                 "deleted_at": None,
                 "hard_delete_at": None,
+                "subtree_operation": None,
                 "is_wopi_supported": False,
             },
         ],
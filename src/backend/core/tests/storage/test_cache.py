@@ -2,7 +2,9 @@
 
 from unittest import mock
 
-from core.storage.cache import invalidate_storage_used_cache
+from django.core.cache import cache
+
+from core.storage.cache import get_storage_used_cache_key, invalidate_storage_used_cache
 
 
 def test_invalidate_storage_used_cache_invalidates_entitlements():
@@ -19,3 +21,37 @@ def test_invalidate_storage_used_cache_without_user_ids():
         invalidate_storage_used_cache([None])
 
     mock_get_backend.assert_not_called()
+
+
+def test_invalidate_storage_used_cache_deletes_keys():
+    """The storage used of each given user should be deleted from the cache."""
+    cache.set(get_storage_used_cache_key("user-1"), 10)
+    cache.set(get_storage_used_cache_key("user-2"), 20)
+
+    with mock.patch("core.entitlements.get_entitlements_backend"):
+        invalidate_storage_used_cache(["user-1", "user-1"])
+
+    assert cache.get(get_storage_used_cache_key("user-1")) is None
+    assert cache.get(get_storage_used_cache_key("user-2")) == 20
+
+
+def test_invalidate_storage_used_cache_batches():
+    """
+    The storage used and the entitlements should be invalidated by batches of
+    INVALIDATION_BATCH_SIZE users.
+    """
+    with (
+        mock.patch("core.storage.cache.INVALIDATION_BATCH_SIZE", 2),
+        mock.patch("core.entitlements.get_entitlements_backend") as mock_get_backend,
+        mock.patch.object(cache, "delete_many") as delete_many,
+    ):
+        invalidate_storage_used_cache(["user-1", "user-2", "user-3"])
+
+    assert delete_many.call_args_list == [
+        mock.call([get_storage_used_cache_key("user-1"), get_storage_used_cache_key("user-2")]),
+        mock.call([get_storage_used_cache_key("user-3")]),
+    ]
+    assert mock_get_backend.return_value.invalidate_cache.call_args_list == [
+        mock.call(["user-1", "user-2"]),
+        mock.call(["user-3"]),
+    ]
@@ -0,0 +1,182 @@
+"""Test the task processing the descendants of an item in the background."""
+
+from unittest import mock
+from uuid import uuid4
+
+from django.db import DatabaseError
+
+import pytest
+
+from core import factories, models
+from core.tasks.item import process_item_tree_task
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_move(settings, nb_files=3):
+    """Move a folder holding `nb_files` files, rewriting their paths in the background."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    files = factories.ItemFactory.create_batch(
+        nb_files, parent=item, type=models.ItemTypeChoices.FILE
+    )
+    target = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+
+    # The on commit callbacks are not executed, the task is not run yet
+    tree_task = item.move(target)
+
+    return tree_task, item, files
+
+
+def test_process_item_tree_task_move_by_chunks(settings):
+    """The paths of the descendants are rewritten by chunks and the progress is reported."""
+    tree_task, item, files = _create_move(settings)
+    settings.ITEM_SUBTREE_CHUNK_SIZE = 2
+
+    # The item itself is already moved, its descendants are not yet
+    item.refresh_from_db()
+    assert item.depth == 2
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.PENDING
+    assert item.descendants().count() == 0
+
+    calls = []
+    process_chunk = models.ItemTreeTask.process_chunk
+
+    def record_then_process(self, chunk_size, after=None):
+        calls.append((chunk_size, after))
+        return process_chunk(self, chunk_size, after)
+
+    with mock.patch.object(models.ItemTreeTask, "process_chunk", record_then_process):
+        process_item_tree_task(tree_task.id)
+
+    # Two chunks of descendants, then a last call finding none left
+    assert calls == [
+        (2, None),
+        (2, sorted(file.id for file in files)[1]),
+        (2, sorted(file.id for file in files)[2]),
+    ]
+
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.COMPLETED
+    assert tree_task.total == tree_task.done == 3
+    assert tree_task.progress == 100
+
+    assert item.descendants().count() == 3
+    for file in files:
+        file.refresh_from_db()
+        assert file.parent() == item
+
+
+def test_process_item_tree_task_resume(settings):
+    """A task interrupted after a chunk resumes with the descendants left."""
+    tree_task, item, _files = _create_move(settings)
+
+    assert tree_task.process_chunk(2) is not None
+    tree_task.refresh_from_db()
+    assert tree_task.done == 2
+    assert item.descendants().count() == 2
+
+    tree_task.status = models.ItemTreeTaskStatusChoices.FAILED
+    tree_task.total = 3
+    tree_task.save()
+
+    process_item_tree_task(tree_task.id)
+
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.COMPLETED
+    assert tree_task.done == 3
+    assert item.descendants().count() == 3
+
+
+def test_process_item_tree_task_descendant_added_meanwhile(settings):
+    """The descendants added behind the cursor meanwhile are processed as well."""
+    tree_task, item, files = _create_move(settings, nb_files=2)
+    settings.ITEM_SUBTREE_CHUNK_SIZE = 1
+    old_parent_path = str(files[0].path[:-1])
+    process_chunk = models.ItemTreeTask.process_chunk
+
+    def add_descendant_then_process(self, chunk_size, after=None):
+        last_id = process_chunk(self, chunk_size, after)
+        if last_id is None and not models.Item.objects.filter(title="late").exists():
+            # Created under the previous path of the item after the last chunk
+            late = factories.ItemFactory(title="late", type=models.ItemTypeChoices.FOLDER)
+            models.Item.objects.filter(id=late.id).update(path=f"{old_parent_path}.{late.id!s}")
+        return last_id
+
+    with mock.patch.object(models.ItemTreeTask, "process_chunk", add_descendant_then_process):
+        process_item_tree_task(tree_task.id)
+
+    assert item.descendants().count() == 3
+    assert models.Item.objects.filter(path__descendants=old_parent_path).count() == 0
+
+
+def test_process_item_tree_task_completed(settings):
+    """A completed task is not processed again."""
+    tree_task, _item, _files = _create_move(settings)
+    tree_task.status = models.ItemTreeTaskStatusChoices.COMPLETED
+    tree_task.save()
+
+    with mock.patch.object(models.ItemTreeTask, "process") as process:
+        process_item_tree_task(tree_task.id)
+
+    process.assert_not_called()
+
+
+def test_process_item_tree_task_unknown():
+    """Nothing is done for an unknown task."""
+    with mock.patch.object(models.ItemTreeTask, "process") as process:
+        process_item_tree_task(uuid4())
+
+    process.assert_not_called()
+
+
+def test_process_item_tree_task_database_error(settings):
+    """A database error marks the task as failed and retries it."""
+    tree_task, _item, _files = _create_move(settings)
+
+    with (
+        mock.patch.object(
+            models.ItemTreeTask, "process_chunk", side_effect=DatabaseError("timeout")
+        ),
+        mock.patch.object(process_item_tree_task, "retry", side_effect=RuntimeError) as retry,
+        pytest.raises(RuntimeError),
+    ):
+        process_item_tree_task(tree_task.id)
+
+    retry.assert_called_once()
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.FAILED
+    assert tree_task.error_details == "timeout"
+
+
+def test_process_item_tree_task_unexpected_error(settings):
+    """Any other error marks the task as failed without retrying it."""
+    tree_task, _item, _files = _create_move(settings)
+
+    with (
+        mock.patch.object(models.ItemTreeTask, "process_chunk", side_effect=ValueError("bug")),
+        mock.patch.object(process_item_tree_task, "retry") as retry,
+        pytest.raises(ValueError),
+    ):
+        process_item_tree_task(tree_task.id)
+
+    retry.assert_not_called()
+    tree_task.refresh_from_db()
+    assert tree_task.status == models.ItemTreeTaskStatusChoices.FAILED
+    assert tree_task.error_details == "bug"
+
+
+def test_process_item_tree_task_hard_delete_purges(settings):
+    """The item is purged once its descendants are marked as hard deleted."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(2, parent=item, type=models.ItemTypeChoices.FILE)
+    item.soft_delete().process(10)
+    tree_task = item.hard_delete()
+
+    with mock.patch("core.tasks.item.process_item_purge.delay") as purge:
+        process_item_tree_task(tree_task.id)
+
+    purge.assert_called_once_with(item.id)
+    assert not item.descendants().filter(hard_deleted_at__isnull=True).exists()
@@ -0,0 +1,257 @@
+"""Tests for the email outbox tasks."""
+
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+import pytest
+
+from core import factories, models
+from core.tasks.email import (
+    get_email_stats,
+    process_email_outbox_batch,
+    process_email_outbox_task,
+    queue_invitation_emails,
+)
+
+pytestmark = pytest.mark.django_db
+
+SEND_MESSAGES = "django.core.mail.backends.locmem.EmailBackend.send_messages"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """The email metrics are stored in the cache."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_queue_invitation_emails_send_after_commit(django_capture_on_commit_callbacks):
+    """The emails are recorded in the outbox and sent once the transaction is committed."""
+    item = factories.ItemFactory()
+    sender = factories.UserFactory()
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        queue_invitation_emails(
+            item,
+            [("guest1@example.com", "reader"), ("guest2@example.com", "editor")],
+            sender,
+            "en",
+        )
+
+    assert models.InvitationEmailOutbox.objects.count() == 2
+    # pylint: disable-next=no-member
+    assert len(mail.outbox) == 0
+
+    for callback in callbacks:
+        callback()
+
+    assert not models.InvitationEmailOutbox.objects.exists()
+    # pylint: disable-next=no-member
+    assert [email.to for email in mail.outbox] == [
+        ["guest1@example.com"],
+        ["guest2@example.com"],
+    ]
+    # pylint: disable-next=no-member
+    assert "&quot;editor&quot;" in mail.outbox[1].body
+    # pylint: disable-next=no-member
+    assert mail.outbox[0].alternatives[0][1] == "text/html"
+    stats = get_email_stats()
+    assert stats["sent"] == 2
+    assert stats["errors"] == 0
+    assert stats["latency_ms"] is not None
+
+
+def test_queue_invitation_emails_no_email_host(settings, django_capture_on_commit_callbacks):
+    """Nothing is queued when EMAIL_HOST is not configured."""
+    settings.EMAIL_HOST = None
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        queue_invitation_emails(
+            factories.ItemFactory(),
+            [("guest@example.com", "reader")],
+            factories.UserFactory(),
+            "en",
+        )
+
+    assert not models.InvitationEmailOutbox.objects.exists()
+    assert callbacks == []
+
+
+def test_process_email_outbox_batch_renders_once_per_role():
+    """The email of an item is rendered once per role, sender and language."""
+    item = factories.ItemFactory()
+    sender = factories.UserFactory()
+    queue_invitation_emails(
+        item,
+        [(f"guest{index}@example.com", ["reader", "editor"][index % 2]) for index in range(10)],
+        sender,
+        "en",
+    )
+
+    with (
+        mail.get_connection() as connection,
+        mock.patch.object(
+            models.Item, "render_invitation_email", wraps=item.render_invitation_email
+        ) as render,
+    ):
+        assert process_email_outbox_batch(connection, batch_size=6) == 6
+        assert render.call_count == 2
+
+    assert models.InvitationEmailOutbox.objects.count() == 4
+    # pylint: disable-next=no-member
+    assert len(mail.outbox) == 6
+
+
+def test_process_email_outbox_batch_skips_emails_not_due():
+    """Emails postponed after a failure are not sent before their next attempt."""
+    item = factories.ItemFactory()
+    sender = factories.UserFactory()
+    queue_invitation_emails(item, [("guest@example.com", "reader")], sender, "en")
+    models.InvitationEmailOutbox.objects.update(send_after=timezone.now() + timedelta(minutes=1))
+
+    with mail.get_connection() as connection:
+        assert process_email_outbox_batch(connection) == 0
+
+    assert models.InvitationEmailOutbox.objects.count() == 1
+
+
+def test_process_email_outbox_task_failure_backoff(settings):
+    """
+    A failed email is retried later with an exponential backoff, the emails sent
+    before it are removed from the outbox.
+    """
+    settings.EMAIL_OUTBOX_RETRY_COUNTDOWN = 60
+    item = factories.ItemFactory()
+    sender = factories.UserFactory()
+    queue_invitation_emails(
+        item,
+        [("guest1@example.com", "reader"), ("guest2@example.com", "reader")],
+        sender,
+        "en",
+    )
+
+    with (
+        mock.patch(SEND_MESSAGES, side_effect=[1, smtplib.SMTPException("down")]),
+        mock.patch.object(process_email_outbox_task, "apply_async") as apply_async,
+    ):
+        process_email_outbox_task()
+
+    outbox_email = models.InvitationEmailOutbox.objects.get()
+    assert outbox_email.email == "guest2@example.com"
+    assert outbox_email.attempts == 1
+    assert outbox_email.send_after > timezone.now() + timedelta(seconds=50)
+    apply_async.assert_called_once()
+    assert 50 < apply_async.call_args.kwargs["countdown"] <= 60
+
+    models.InvitationEmailOutbox.objects.update(send_after=timezone.now())
+    with (
+        mock.patch(SEND_MESSAGES, side_effect=OSError("refused")),
+        mock.patch.object(process_email_outbox_task, "apply_async"),
+    ):
+        process_email_outbox_task()
+
+    outbox_email.refresh_from_db()
+    assert outbox_email.attempts == 2
+    assert outbox_email.send_after > timezone.now() + timedelta(seconds=110)
+    stats = get_email_stats()
+    assert stats["sent"] == 1
+    assert stats["errors"] == 2
+    assert stats["abandoned"] == 0
+
+
+def test_process_email_outbox_task_abandoned(settings):
+    """An email is removed from the outbox once it reached the max attempts."""
+    settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+    item = factories.ItemFactory()
+    queue_invitation_emails(item, [("guest@example.com", "reader")], factories.UserFactory(), "en")
+    models.InvitationEmailOutbox.objects.update(attempts=1)
+
+    with (
+        mock.patch(SEND_MESSAGES, side_effect=smtplib.SMTPException("down")),
+        mock.patch.object(process_email_outbox_task, "apply_async") as apply_async,
+    ):
+        process_email_outbox_task()
+
+    assert not models.InvitationEmailOutbox.objects.exists()
+    apply_async.assert_not_called()
+    assert get_email_stats()["abandoned"] == 1
+
+
+def test_process_email_outbox_batch_sends_outside_transaction():
+    """
+    The emails are leased in a first transaction before being sent, and removed
+    in a second one, so they are not locked while talking to the email server.
+    """
+    item = factories.ItemFactory()
+    queue_invitation_emails(item, [("guest@example.com", "reader")], factories.UserFactory(), "en")
+
+    def send_messages(messages):
+        assert models.InvitationEmailOutbox.objects.get().processing_at is not None
+        assert mock_transaction.atomic.call_count == 1
+        return len(messages)
+
+    with (
+        mail.get_connection() as connection,
+        mock.patch(SEND_MESSAGES, side_effect=send_messages),
+        mock.patch("core.tasks.email.transaction", wraps=transaction) as mock_transaction,
+    ):
+        assert process_email_outbox_batch(connection) == 1
+
+    assert mock_transaction.atomic.call_count == 2
+    assert not models.InvitationEmailOutbox.objects.exists()
+
+
+def test_process_email_outbox_batch_failure_releases_lease():
+    """
+    The emails not sent after a failure are released to be claimed again, the
+    failed one is postponed.
+    """
+    item = factories.ItemFactory()
+    queue_invitation_emails(
+        item,
+        [("guest1@example.com", "reader"), ("guest2@example.com", "reader")],
+        factories.UserFactory(),
+        "en",
+    )
+
+    with (
+        mail.get_connection() as connection,
+        mock.patch(SEND_MESSAGES, side_effect=smtplib.SMTPException("down")),
+    ):
+        assert process_email_outbox_batch(connection) is None
+
+    failed, released = models.InvitationEmailOutbox.objects.order_by("id")
+    assert failed.attempts == 1
+    assert failed.processing_at is None
+    assert released.attempts == 0
+    assert released.processing_at is None
+
+    with mail.get_connection() as connection:
+        assert process_email_outbox_batch(connection) == 1
+    assert models.InvitationEmailOutbox.objects.get() == failed
+
+
+def test_process_email_outbox_batch_lease_expired(settings):
+    """Emails leased by a worker are claimed again once their lease expired."""
+    settings.EMAIL_OUTBOX_LEASE_TIMEOUT = 60
+    item = factories.ItemFactory()
+    queue_invitation_emails(item, [("guest@example.com", "reader")], factories.UserFactory(), "en")
+    models.InvitationEmailOutbox.objects.update(processing_at=timezone.now())
+
+    with mail.get_connection() as connection:
+        assert process_email_outbox_batch(connection) == 0
+
+    models.InvitationEmailOutbox.objects.update(
+        processing_at=timezone.now() - timedelta(seconds=61)
+    )
+    with mail.get_connection() as connection:
+        assert process_email_outbox_batch(connection) == 1
+
+    assert not models.InvitationEmailOutbox.objects.exists()
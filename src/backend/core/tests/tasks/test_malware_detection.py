@@ -0,0 +1,109 @@
+"""Test the coalesced malware analyses of item files."""
+
+from unittest import mock
+
+import pytest
+from lasuite.malware_detection import malware_detection
+
+from core import factories
+from core.models import ItemTypeChoices, ItemUploadStateChoices
+from core.tasks.malware_detection import (
+    analyse_item_file,
+    get_analysis_stats,
+    get_analysis_version,
+    schedule_item_file_analysis,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def _create_file():
+    return factories.ItemFactory(
+        type=ItemTypeChoices.FILE,
+        filename="test.txt",
+        update_upload_state=ItemUploadStateChoices.READY,
+    )
+
+
+def test_schedule_item_file_analysis_coalesce_burst(settings):
+    """Requests received during the countdown should be collapsed into a single analysis."""
+    settings.MALWARE_DETECTION_COALESCE_COUNTDOWN = 30
+    item = _create_file()
+
+    with (
+        mock.patch.object(analyse_item_file, "apply_async") as mock_apply_async,
+        mock.patch.object(malware_detection, "analyse_file") as mock_analyse_file,
+    ):
+        for _ in range(3):
+            schedule_item_file_analysis(item)
+
+        mock_apply_async.assert_called_once_with(args=[str(item.id)], countdown=30)
+        mock_analyse_file.assert_not_called()
+        assert get_analysis_version(item.id) == 3
+        assert get_analysis_stats()["queue_depth"] == 1
+
+        analyse_item_file(str(item.id))
+
+    mock_analyse_file.assert_called_once_with(item.file_key, item_id=item.id, analysis_version=3)
+    assert get_analysis_stats() == {
+        "queue_depth": 0,
+        "requested": 3,
+        "submitted": 1,
+        "coalescing_ratio": 3,
+    }
+
+
+def test_schedule_item_file_analysis_after_trailing_analysis(settings):
+    """A request received once the trailing analysis started should schedule a new one."""
+    settings.MALWARE_DETECTION_COALESCE_COUNTDOWN = 30
+    item = _create_file()
+
+    with (
+        mock.patch.object(analyse_item_file, "apply_async") as mock_apply_async,
+        mock.patch.object(malware_detection, "analyse_file"),
+    ):
+        schedule_item_file_analysis(item)
+        analyse_item_file(str(item.id))
+        schedule_item_file_analysis(item)
+
+    assert mock_apply_async.call_count == 2
+
+
+def test_schedule_item_file_analysis_per_item(settings):
+    """Requests for different items should not be collapsed."""
+    settings.MALWARE_DETECTION_COALESCE_COUNTDOWN = 30
+    item1 = _create_file()
+    item2 = _create_file()
+
+    with mock.patch.object(analyse_item_file, "apply_async") as mock_apply_async:
+        schedule_item_file_analysis(item1)
+        schedule_item_file_analysis(item2)
+
+    assert mock_apply_async.call_count == 2
+
+
+def test_schedule_item_file_analysis_disabled(settings):
+    """With a countdown of 0, each request should be submitted immediately."""
+    settings.MALWARE_DETECTION_COALESCE_COUNTDOWN = 0
+    item = _create_file()
+
+    with (
+        mock.patch.object(analyse_item_file, "apply_async") as mock_apply_async,
+        mock.patch.object(malware_detection, "analyse_file") as mock_analyse_file,
+    ):
+        schedule_item_file_analysis(item)
+        schedule_item_file_analysis(item)
+
+    mock_apply_async.assert_not_called()
+    assert mock_analyse_file.call_args_list == [
+        mock.call(item.file_key, item_id=item.id, analysis_version=1),
+        mock.call(item.file_key, item_id=item.id, analysis_version=2),
+    ]
+
+
+def test_analyse_item_file_deleted_item():
+    """The analysis of an item deleted in the meantime should be skipped."""
+    with mock.patch.object(malware_detection, "analyse_file") as mock_analyse_file:
+        analyse_item_file("00000000-0000-0000-0000-000000000000")
+
+    mock_analyse_file.assert_not_called()
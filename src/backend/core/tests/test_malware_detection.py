@@ -1,11 +1,14 @@
 """Test malware detection callback"""
 
+from unittest import mock
+
 import pytest
 from lasuite.malware_detection.enums import ReportStatus
 
 from core import factories
 from core.malware_detection import malware_detection_callback
 from core.models import ItemTypeChoices, ItemUploadStateChoices
+from core.tasks.malware_detection import analyse_item_file, schedule_item_file_analysis
 
 pytestmark = pytest.mark.django_db
 
@@ -120,3 +123,40 @@ def test_malware_detection_callback_item_does_not_exist(caplog):
             item_id=1,
         )
         assert "Item 1 does not exist anymore" in caplog.text
+
+
+def test_malware_detection_callback_superseded_analysis(settings, caplog):
+    """The result of an analysis superseded by a more recent request should be discarded."""
+    settings.MALWARE_DETECTION_COALESCE_COUNTDOWN = 30
+    item = factories.ItemFactory(
+        update_upload_state=ItemUploadStateChoices.READY,
+        type=ItemTypeChoices.FILE,
+        filename="test.txt",
+    )
+    with mock.patch.object(analyse_item_file, "apply_async"):
+        schedule_item_file_analysis(item)
+        schedule_item_file_analysis(item)
+
+    with caplog.at_level("INFO", logger="core.malware_detection"):
+        malware_detection_callback(
+            item.file_key,
+            ReportStatus.UNSAFE,
+            error_info={"error": "test", "error_code": 4001},
+            item_id=item.id,
+            analysis_version=1,
+        )
+        assert f"Discard result of superseded analysis 1 of item {item.id}" in caplog.text
+
+    item.refresh_from_db()
+    assert item.upload_state == ItemUploadStateChoices.READY
+
+    malware_detection_callback(
+        item.file_key,
+        ReportStatus.UNSAFE,
+        error_info={"error": "test", "error_code": 4001},
+        item_id=item.id,
+        analysis_version=2,
+    )
+
+    item.refresh_from_db()
+    assert item.upload_state == ItemUploadStateChoices.SUSPICIOUS
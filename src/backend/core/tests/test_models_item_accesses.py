@@ -470,3 +470,41 @@ def test_models_item_access_get_abilities_explicit():
         "retrieve": True,
         "set_role_to": ["editor", "administrator", "owner"],
     }
+
+
+def test_models_item_accesses_annotate_max_ancestors_role(django_assert_num_queries):
+    """
+    The max ancestors role of the targeted user or team and the item giving it should
+    be annotated in the query fetching the accesses.
+    """
+    root = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    parent = factories.ItemFactory(parent=root, type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    user = factories.UserFactory()
+    factories.UserItemAccessFactory(item=root, user=user, role="administrator")
+    factories.UserItemAccessFactory(item=parent, user=user, role="editor")
+    factories.UserItemAccessFactory(item=parent, role="owner")
+    factories.TeamItemAccessFactory(item=root, team="lasuite", role="reader")
+    factories.TeamItemAccessFactory(item=parent, team="lasuite", role="editor")
+    user_access = factories.UserItemAccessFactory(item=item, user=user, role="owner")
+    team_access = factories.TeamItemAccessFactory(item=item, team="lasuite", role="owner")
+    other_access = factories.UserItemAccessFactory(item=item, role="reader")
+
+    with django_assert_num_queries(1):
+        accesses = {
+            access.id: access
+            for access in models.ItemAccess.objects.filter(item=item).annotate_max_ancestors_role()
+        }
+        assert accesses[user_access.id].max_ancestors_role == "administrator"
+        assert accesses[user_access.id].max_ancestors_role_item_id == root.id
+        assert accesses[team_access.id].max_ancestors_role == "editor"
+        assert accesses[team_access.id].max_ancestors_role_item_id == parent.id
+        assert accesses[other_access.id].max_ancestors_role is None
+        assert accesses[other_access.id].max_ancestors_role_item_id is None
+
+    # The annotations match the values computed on the instance
+    for access_id, access in accesses.items():
+        assert (
+            models.ItemAccess.objects.get(pk=access_id).max_ancestors_role
+            == access.max_ancestors_role
+        )
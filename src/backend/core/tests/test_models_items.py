@@ -18,6 +18,7 @@ import pytest
 from lasuite.drf.models.choices import LinkReachChoices
 
 from core import factories, models
+from core.utils.item_title import manage_unique_title
 
 pytestmark = pytest.mark.django_db
 
@@ -1029,7 +1030,30 @@ def test_models_items__email_invitation__skipped_when_email_host_missing(
     assert caplog.records[0].message == "EMAIL_HOST host is not set, skipping email sending"
 
 
-# item number of accesses
+def test_models_items__render_invitation_email():
+    """
+    The rendered invitation email should be the one sent by send_invitation_email.
+    """
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    sender = factories.UserFactory(full_name="Test Sender", email="sender@example.com")
+
+    subject, msg_plain, msg_html = item.render_invitation_email(
+        models.RoleChoices.READER, sender, "en"
+    )
+
+    email_content = " ".join(msg_plain.split())
+    assert (
+        f"Test Sender (sender@example.com) invited you with the role &quot;reader&quot; "
+        f"on the following item: {item.title}" in email_content
+    )
+
+    item.send_invitation_email("guest@example.com", models.RoleChoices.READER, sender, "en")
+
+    # pylint: disable-next=no-member
+    email = mail.outbox[0]
+    assert email.subject == subject
+    assert email.body == msg_plain
+    assert email.alternatives[0][0] == msg_html
 
 
 def test_models_items_nb_accesses_cache_is_set_and_retrieved(
@@ -1037,11 +1061,15 @@ def test_models_items_nb_accesses_cache_is_set_and_retrieved(
 ):
     """Test that nb_accesses is cached after the first computation."""
     item = factories.ItemFactory()
-    key = f"item_{item.id!s}_nb_accesses"
+    key = item.get_nb_accesses_cache_key()
     nb_accesses = random.randint(1, 4)
     factories.UserItemAccessFactory.create_batch(nb_accesses, item=item)
     factories.UserItemAccessFactory()  # An unrelated access should not be counted
 
+    # Creating the accesses renewed the generation of the accesses of the item
+    assert item.get_nb_accesses_cache_key() != key
+    key = item.get_nb_accesses_cache_key()
+
     # Initially, the nb_accesses should not be cached
     assert cache.get(key) is None
 
@@ -1056,6 +1084,7 @@ def test_models_items_nb_accesses_cache_is_set_and_retrieved(
 
     # The cache value should be invalidated when a item access is created
     models.ItemAccess.objects.create(item=item, user=factories.UserFactory(), role="reader")
+    key = item.get_nb_accesses_cache_key()
     assert cache.get(key) is None  # Cache should be invalidated
     with django_assert_num_queries(1):
         new_nb_accesses = item.nb_accesses
@@ -1068,15 +1097,15 @@ def test_models_items_nb_accesses_cache_is_invalidated_on_access_removal(
 ):
     """Test that the cache is invalidated when an item access is deleted."""
     item = factories.ItemFactory()
-    key = f"item_{item.id!s}_nb_accesses"
     access = factories.UserItemAccessFactory(item=item)
 
     # Initially, the nb_accesses should be cached
     assert item.nb_accesses == 1
-    assert cache.get(key) == 1
+    assert cache.get(item.get_nb_accesses_cache_key()) == 1
 
     # Remove the access and check if cache is invalidated
     access.delete()
+    key = item.get_nb_accesses_cache_key()
     assert cache.get(key) is None  # Cache should be invalidated
 
     # Recompute the nb_accesses (this should trigger a cache set)
@@ -1086,6 +1115,78 @@ def test_models_items_nb_accesses_cache_is_invalidated_on_access_removal(
     assert cache.get(key) == 0  # Cache should now contain the new value
 
 
+def test_models_items_nb_accesses_cache_is_invalidated_on_descendants(
+    django_assert_num_queries,
+):
+    """
+    An access change on an item invalidates the cache of its descendants, the cache
+    of the other items is kept.
+    """
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    child = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    grandchild = factories.ItemFactory(parent=child, type=models.ItemTypeChoices.FILE)
+    sibling = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FILE)
+    factories.UserItemAccessFactory(item=parent)
+    factories.UserItemAccessFactory(item=sibling)
+
+    assert grandchild.nb_accesses == 1
+    assert sibling.nb_accesses == 2
+    sibling_key = sibling.get_nb_accesses_cache_key()
+
+    factories.UserItemAccessFactory(item=child)
+
+    with django_assert_num_queries(1):
+        assert grandchild.nb_accesses == 2
+    assert sibling.get_nb_accesses_cache_key() == sibling_key
+    with django_assert_num_queries(0):
+        assert sibling.nb_accesses == 2
+
+
+def test_models_items_nb_accesses_cache_new_generation(settings):
+    """
+    The generations missing from the cache are stored with a finite timeout along
+    with the number of accesses, which is not looked up in the cache beforehand.
+    """
+    settings.ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT = 3600
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent)
+    cache.clear()
+
+    with (
+        mock.patch.object(cache, "get", wraps=cache.get) as cache_get,
+        mock.patch.object(cache, "set_many", wraps=cache.set_many) as cache_set_many,
+    ):
+        assert item.nb_accesses == 0
+
+    key = item.get_nb_accesses_cache_key()
+    assert all(call.args[0] != key for call in cache_get.call_args_list)
+    cache_set_many.assert_called_once()
+    assert sorted(cache_set_many.call_args.args[0]) == sorted(
+        models.Item.get_nb_accesses_generation_cache_key(item_id) for item_id in item.path
+    )
+    assert cache_set_many.call_args.kwargs["timeout"] == 3600
+    assert cache.get(key) == 0
+
+
+def test_models_items_hard_delete_removes_nb_accesses_generations(
+    django_capture_on_commit_callbacks,
+):
+    """Hard deleting an item removes the generations of the accesses of its subtree."""
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    child = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FILE)
+    assert child.nb_accesses == 0
+    item.soft_delete()
+    item.refresh_from_db()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        item.hard_delete()
+
+    assert cache.get(models.Item.get_nb_accesses_generation_cache_key(parent.id)) is not None
+    assert cache.get(models.Item.get_nb_accesses_generation_cache_key(item.id)) is None
+    assert cache.get(models.Item.get_nb_accesses_generation_cache_key(child.id)) is None
+
+
 @pytest.mark.parametrize("item_type", models.ItemTypeChoices.values)
 def test_models_items_default_upload_state(item_type):
     """The default value for the upload_state field depends on the item type."""
@@ -1220,6 +1321,47 @@ def test_models_items_unique_title_in_current_path_soft_deleted():
     factories.ItemFactory(parent=parent, title="child1", type=models.ItemTypeChoices.FOLDER)
 
 
+def test_models_items_filter_parent_path():
+    """The items should be filtered on the path of their parent, the roots on an empty path."""
+    root = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    child = factories.ItemFactory(parent=root, type=models.ItemTypeChoices.FOLDER)
+    grandchild = factories.ItemFactory(parent=child, type=models.ItemTypeChoices.FOLDER)
+
+    assert list(models.Item.objects.filter_parent_path(root.path)) == [child]
+    assert list(models.Item.objects.filter_parent_path(child.path)) == [grandchild]
+    assert list(models.Item.objects.filter_parent_path("")) == [root]
+
+
+def test_models_items_manage_unique_title(django_assert_num_queries):
+    """
+    A title should be made unique among the siblings with the next available number,
+    in a single query.
+    """
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    for title in ["file.txt", "file_02.txt", "file_10.txt", "doc", "new_01"]:
+        factories.ItemFactory(parent=parent, title=title, type=models.ItemTypeChoices.FOLDER)
+    other_parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory(parent=other_parent, title="new", type=models.ItemTypeChoices.FOLDER)
+    siblings = models.Item.objects.filter_parent_path(parent.path)
+
+    with django_assert_num_queries(1):
+        assert manage_unique_title(siblings, "file.txt") == "file_11.txt"
+    with django_assert_num_queries(1):
+        assert manage_unique_title(siblings, "doc") == "doc_01"
+    with django_assert_num_queries(1):
+        assert manage_unique_title(siblings, "new") == "new"
+
+
+def test_models_items_unique_title_on_rename():
+    """Renaming an item should not conflict with its own title."""
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, title="a", type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory(parent=parent, title="b", type=models.ItemTypeChoices.FOLDER)
+
+    assert item.manage_unique_title("a") == "a"
+    assert item.manage_unique_title("b") == "b_01"
+
+
 def test_models_items_numchild_annotation():
     """The numchild property should return the number of children."""
     parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
@@ -1295,6 +1437,268 @@ def test_models_items_restore():
     assert item.ancestors_deleted_at == item.deleted_at
 
 
+def test_models_items_soft_delete_large_subtree_in_background(
+    settings, django_capture_on_commit_callbacks
+):
+    """
+    Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, the item is deleted right away
+    and its descendants are marked as deleted in the background.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    settings.ITEM_SUBTREE_CHUNK_SIZE = 2
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    children = factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+
+    with mock.patch("core.signals.process_item_tree_task.delay") as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            tree_task = item.soft_delete()
+
+    delay.assert_called_once_with(tree_task.id)
+    item.refresh_from_db()
+    assert item.deleted_at is not None
+    assert item.subtree_operation == "soft_delete"
+    assert tree_task.kind == "soft_delete"
+    assert tree_task.ancestors_deleted_at == item.deleted_at
+    assert all(
+        child.ancestors_deleted_at is None
+        for child in models.Item.objects.filter(id__in=[child.id for child in children])
+    )
+
+    # Nothing else can be done on the subtree until the task is completed
+    with pytest.raises(ValidationError) as excinfo:
+        item.restore()
+    assert excinfo.value.error_dict["deleted_at"][0].code == "item_restore_tree_task_in_progress"
+
+    tree_task.process(settings.ITEM_SUBTREE_CHUNK_SIZE)
+
+    item.refresh_from_db()
+    assert item.subtree_operation is None
+    for child in children:
+        child.refresh_from_db()
+        assert child.ancestors_deleted_at == item.deleted_at
+
+
+def test_models_items_restore_large_subtree_in_background(settings):
+    """
+    Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, the item is restored right away
+    and its descendants are restored in the background. The descendants deleted
+    before the item are not restored.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    children = factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    deleted_child = factories.ItemFactory(parent=item, type=models.ItemTypeChoices.FILE)
+    deleted_child.soft_delete()
+    item.soft_delete().process(10)
+
+    tree_task = item.restore()
+
+    item.refresh_from_db()
+    assert item.deleted_at is None
+    assert item.subtree_operation == "restore"
+    assert tree_task.kind == "restore"
+
+    tree_task.process(2)
+
+    item.refresh_from_db()
+    assert item.subtree_operation is None
+    for child in children:
+        child.refresh_from_db()
+        assert child.ancestors_deleted_at is None
+    deleted_child.refresh_from_db()
+    assert deleted_child.deleted_at is not None
+    assert deleted_child.ancestors_deleted_at == deleted_child.deleted_at
+
+
+def test_models_items_restore_supersedes_failed_soft_delete(settings):
+    """
+    Restoring an item whose soft delete failed in the background supersedes it:
+    the descendants already marked as deleted are restored, the others are left
+    as they are and the soft delete is not resumed.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    children = factories.ItemFactory.create_batch(4, parent=item, type=models.ItemTypeChoices.FILE)
+    soft_delete_task = item.soft_delete()
+    soft_delete_task.process_chunk(2)
+    models.ItemTreeTask.objects.filter(pk=soft_delete_task.pk).update(
+        status=models.ItemTreeTaskStatusChoices.FAILED
+    )
+    item.refresh_from_db()
+    assert models.Item.objects.filter(ancestors_deleted_at=item.deleted_at).count() == 3
+
+    assert item.restore() is None
+
+    soft_delete_task.refresh_from_db()
+    assert soft_delete_task.status == models.ItemTreeTaskStatusChoices.COMPLETED
+    item.refresh_from_db()
+    assert item.deleted_at is None
+    assert item.subtree_operation is None
+    for child in children:
+        child.refresh_from_db()
+        assert child.ancestors_deleted_at is None
+
+    # A retry of the soft delete scheduled before the restore does nothing
+    soft_delete_task.process(10)
+    assert not models.Item.objects.filter(ancestors_deleted_at__isnull=False).exists()
+
+
+def test_models_items_restore_pending_soft_delete_not_superseded(settings):
+    """A soft delete still pending or processing is not superseded by a restore."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    soft_delete_task = item.soft_delete()
+
+    with pytest.raises(ValidationError) as excinfo:
+        item.restore()
+
+    assert excinfo.value.error_dict["deleted_at"][0].code == "item_restore_tree_task_in_progress"
+    soft_delete_task.refresh_from_db()
+    assert soft_delete_task.status == models.ItemTreeTaskStatusChoices.PENDING
+
+
+def test_models_items_tree_task_superseded_while_processed(settings):
+    """A task superseded between two chunks stops without completing its operation."""
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    soft_delete_task = item.soft_delete()
+    process_chunk = models.ItemTreeTask.process_chunk
+
+    def supersede_then_process(self, chunk_size, after=None):
+        if after is not None:
+            models.ItemTreeTask.objects.filter(pk=self.pk).update(
+                status=models.ItemTreeTaskStatusChoices.COMPLETED
+            )
+        return process_chunk(self, chunk_size, after)
+
+    with mock.patch.object(models.ItemTreeTask, "process_chunk", supersede_then_process):
+        assert soft_delete_task.process(1) is None
+
+    soft_delete_task.refresh_from_db()
+    assert soft_delete_task.done == 1
+    item.refresh_from_db()
+    assert item.subtree_operation == "soft_delete"
+
+
+def test_models_items_restore_moved_in_background(settings):
+    """
+    When restoring the item moves it in the background, its descendants are
+    restored by a second task processed after the move.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    root = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    parent = factories.ItemFactory(parent=root, type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    children = factories.ItemFactory.create_batch(3, parent=item, type=models.ItemTypeChoices.FILE)
+    item.soft_delete().process(10)
+    parent.soft_delete()
+
+    restore_task = item.restore()
+
+    move_task = models.ItemTreeTask.objects.get(item=item, kind="move")
+    assert restore_task.kind == "restore"
+    assert list(restore_task.get_previous_tasks()) == [move_task]
+    assert move_task.get_next_task() == restore_task
+
+    item.refresh_from_db()
+    assert item.parent() == root
+    assert item.subtree_operation == "move"
+
+    assert move_task.process(10) == restore_task
+    item.refresh_from_db()
+    assert item.subtree_operation == "restore"
+
+    restore_task.refresh_from_db()
+    restore_task.process(10)
+    item.refresh_from_db()
+    assert item.subtree_operation is None
+    for child in children:
+        child.refresh_from_db()
+        assert child.parent() == item
+        assert child.ancestors_deleted_at is None
+
+
+def test_models_items_move_in_background_ancestors_blocked(settings):
+    """
+    The ancestors of the previous position of an item moved in the background
+    cannot be deleted while its descendants are not all moved.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+    root = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    parent = factories.ItemFactory(parent=root, type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(2, parent=item, type=models.ItemTypeChoices.FILE)
+    target = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+
+    move_task = item.move(target)
+
+    with pytest.raises(ValidationError) as excinfo:
+        root.soft_delete()
+    assert excinfo.value.error_dict["deleted_at"][0].code == (
+        "item_soft_delete_tree_task_in_progress"
+    )
+
+    now = timezone.now()
+    models.Item.objects.filter(pk=root.pk).update(deleted_at=now, ancestors_deleted_at=now)
+    root.refresh_from_db()
+    with pytest.raises(ValidationError) as excinfo:
+        root.hard_delete()
+    assert excinfo.value.error_dict["hard_deleted_at"][0].code == (
+        "item_hard_delete_tree_task_in_progress"
+    )
+
+    move_task.process(10)
+    root.hard_delete()
+    assert root.hard_deleted_at is not None
+
+
+def test_models_items_move_in_background_read_along_the_move(settings):
+    """
+    The descendants of an item moved in the background are listed and inherit
+    their accesses from its new position before they are moved.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 1
+    parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(parent=parent, type=models.ItemTypeChoices.FOLDER)
+    children = factories.ItemFactory.create_batch(2, parent=item, type=models.ItemTypeChoices.FILE)
+    target = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    parent_user, target_user = factories.UserFactory.create_batch(2)
+    factories.UserItemAccessFactory(item=parent, user=parent_user, role="editor")
+    factories.UserItemAccessFactory(item=target, user=target_user, role="reader")
+
+    move_task = item.move(target)
+
+    child = models.Item.objects.get(pk=children[0].pk)
+    assert child.path[:2] == [str(parent.id), str(item.id)]
+    assert child.get_role(parent_user) is None
+    assert child.get_role(target_user) == "reader"
+    assert list(child.ancestors().order_by("path")) == [target, item]
+    assert set(item.children()) == set(children)
+    assert child.nb_accesses == 1
+
+    # The querysets of the items read along the same paths
+    assert models.Item.objects.annotate_user_roles(parent_user).get(pk=child.pk).user_roles == []
+    assert models.Item.objects.annotate_user_roles(target_user).get(pk=child.pk).user_roles == [
+        "reader"
+    ]
+    assert set(models.Item.objects.filter_subtrees([target.path])) == {target, item, *children}
+    assert set(models.Item.objects.filter_subtrees([parent.path])) == {parent}
+    assert set(models.Item.objects.filter_subtrees([item.path])) == {item, *children}
+    assert list(models.Item.objects.filter_path_items(child.path).order_by("effective_path")) == [
+        target,
+        item,
+        child,
+    ]
+
+    move_task.process(10)
+    child.refresh_from_db()
+    assert child.path[:2] == [str(target.id), str(item.id)]
+    assert child.get_role(target_user) == "reader"
+    assert set(item.children()) == set(children)
+
+
 def test_models_items_restore_complex():
     """The restore method should restore a soft-deleted item and its ancestors."""
     grand_parent = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
@@ -1394,3 +1798,62 @@ def test_models_items_restore_complex_bis():
     assert item.ancestors_deleted_at == item.deleted_at
     assert child1.ancestors_deleted_at == item.deleted_at
     assert child2.ancestors_deleted_at == item.deleted_at
+
+
+def test_models_items_hard_delete_invalidates_distinct_creators(django_capture_on_commit_callbacks):
+    """The storage used cache of each creator of the subtree should be invalidated once."""
+    user = factories.UserFactory()
+    other = factories.UserFactory()
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, creator=user)
+    factories.ItemFactory.create_batch(
+        3, parent=item, type=models.ItemTypeChoices.FILE, creator=other
+    )
+    item.soft_delete()
+
+    with mock.patch("core.models.invalidate_storage_used_cache") as invalidate:
+        with django_capture_on_commit_callbacks(execute=True):
+            assert item.hard_delete() is None
+
+    invalidate.assert_called_once_with([other.id])
+    assert not models.Item.objects.filter(
+        path__descendants=item.path, hard_deleted_at=None
+    ).exists()
+
+
+def test_models_items_hard_delete_large_subtree_in_background(settings):
+    """
+    Above ITEM_SUBTREE_ASYNC_THRESHOLD descendants, the item is hard deleted right
+    away and its descendants are marked as hard deleted in the background.
+    """
+    settings.ITEM_SUBTREE_ASYNC_THRESHOLD = 2
+    user = factories.UserFactory()
+    other = factories.UserFactory()
+    item = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, creator=user)
+    children = factories.ItemFactory.create_batch(
+        3, parent=item, type=models.ItemTypeChoices.FILE, creator=other
+    )
+    item.soft_delete().process(10)
+
+    tree_task = item.hard_delete()
+
+    item.refresh_from_db()
+    assert item.hard_deleted_at is not None
+    assert item.subtree_operation == "hard_delete"
+    assert tree_task.kind == "hard_delete"
+    assert tree_task.hard_deleted_at == item.hard_deleted_at
+    assert (
+        models.Item.objects.filter(
+            id__in=[child.id for child in children], hard_deleted_at=None
+        ).count()
+        == 3
+    )
+
+    with mock.patch("core.models.invalidate_storage_used_cache") as invalidate:
+        tree_task.process(2)
+
+    assert list(invalidate.call_args.args[0]) == [other.id]
+    item.refresh_from_db()
+    assert item.subtree_operation is None
+    for child in children:
+        child.refresh_from_db()
+        assert child.hard_deleted_at == item.hard_deleted_at
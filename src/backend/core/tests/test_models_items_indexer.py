@@ -3,17 +3,23 @@ Unit tests for the item model
 """
 # pylint: disable=too-many-lines
 
+from datetime import timedelta
 from operator import itemgetter
 from unittest import mock
 
 from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 
 import pytest
 
 from core import factories, models
 from core.services.search_indexers import SearchIndexer
-from core.tasks.search import file_indexer_task
+from core.tasks.search import (
+    file_indexer_task,
+    process_index_outbox_batch,
+    purge_index_outbox,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -74,19 +80,17 @@ def test_models_items_post_save_indexer_no_batches(indexer_settings):
 
     indexer = SearchIndexer()
 
-    def _key(d):
-        return d[0]["id"]
-
-    # 3 calls
-    assert len(data) == 3
-    assert sorted(data, key=_key) == sorted(
+    # The outbox is drained once at the end of the transaction
+    assert len(data) == 1
+    assert sorted(data[0], key=itemgetter("id")) == sorted(
         [
-            [indexer.serialize_item(item1, accesses)],
-            [indexer.serialize_item(item2, accesses)],
-            [indexer.serialize_item(item3, accesses)],
+            indexer.serialize_item(item1, accesses),
+            indexer.serialize_item(item2, accesses),
+            indexer.serialize_item(item3, accesses),
         ],
-        key=_key,
+        key=itemgetter("id"),
     )
+    assert not models.ItemIndexOutbox.objects.exists()
 
     # The throttle counters should be reset
     assert cache.get("file-batch-indexer-throttle") is None
@@ -425,10 +429,141 @@ def test_models_items_access_post_save_indexer_no_throttle(indexer_settings):
 
         data = [call.args[0] for call in mock_push.call_args_list]
 
-        # 3 calls
-        assert len(data) == 3
-        assert [list(map(itemgetter("id"), d)) for d in data] == [
-            [str(item.pk)],
-            [str(item.pk)],
-            [str(item.pk)],
-        ]
+        # The changes of the same item are deduplicated
+        assert len(data) == 1
+        assert [d["id"] for d in data[0]] == [str(item.pk)]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_access_post_delete_indexer_subtree():
+    """Deleting an access on a folder should index the folder and its descendants"""
+    user = factories.UserFactory()
+
+    with transaction.atomic():
+        folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER, users=[user])
+        child = factories.ItemFactory(parent=folder, type=models.ItemTypeChoices.FILE)
+        other = factories.ItemFactory(type=models.ItemTypeChoices.FILE)
+
+    reset_batch_indexer_throttle()
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        with transaction.atomic():
+            models.ItemAccess.objects.get(item=folder, user=user).delete()
+
+    data = [call.args[0] for call in mock_push.call_args_list]
+
+    assert len(data) == 1
+    assert {d["id"] for d in data[0]} == {str(folder.pk), str(child.pk)}
+    assert str(other.pk) not in {d["id"] for d in data[0]}
+    assert all(d["users"] == [] for d in data[0])
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_move_indexer_subtree():
+    """Moving a folder should index the folder and its descendants with their new paths"""
+    with transaction.atomic():
+        folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+        child = factories.ItemFactory(parent=folder, type=models.ItemTypeChoices.FILE)
+        target = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+
+    reset_batch_indexer_throttle()
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        folder.move(target)
+
+    data = [call.args[0] for call in mock_push.call_args_list]
+
+    assert len(data) == 1
+    assert {d["id"]: d["path"] for d in data[0]} == {
+        str(folder.pk): f"{target.path!s}.{folder.pk!s}",
+        str(child.pk): f"{target.path!s}.{folder.pk!s}.{child.pk!s}",
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_indexer_outbox_retry(indexer_settings):
+    """
+    Changes should stay in the outbox when indexation fails, they are purged once
+    they reached the max attempts.
+    """
+    indexer_settings.SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS = 3
+
+    with mock.patch.object(SearchIndexer, "push", side_effect=RuntimeError) as mock_push:
+        with transaction.atomic():
+            item = factories.ItemFactory()
+
+    # Celery tasks are eager in tests: the retries are run immediately
+    assert mock_push.call_count == 3
+    assert not models.ItemIndexOutbox.objects.filter(item=item).exists()
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_indexer_outbox_failure_releases_lease(indexer_settings):
+    """A failed change should be released to be retried, up to the max attempts."""
+    indexer_settings.SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS = 2
+    # The outbox is not processed: the transaction of the test is never committed
+    item = factories.ItemFactory()
+
+    with mock.patch.object(SearchIndexer, "push", side_effect=RuntimeError):
+        assert process_index_outbox_batch(SearchIndexer()) is None
+
+    assert set(
+        models.ItemIndexOutbox.objects.filter(item=item).values_list("attempts", "processing_at")
+    ) == {(1, None)}
+
+    with mock.patch.object(SearchIndexer, "push", side_effect=RuntimeError):
+        assert process_index_outbox_batch(SearchIndexer()) is None
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        assert process_index_outbox_batch(SearchIndexer()) == 0
+
+    mock_push.assert_not_called()
+    assert purge_index_outbox() > 0
+    assert not models.ItemIndexOutbox.objects.exists()
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_indexer_outbox_lease(indexer_settings):
+    """
+    Changes claimed by a worker should not be processed by another one until
+    their lease expires.
+    """
+    indexer_settings.SEARCH_INDEXER_OUTBOX_LEASE_TIMEOUT = 60
+    # The outbox is not processed: the transaction of the test is never committed
+    item = factories.ItemFactory()
+    models.ItemIndexOutbox.objects.update(processing_at=timezone.now())
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        assert process_index_outbox_batch(SearchIndexer()) == 0
+
+    mock_push.assert_not_called()
+
+    models.ItemIndexOutbox.objects.update(processing_at=timezone.now() - timedelta(seconds=61))
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        assert process_index_outbox_batch(SearchIndexer()) > 0
+
+    assert [d["id"] for d in mock_push.call_args[0][0]] == [str(item.pk)]
+    assert not models.ItemIndexOutbox.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("indexer_settings")
+def test_models_items_indexer_outbox_batches(indexer_settings):
+    """The outbox should be drained by batches, in order"""
+    indexer_settings.SEARCH_INDEXER_OUTBOX_BATCH_SIZE = 2
+
+    with mock.patch.object(SearchIndexer, "push") as mock_push:
+        with transaction.atomic():
+            items = factories.ItemFactory.create_batch(5)
+
+    data = [call.args[0] for call in mock_push.call_args_list]
+
+    assert [[d["id"] for d in batch] for batch in data] == [
+        sorted([str(items[0].pk), str(items[1].pk)]),
+        sorted([str(items[2].pk), str(items[3].pk)]),
+        [str(items[4].pk)],
+    ]
+    assert not models.ItemIndexOutbox.objects.exists()
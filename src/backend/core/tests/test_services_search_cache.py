@@ -0,0 +1,105 @@
+"""Tests for the cache of the search results"""
+
+from unittest import mock
+
+from django.core.cache import cache
+
+import pytest
+
+from core import factories
+from core.services.search_cache import SearchResultsCache, invalidate_user_search_results
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(name="search_cache_settings")
+def fixture_search_cache_settings(settings):
+    """Enable the search results cache."""
+    settings.SEARCH_RESULTS_CACHE_TIMEOUT = 30
+    settings.SEARCH_RESULTS_CACHE_MAX_SIZE = 3
+    settings.SEARCH_TITLE_MIN_SIMILARITY = 0
+    return settings
+
+
+@pytest.mark.usefixtures("search_cache_settings")
+def test_services_search_cache_get_set():
+    """The results should be cached per user, filters and text."""
+    user, other_user = factories.UserFactory.create_batch(2)
+    rank = mock.Mock()
+    search_cache = SearchResultsCache(user, {"type": "file"}, rank)
+
+    assert search_cache.get("budget") is None
+
+    search_cache.set("budget", ["1", "2"])
+
+    assert search_cache.get("budget") == {"complete": True, "results": ["1", "2"]}
+    assert SearchResultsCache(user, {"type": "folder"}, rank).get("budget") is None
+    assert SearchResultsCache(other_user, {"type": "file"}, rank).get("budget") is None
+    rank.assert_not_called()
+
+
+@pytest.mark.usefixtures("search_cache_settings")
+def test_services_search_cache_refine_prefix():
+    """
+    The results of a longer text should be matched and ranked by the given function
+    among the complete results of its longest cached prefix, and cached.
+    """
+    user = factories.UserFactory()
+    titles = {"1": "budget", "2": "bureau", "3": "budgets 2025"}
+    rank = mock.Mock(
+        side_effect=lambda text, ids: [
+            item_id for item_id in reversed(ids) if text in titles[item_id]
+        ]
+    )
+    search_cache = SearchResultsCache(user, {}, rank)
+
+    search_cache.set("bu", ["1", "2", "3"])
+
+    assert search_cache.get("budg") == {"complete": True, "results": ["3", "1"]}
+    rank.assert_called_once_with("budg", ["1", "2", "3"])
+
+    # The refined results are cached and refined again
+    assert search_cache.get("budgets") == {"complete": True, "results": ["3"]}
+    rank.assert_called_with("budgets", ["3", "1"])
+
+    rank.reset_mock()
+    assert search_cache.get("budg")["results"] == ["3", "1"]
+    rank.assert_not_called()
+
+
+@pytest.mark.usefixtures("search_cache_settings")
+def test_services_search_cache_incomplete_results():
+    """Incomplete results should not be kept nor refined."""
+    user = factories.UserFactory()
+    rank = mock.Mock()
+    search_cache = SearchResultsCache(user, {}, rank)
+
+    entry = search_cache.set("b", [str(i) for i in range(4)])
+
+    assert entry == {"complete": False, "results": []}
+    assert search_cache.get("b") == entry
+    assert search_cache.get("bu") is None
+    rank.assert_not_called()
+
+
+def test_services_search_cache_no_refine_with_similarity(search_cache_settings):
+    """Prefixes should not be refined when similar titles also match."""
+    search_cache_settings.SEARCH_TITLE_MIN_SIMILARITY = 0.6
+    user = factories.UserFactory()
+    search_cache = SearchResultsCache(user, {}, mock.Mock())
+
+    search_cache.set("bu", ["1"])
+
+    assert search_cache.get("budget") is None
+
+
+@pytest.mark.usefixtures("search_cache_settings")
+def test_services_search_cache_invalidate():
+    """Invalidating the search results of a user should renew the version of their keys."""
+    user = factories.UserFactory()
+    SearchResultsCache(user, {}, mock.Mock()).set("budget", ["1"])
+
+    invalidate_user_search_results(user.id)
+
+    assert SearchResultsCache(user, {}, mock.Mock()).get("budget") is None
+    assert cache.get(f"search_results:{user.id!s}:version") is not None
@@ -1,11 +1,17 @@
 """Tests for Documents search indexers"""
 
+import gzip
+import subprocess
 from functools import partial
 from json import dumps as json_dumps
+from json import loads as json_loads
+from operator import itemgetter
 from unittest.mock import patch
 
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.utils.module_loading import import_string
 
 import pytest
@@ -16,12 +22,17 @@ from requests import HTTPError
 from core import factories, models
 from core.services.search_indexers import (
     BaseItemIndexer,
+    PostgresSearchIndexer,
     SearchIndexer,
     get_ancestor_to_descendants_map,
+    get_batch_numchild,
     get_file_indexer,
+    get_push_stats,
     get_visited_items_ids_of,
     is_allowed_mimetype,
 )
+from core.services.text_extractors import PlainTextExtractor
+from core.tests.utils.documents import DOCX_MIMETYPE, build_docx
 
 pytestmark = pytest.mark.django_db
 
@@ -656,6 +667,193 @@ def test_services_search_indexers_ignore_content_if_too_big(mock_push, indexer_s
     }
 
 
+def test_services_search_indexers_get_batch_numchild(django_assert_num_queries):
+    """
+    The children of all the items of a batch should be counted in a single query.
+    """
+    folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    subfolder = factories.ItemFactory(parent=folder, type=models.ItemTypeChoices.FOLDER)
+    factories.ItemFactory.create_batch(2, parent=folder, type=models.ItemTypeChoices.FILE)
+    factories.ItemFactory.create_batch(3, parent=subfolder, type=models.ItemTypeChoices.FILE)
+    empty_folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+
+    with django_assert_num_queries(1):
+        numchild = get_batch_numchild([folder, subfolder, empty_folder])
+
+    assert numchild == {str(folder.path): 3, str(subfolder.path): 3}
+    for item in (folder, subfolder):
+        assert numchild[str(item.path)] == item.children().count()
+
+
+@patch.object(SearchIndexer, "push")
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_index_numchild(mock_push, django_assert_num_queries):
+    """
+    Indexing a batch should not run one children count query per item.
+    """
+    folders = factories.ItemFactory.create_batch(5, type=models.ItemTypeChoices.FOLDER)
+    for i, folder in enumerate(folders):
+        factories.ItemFactory.create_batch(i, parent=folder, type=models.ItemTypeChoices.FILE)
+
+    # Fetch the batch, the accesses, the children counts and the next empty batch
+    with django_assert_num_queries(4):
+        assert SearchIndexer().index() == 15
+
+    results = {item["id"]: item["numchild"] for item in mock_push.call_args[0][0]}
+    assert {str(folder.id): results[str(folder.id)] for folder in folders} == {
+        str(folder.id): i for i, folder in enumerate(folders)
+    }
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_to_text_streams_up_to_max_size(indexer_settings):
+    """
+    The content should be read and decoded up to SEARCH_INDEXER_CONTENT_MAX_SIZE bytes,
+    dropping a multibyte character cut by the limit.
+    """
+    indexer_settings.SEARCH_INDEXER_CONTENT_MAX_SIZE = 10
+
+    item = factories.ItemFactory(
+        mimetype="text/plain",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes="aaaaaaaaaé and more".encode(),
+    )
+
+    with patch.object(PlainTextExtractor, "chunk_size", 4):
+        assert SearchIndexer().to_text(item) == "aaaaaaaaa"
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_to_text_isolated_extractor():
+    """Office documents should be parsed in a dedicated process."""
+    item = factories.ItemFactory(
+        mimetype=DOCX_MIMETYPE,
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes=build_docx(["Budget 2025", "Meeting notes"]),
+    )
+
+    assert SearchIndexer().to_text(item) == "Budget 2025\nMeeting notes"
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_to_text_isolated_extractor_invalid_file():
+    """A file the extractor fails to parse should be indexed without content."""
+    item = factories.ItemFactory(
+        mimetype=DOCX_MIMETYPE,
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes=b"not a zip archive",
+    )
+
+    assert SearchIndexer().to_text(item) == ""
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_to_text_isolated_extractor_timeout():
+    """
+    A file taking too long to be parsed should be indexed without content, the
+    extraction process being killed by subprocess.run.
+    """
+    item = factories.ItemFactory(
+        mimetype=DOCX_MIMETYPE,
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes=build_docx(["Budget 2025"]),
+    )
+
+    with patch(
+        "core.services.search_indexers.subprocess.run",
+        side_effect=subprocess.TimeoutExpired("extract", 30),
+    ) as mock_run:
+        assert SearchIndexer().to_text(item) == ""
+
+    assert mock_run.call_args.kwargs["timeout"] == 30
+
+
+@patch.object(SearchIndexer, "push")
+def test_services_search_indexers_reuse_extracted_texts(mock_push, indexer_settings):
+    """
+    A reindexation should reuse the texts extracted from the unchanged files without
+    downloading them and extract the text of the modified files again.
+    """
+    indexer_settings.SEARCH_INDEXER_ALLOWED_MIMETYPES = ["text/", DOCX_MIMETYPE]
+
+    text_item = factories.ItemFactory(
+        mimetype="text/plain",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes="this is a text",
+    )
+    docx_item = factories.ItemFactory(
+        mimetype=DOCX_MIMETYPE,
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes=build_docx(["Budget 2025"]),
+    )
+    expected = {str(text_item.id): "this is a text", str(docx_item.id): "Budget 2025"}
+
+    assert SearchIndexer().index() == 2
+    assert {item["id"]: item["content"] for item in mock_push.call_args[0][0]} == expected
+    assert models.ItemExtractedText.objects.count() == 2
+
+    with patch.object(default_storage, "open") as mock_open:
+        assert SearchIndexer().index() == 2
+
+    mock_open.assert_not_called()
+    assert {item["id"]: item["content"] for item in mock_push.call_args[0][0]} == expected
+
+    default_storage.save(text_item.file_key, ContentFile(b"this is a new text"))
+    assert SearchIndexer().index() == 2
+
+    assert {item["id"]: item["content"] for item in mock_push.call_args[0][0]} == {
+        **expected,
+        str(text_item.id): "this is a new text",
+    }
+    assert models.ItemExtractedText.objects.get(item=text_item).text == "this is a new text"
+
+
+@patch.object(SearchIndexer, "push")
+def test_services_search_indexers_text_cache_disabled(mock_push, indexer_settings):
+    """The extracted texts should not be saved when SEARCH_INDEXER_TEXT_CACHE is False."""
+    indexer_settings.SEARCH_INDEXER_TEXT_CACHE = False
+
+    item = factories.ItemFactory(
+        mimetype="text/plain",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes="this is a text",
+    )
+
+    assert SearchIndexer().index() == 1
+
+    assert mock_push.call_args[0][0][0]["content"] == "this is a text"
+    assert not models.ItemExtractedText.objects.filter(item=item).exists()
+
+
+@patch.object(SearchIndexer, "push")
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_content_failure(mock_push):
+    """A file failing to be read should be indexed without content, with the others."""
+    failing_item, item = factories.ItemFactory.create_batch(
+        2,
+        mimetype="text/plain",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes="this is a text",
+    )
+    default_storage.delete(failing_item.file_key)
+
+    assert SearchIndexer().index() == 2
+
+    assert {data["id"]: data["content"] for data in mock_push.call_args[0][0]} == {
+        str(failing_item.id): "",
+        str(item.id): "this is a text",
+    }
+    assert list(models.ItemExtractedText.objects.values_list("item", flat=True)) == [item.id]
+
+
 @patch.object(SearchIndexer, "push")
 @pytest.mark.usefixtures("indexer_settings")
 def test_services_search_indexers_ancestors_link_reach(mock_push):
@@ -765,10 +963,10 @@ def test_services_search_indexers_ancestors_teams(mock_push):
     assert set(results[str(document.id)]["groups"]) == {"team_gp", "team_p", "team_d"}
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_push_uses_correct_url_and_data(mock_post, indexer_settings):
     """
-    push() should call requests.post with the correct URL from settings
+    push() should post with the correct URL from settings
     the timeout set to 10 seconds and the data as JSON.
     """
     indexer_settings.SEARCH_INDEXER_URL = "http://example.com/index"
@@ -777,6 +975,7 @@ def test_push_uses_correct_url_and_data(mock_post, indexer_settings):
     sample_data = [{"id": "123", "title": "Test"}]
 
     mock_response = mock_post.return_value
+    mock_response.status_code = 200
     mock_response.raise_for_status.return_value = None  # No error
 
     indexer.push(sample_data)
@@ -785,10 +984,80 @@ def test_push_uses_correct_url_and_data(mock_post, indexer_settings):
     args, kwargs = mock_post.call_args
 
     assert args[0] == indexer_settings.SEARCH_INDEXER_URL
-    assert kwargs.get("json") == sample_data
+    assert json_loads(kwargs.get("data")) == sample_data
+    assert kwargs["headers"]["Content-Type"] == "application/json"
+    assert "Content-Encoding" not in kwargs["headers"]
     assert kwargs.get("timeout") == 10
 
 
+@responses.activate
+def test_push_split_payloads_by_bytes(indexer_settings):
+    """
+    push() should split the documents in payloads bounded in bytes and record
+    the metrics of the pushes.
+    """
+    indexer_settings.SEARCH_INDEXER_PUSH_MAX_BYTES = 100
+    indexer_settings.SEARCH_INDEXER_PUSH_CONCURRENCY = 2
+    responses.add(responses.POST, indexer_settings.SEARCH_INDEXER_URL, status=200)
+
+    indexer = SearchIndexer()
+    sample_data = [{"id": str(i), "content": "a" * 15} for i in range(5)]
+
+    indexer.push(sample_data)
+
+    payloads = [json_loads(call.request.body) for call in responses.calls]
+    assert all(len(call.request.body) <= 100 for call in responses.calls)
+    assert len(payloads) == 3
+    assert sorted((d for payload in payloads for d in payload), key=itemgetter("id")) == (
+        sample_data
+    )
+
+    stats = get_push_stats()
+    assert stats["pushes"] == 3
+    assert stats["bytes_sent"] == sum(len(call.request.body) for call in responses.calls)
+    assert stats["errors"] == 0
+    assert stats["latency_ms"] is not None
+
+
+@responses.activate
+def test_push_gzip(indexer_settings):
+    """push() should gzip the payloads when SEARCH_INDEXER_PUSH_GZIP is set."""
+    indexer_settings.SEARCH_INDEXER_PUSH_GZIP = True
+    responses.add(responses.POST, indexer_settings.SEARCH_INDEXER_URL, status=200)
+
+    sample_data = [{"id": "123", "title": "Test"}]
+    SearchIndexer().push(sample_data)
+
+    request = responses.calls[0].request
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert json_loads(gzip.decompress(request.body)) == sample_data
+
+
+@responses.activate
+@patch("core.services.search_indexers.time.sleep")
+def test_push_retries(mock_sleep, indexer_settings):
+    """push() should retry unavailability errors with a jittered backoff, up to a limit."""
+    indexer_settings.SEARCH_INDEXER_PUSH_RETRIES = 2
+    url = indexer_settings.SEARCH_INDEXER_URL
+    responses.add(responses.POST, url, status=503)
+    responses.add(responses.POST, url, status=200)
+
+    SearchIndexer().push([{"id": "123"}])
+
+    assert len(responses.calls) == 2
+    mock_sleep.assert_called_once()
+    assert 0 <= mock_sleep.call_args.args[0] <= 0.5
+    assert get_push_stats()["retries"] == 1
+
+    responses.reset()
+    responses.add(responses.POST, url, status=503)
+    with pytest.raises(HTTPError):
+        SearchIndexer().push([{"id": "123"}])
+
+    assert len(responses.calls) == 3
+    assert get_push_stats()["errors"] == 1
+
+
 def test_get_visited_items_ids_of():
     """
     get_visited_items_ids_of() returns the ids of the items viewed
@@ -821,6 +1090,31 @@ def test_get_visited_items_ids_of():
     assert get_visited_items_ids_of(queryset, user) == [str(file1.pk)]
 
 
+def test_get_visited_items_ids_of_cached(django_assert_num_queries):
+    """
+    The ids of the items traced for the user should be cached until a trace of the
+    user is created or deleted.
+    """
+    user = factories.UserFactory()
+    queryset = models.Item.objects.all()
+    file1, file2 = factories.ItemFactory.create_batch(2)
+    trace = models.LinkTrace.objects.create(item=file1, user=user)
+
+    assert get_visited_items_ids_of(queryset, user) == [str(file1.pk)]
+
+    # Only the items are queried
+    with django_assert_num_queries(1):
+        assert get_visited_items_ids_of(queryset, user) == [str(file1.pk)]
+
+    models.LinkTrace.objects.create(item=file2, user=user)
+    assert sorted(get_visited_items_ids_of(queryset, user)) == sorted(
+        [str(file1.pk), str(file2.pk)]
+    )
+
+    trace.delete()
+    assert get_visited_items_ids_of(queryset, user) == [str(file2.pk)]
+
+
 @pytest.mark.usefixtures("indexer_settings")
 def test_get_visited_items_ids_of_deleted():
     """
@@ -875,7 +1169,7 @@ def test_services_search_indexers_search_errors(indexer_settings):
         SearchIndexer().search("alpha", token="mytoken")
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_services_search_indexers_search(mock_post, indexer_settings):
     """
     search() should call requests.post to SEARCH_INDEXER_QUERY_URL with the
@@ -912,7 +1206,7 @@ def test_services_search_indexers_search(mock_post, indexer_settings):
     assert kwargs.get("timeout") == 10
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_services_search_indexers_search_nb_results(mock_post, indexer_settings):
     """
     Find API call should have nb_results == SEARCH_INDEXER_QUERY_LIMIT
@@ -949,3 +1243,130 @@ def test_services_search_indexers_search_nb_results(mock_post, indexer_settings)
 
     assert args[0] == indexer_settings.SEARCH_INDEXER_QUERY_URL
     assert kwargs.get("json")["nb_results"] == 109
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_postgres_index_and_search():
+    """
+    The PostgreSQL indexer should store the search vectors of the items and rank the
+    matches of the title before the ones of the description and content.
+    """
+    in_content = factories.ItemFactory(
+        title="notes",
+        mimetype="text/plain",
+        type=models.ItemTypeChoices.FILE,
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        upload_bytes=b"the holidays planning",
+    )
+    in_description = factories.ItemFactory(title="calendar", description="Holidays")
+    in_title = factories.ItemFactory(title="Holidays éte")
+    factories.ItemFactory(title="other")
+
+    indexer = PostgresSearchIndexer()
+
+    assert indexer.index() == 4
+    assert models.ItemSearchDocument.objects.count() == 4
+
+    results = indexer.search("holidays", token=None)
+    assert [result["_id"] for result in results] == [
+        str(in_title.pk),
+        str(in_description.pk),
+        str(in_content.pk),
+    ]
+
+    # Accents are ignored
+    assert [result["_id"] for result in indexer.search("ete", token=None)] == [str(in_title.pk)]
+
+    # Indexing again updates the search vectors
+    in_title.title = "renamed"
+    in_title.save()
+    indexer.index()
+
+    assert models.ItemSearchDocument.objects.count() == 4
+    assert [result["_id"] for result in indexer.search("holidays", token=None)] == [
+        str(in_description.pk),
+        str(in_content.pk),
+    ]
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_postgres_search_ids_queryset():
+    """The search should be restricted to the queryset and to the query limit."""
+    items = factories.ItemFactory.create_batch(3, title="holidays")
+
+    indexer = PostgresSearchIndexer()
+    indexer.index()
+
+    queryset = models.Item.objects.filter(pk__in=[items[0].pk, items[1].pk])
+    assert set(indexer.search_ids("holidays", None, queryset, None)) == {
+        str(items[0].pk),
+        str(items[1].pk),
+    }
+
+    indexer.search_limit = 1
+    assert len(indexer.search_ids("holidays", None, queryset, None)) == 1
+
+
+@pytest.mark.usefixtures("indexer_settings")
+def test_services_search_indexers_postgres_search_results(django_assert_num_queries):
+    """
+    The search results should be counted and sliced in the database, up to the
+    query limit.
+    """
+    items = factories.ItemFactory.create_batch(4, title="holidays")
+    factories.ItemFactory(title="other")
+
+    indexer = PostgresSearchIndexer()
+    indexer.index()
+    expected = [result["_id"] for result in indexer.search("holidays", token=None)]
+
+    queryset = models.Item.objects.filter(pk__in=[item.pk for item in items[:3]])
+    results = indexer.search_results("holidays", None, queryset, None)
+
+    with django_assert_num_queries(2):
+        assert len(results) == 3
+        assert results[1:10] == [id for id in expected if id != str(items[3].pk)][1:]
+
+    assert results[5:10] == []
+
+    indexer.search_limit = 2
+    results = indexer.search_results("holidays", None, queryset, None)
+    assert len(results) == 2
+    assert len(results[0:10]) == 2
+
+
+@responses.activate
+def test_services_search_indexers_search_results_restricted_to_queryset(indexer_settings):
+    """
+    The results of Find outside of the queryset should be dropped before
+    paginating them, Find being requested only once.
+    """
+    items = factories.ItemFactory.create_batch(3)
+    search = responses.add(
+        responses.POST,
+        indexer_settings.SEARCH_INDEXER_QUERY_URL,
+        json=[{"_id": str(item.pk)} for item in items],
+        status=200,
+    )
+    queryset = models.Item.objects.exclude(pk=items[1].pk)
+
+    results = SearchIndexer().search_results("alpha", "mytoken", queryset, AnonymousUser())
+
+    assert len(results) == 2
+    assert results[0:1] == [str(items[0].pk)]
+    assert results[1:20] == [str(items[2].pk)]
+    assert search.call_count == 1
+
+
+@patch("requests.Session.post")
+def test_services_search_indexers_search_offset(mock_post, indexer_settings):
+    """
+    Find has no offset: the results before the offset should be requested and
+    skipped.
+    """
+    mock_post.return_value.json.return_value = [{"_id": str(i)} for i in range(5)]
+
+    results = SearchIndexer().search("alpha", token="mytoken", nb_results=2, offset=3)
+
+    assert mock_post.call_args.kwargs["json"]["nb_results"] == 5
+    assert results == [{"_id": "3"}, {"_id": "4"}]
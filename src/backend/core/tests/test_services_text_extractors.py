@@ -0,0 +1,99 @@
+"""Tests for the text extractors of the search indexers"""
+
+import io
+
+import pytest
+
+from core.services.text_extractors import (
+    OfficeDocumentExtractor,
+    PlainTextExtractor,
+    get_text_extractor,
+)
+from core.tests.utils.documents import (
+    DOCX_MIMETYPE,
+    ODT_MIMETYPE,
+    PPTX_MIMETYPE,
+    build_docx,
+    build_odt,
+    build_pptx,
+)
+
+
+@pytest.mark.parametrize(
+    "mimetype, expected",
+    [
+        ("text/plain", PlainTextExtractor),
+        ("text/markdown", PlainTextExtractor),
+        (DOCX_MIMETYPE, OfficeDocumentExtractor),
+        (PPTX_MIMETYPE, OfficeDocumentExtractor),
+        (ODT_MIMETYPE, OfficeDocumentExtractor),
+        ("application/pdf", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_services_text_extractors_get_text_extractor(mimetype, expected):
+    """The first extractor of SEARCH_INDEXER_TEXT_EXTRACTORS supporting the mimetype is used."""
+    extractor = get_text_extractor(mimetype)
+
+    if expected is None:
+        assert extractor is None
+    else:
+        assert isinstance(extractor, expected)
+
+
+def test_services_text_extractors_get_text_extractor_settings(settings):
+    """Only the extractors listed in SEARCH_INDEXER_TEXT_EXTRACTORS should be used."""
+    settings.SEARCH_INDEXER_TEXT_EXTRACTORS = [
+        "core.services.text_extractors.PlainTextExtractor",
+    ]
+
+    assert get_text_extractor(DOCX_MIMETYPE) is None
+
+
+def test_services_text_extractors_name():
+    """The name identifies the extractor class and its version."""
+    assert PlainTextExtractor().name == "core.services.text_extractors.PlainTextExtractor:1"
+
+
+def test_services_text_extractors_plain_text_truncated():
+    """The plain text should be decoded up to the maximum size."""
+    extractor = PlainTextExtractor()
+    extractor.chunk_size = 3
+
+    assert extractor.extract(io.BytesIO("éèà and more".encode()), 100) == "éèà and more"
+    assert extractor.extract(io.BytesIO("éèà and more".encode()), 5) == "éè"
+
+
+def test_services_text_extractors_docx():
+    """The paragraphs of a Word document should be extracted."""
+    data = build_docx(["Budget 2025", "", "Meeting <notes>"])
+
+    assert OfficeDocumentExtractor().extract(io.BytesIO(data), 1000) == (
+        "Budget 2025\nMeeting <notes>"
+    )
+
+
+def test_services_text_extractors_pptx_slides_order():
+    """The slides of a presentation should be extracted in their natural order."""
+    data = build_pptx([f"Slide {number}" for number in range(1, 12)])
+
+    assert OfficeDocumentExtractor().extract(io.BytesIO(data), 1000) == "\n".join(
+        f"Slide {number}" for number in range(1, 12)
+    )
+
+
+def test_services_text_extractors_odt():
+    """The paragraphs of an OpenDocument text should be extracted."""
+    data = build_odt(["Compte rendu", "Réunion d'équipe"])
+
+    assert OfficeDocumentExtractor().extract(io.BytesIO(data), 1000) == (
+        "Compte rendu\nRéunion d'équipe"
+    )
+
+
+def test_services_text_extractors_office_truncated():
+    """The extraction should stop once the maximum size is reached."""
+    data = build_docx(["a" * 10, "b" * 10, "c" * 10])
+
+    assert OfficeDocumentExtractor().extract(io.BytesIO(data), 15) == "a" * 10 + "\nbbbb"
@@ -0,0 +1,63 @@
+"""Build office documents in memory for the tests."""
+
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIMETYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+ODT_MIMETYPE = "application/vnd.oasis.opendocument.text"
+
+WORD_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DRAWING_NAMESPACE = "http://schemas.openxmlformats.org/drawingml/2006/main"
+ODF_TEXT_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+
+def build_archive(parts):
+    """Return the bytes of a zip archive of the given {name: content} parts."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def build_docx(paragraphs):
+    """Return the bytes of a Word document with the given paragraphs."""
+    body = "".join(f"<w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p>" for text in paragraphs)
+    return build_archive(
+        {
+            "[Content_Types].xml": "<Types/>",
+            "word/document.xml": (
+                f'<w:document xmlns:w="{WORD_NAMESPACE}"><w:body>{body}</w:body></w:document>'
+            ),
+        }
+    )
+
+
+def build_pptx(slides):
+    """Return the bytes of a PowerPoint presentation with one paragraph per slide."""
+    return build_archive(
+        {
+            f"ppt/slides/slide{number}.xml": (
+                f'<p:sld xmlns:p="urn:p" xmlns:a="{DRAWING_NAMESPACE}">'
+                f"<a:p><a:r><a:t>{escape(text)}</a:t></a:r></a:p></p:sld>"
+            )
+            for number, text in enumerate(slides, start=1)
+        }
+    )
+
+
+def build_odt(paragraphs):
+    """Return the bytes of an OpenDocument text with the given paragraphs."""
+    body = "".join(f"<text:p>{escape(text)}</text:p>" for text in paragraphs)
+    return build_archive(
+        {
+            "mimetype": ODT_MIMETYPE,
+            "content.xml": (
+                f'<office:document-content xmlns:office="urn:office" '
+                f'xmlns:text="{ODF_TEXT_NAMESPACE}"><office:body><office:text>{body}'
+                "</office:text></office:body></office:document-content>"
+            ),
+        }
+    )
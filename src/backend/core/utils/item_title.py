@@ -3,6 +3,8 @@
 import re
 from os.path import splitext
 
+from django.db import connection, models
+
 
 def _extract_number_from_title(title):
     """Extract the numeric suffix from a title with the given base."""
@@ -13,36 +15,54 @@ def _extract_number_from_title(title):
         return 0
 
 
-def _get_next_available_number(queryset, base_title, ext):
-    """Get the next available number for a duplicate title."""
+def _get_numbered_title_regex(base_title, ext):
+    """Return the regex matching the numbered versions of a title."""
     escaped_base = re.escape(base_title)
     escaped_ext = re.escape(ext) if ext else ""
-    title_regex = rf"^{escaped_base}_\d+{escaped_ext}$"
-
-    # Get all numbered versions (no ordering needed since we iterate through all)
-    # Ordering is not made using order_by nor python list sorting function because
-    # the result is not what we expect. For example file_1.txt, file_2.txt, file_10.txt
-    # will be sorted as file_1.txt, file_10.txt, file_2.txt.
-    existing_titles = queryset.filter_non_deleted(title__regex=title_regex).values_list(
-        "title", flat=True
-    )
+    return rf"^{escaped_base}_\d+{escaped_ext}$"
 
-    if not existing_titles:
-        return "01"
 
-    # Extract numbers and find the maximum
-    max_number = max(_extract_number_from_title(title) for title in existing_titles)
-
-    return f"{max_number + 1}".zfill(2)
+def lock_titles(parent_path):
+    """
+    Serialize the allocation of unique titles among the children of an item until the
+    end of the current transaction, so concurrent creations in the same folder cannot
+    pick the same title.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))", [f"item_titles:{parent_path!s}"]
+        )
 
 
 def manage_unique_title(queryset, title):
-    """Manage the unique title in the same path."""
-    # Return original title if it doesn't exist
-    if not queryset.filter_non_deleted(title=title).exists():
+    """
+    Make a title unique among the non deleted items of the queryset, by adding the
+    next available numeric suffix if it is taken. The title and its numbered
+    versions are fetched in a single query. On the siblings of a folder, only the
+    parent path prefix of the (parent path, title) index narrows this query: the
+    numbered versions are then matched on the titles of the folder.
+    """
+    if not title:
         return title
 
-    # Handle duplicate by adding numeric suffix
     base_title, ext = splitext(title)
-    next_number = _get_next_available_number(queryset, base_title, ext)
-    return f"{base_title}_{next_number}{ext}"
+    title_regex = _get_numbered_title_regex(base_title, ext)
+    taken_titles = set(
+        queryset.filter_non_deleted(
+            models.Q(title=title) | models.Q(title__regex=title_regex)
+        ).values_list("title", flat=True)
+    )
+    if title not in taken_titles:
+        return title
+
+    # The numbers are compared as integers: file_10.txt comes after file_2.txt.
+    title_regex = re.compile(title_regex)
+    number = 1 + max(
+        (
+            _extract_number_from_title(taken_title)
+            for taken_title in taken_titles
+            if title_regex.match(taken_title)
+        ),
+        default=0,
+    )
+    return f"{base_title}_{f'{number}'.zfill(2)}{ext}"
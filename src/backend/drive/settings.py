@@ -129,11 +129,73 @@ class Base(Configuration):
         environ_name="SEARCH_INDEXER_CONTENT_MAX_SIZE",
         environ_prefix=None,
     )
+    SEARCH_TITLE_MIN_SIMILARITY = values.FloatValue(
+        0, environ_name="SEARCH_TITLE_MIN_SIMILARITY", environ_prefix=None
+    )
+    SEARCH_RESULTS_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        30, environ_name="SEARCH_RESULTS_CACHE_TIMEOUT", environ_prefix=None
+    )
+    SEARCH_RESULTS_CACHE_MAX_SIZE = values.PositiveIntegerValue(
+        1000, environ_name="SEARCH_RESULTS_CACHE_MAX_SIZE", environ_prefix=None
+    )
     SEARCH_INDEXER_ALLOWED_MIMETYPES = values.ListValue(
         ["text/"],
         environ_name="SEARCH_INDEXER_ALLOWED_MIMETYPES",
         environ_prefix=None,
     )
+    SEARCH_INDEXER_CONTENT_WORKERS = values.PositiveIntegerValue(
+        8, environ_name="SEARCH_INDEXER_CONTENT_WORKERS", environ_prefix=None
+    )
+    SEARCH_INDEXER_TEXT_CACHE = values.BooleanValue(
+        True, environ_name="SEARCH_INDEXER_TEXT_CACHE", environ_prefix=None
+    )
+    SEARCH_INDEXER_TEXT_EXTRACTORS = values.ListValue(
+        [
+            "core.services.text_extractors.PlainTextExtractor",
+            "core.services.text_extractors.OfficeDocumentExtractor",
+        ],
+        environ_name="SEARCH_INDEXER_TEXT_EXTRACTORS",
+        environ_prefix=None,
+    )
+    SEARCH_INDEXER_EXTRACTOR_WORKERS = values.PositiveIntegerValue(
+        2, environ_name="SEARCH_INDEXER_EXTRACTOR_WORKERS", environ_prefix=None
+    )
+    SEARCH_INDEXER_EXTRACTOR_TIMEOUT = values.PositiveIntegerValue(
+        30, environ_name="SEARCH_INDEXER_EXTRACTOR_TIMEOUT", environ_prefix=None
+    )
+    SEARCH_INDEXER_EXTRACTOR_MEMORY_LIMIT = values.PositiveIntegerValue(
+        512 * MB, environ_name="SEARCH_INDEXER_EXTRACTOR_MEMORY_LIMIT", environ_prefix=None
+    )
+    SEARCH_INDEXER_PUSH_MAX_BYTES = values.PositiveIntegerValue(
+        5 * MB, environ_name="SEARCH_INDEXER_PUSH_MAX_BYTES", environ_prefix=None
+    )
+    SEARCH_INDEXER_PUSH_CONCURRENCY = values.PositiveIntegerValue(
+        4, environ_name="SEARCH_INDEXER_PUSH_CONCURRENCY", environ_prefix=None
+    )
+    SEARCH_INDEXER_PUSH_GZIP = values.BooleanValue(
+        False, environ_name="SEARCH_INDEXER_PUSH_GZIP", environ_prefix=None
+    )
+    SEARCH_INDEXER_PUSH_RETRIES = values.PositiveIntegerValue(
+        3, environ_name="SEARCH_INDEXER_PUSH_RETRIES", environ_prefix=None
+    )
+    SEARCH_INDEXER_PUSH_RETRY_BACKOFF = values.FloatValue(
+        0.5, environ_name="SEARCH_INDEXER_PUSH_RETRY_BACKOFF", environ_prefix=None
+    )
+    SEARCH_INDEXER_POSTGRES_CONFIG = values.Value(
+        "simple", environ_name="SEARCH_INDEXER_POSTGRES_CONFIG", environ_prefix=None
+    )
+    SEARCH_INDEXER_OUTBOX_BATCH_SIZE = values.PositiveIntegerValue(
+        1000, environ_name="SEARCH_INDEXER_OUTBOX_BATCH_SIZE", environ_prefix=None
+    )
+    SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS = values.PositiveIntegerValue(
+        5, environ_name="SEARCH_INDEXER_OUTBOX_MAX_ATTEMPTS", environ_prefix=None
+    )
+    SEARCH_INDEXER_OUTBOX_RETRY_COUNTDOWN = values.PositiveIntegerValue(
+        60, environ_name="SEARCH_INDEXER_OUTBOX_RETRY_COUNTDOWN", environ_prefix=None
+    )
+    SEARCH_INDEXER_OUTBOX_LEASE_TIMEOUT = values.PositiveIntegerValue(
+        600, environ_name="SEARCH_INDEXER_OUTBOX_LEASE_TIMEOUT", environ_prefix=None
+    )
 
     # Static files (CSS, JavaScript, Images)
     STATIC_URL = "/static/"
@@ -965,6 +1027,19 @@ class Base(Configuration):
         30, environ_name="TRASHBIN_CUTOFF_DAYS", environ_prefix=None
     )
     PURGE_GRACE_DAYS = values.Value(7, environ_name="PURGE_GRACE_DAYS", environ_prefix=None)
+    # Operations on more descendants are applied in the background by chunks
+    ITEM_SUBTREE_ASYNC_THRESHOLD = values.PositiveIntegerValue(
+        10000, environ_name="ITEM_SUBTREE_ASYNC_THRESHOLD", environ_prefix=None
+    )
+    ITEM_SUBTREE_CHUNK_SIZE = values.PositiveIntegerValue(
+        1000, environ_name="ITEM_SUBTREE_CHUNK_SIZE", environ_prefix=None
+    )
+    # Must outlive the number of accesses cached with the default timeout
+    ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT = values.PositiveIntegerValue(
+        60 * 60 * 24,
+        environ_name="ITEM_ACCESSES_GENERATION_CACHE_TIMEOUT",
+        environ_prefix=None,
+    )
 
     # Mail
     EMAIL_BACKEND = values.Value("django.core.mail.backends.smtp.EmailBackend")
@@ -978,6 +1053,18 @@ class Base(Configuration):
     EMAIL_USE_TLS = values.BooleanValue(False)
     EMAIL_USE_SSL = values.BooleanValue(False)
     EMAIL_FROM = values.Value("from@example.com")
+    EMAIL_OUTBOX_BATCH_SIZE = values.PositiveIntegerValue(
+        100, environ_name="EMAIL_OUTBOX_BATCH_SIZE", environ_prefix=None
+    )
+    EMAIL_OUTBOX_MAX_ATTEMPTS = values.PositiveIntegerValue(
+        5, environ_name="EMAIL_OUTBOX_MAX_ATTEMPTS", environ_prefix=None
+    )
+    EMAIL_OUTBOX_RETRY_COUNTDOWN = values.PositiveIntegerValue(
+        60, environ_name="EMAIL_OUTBOX_RETRY_COUNTDOWN", environ_prefix=None
+    )
+    EMAIL_OUTBOX_LEASE_TIMEOUT = values.PositiveIntegerValue(
+        600, environ_name="EMAIL_OUTBOX_LEASE_TIMEOUT", environ_prefix=None
+    )
 
     # User accounts reconciliation
     USER_RECONCILIATION_FORM_URL = values.Value(
@@ -1417,6 +1504,12 @@ class Base(Configuration):
         environ_name="WOPI_CONFIGURATION_CACHE_EXPIRATION",
         environ_prefix=None,
     )
+    # Maximum delay in seconds before a process notices a new WOPI configuration
+    WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL = values.IntegerValue(
+        10,
+        environ_name="WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL",
+        environ_prefix=None,
+    )
     WOPI_SRC_BASE_URL = values.Value(
         None,
         environ_name="WOPI_SRC_BASE_URL",
@@ -1427,12 +1520,31 @@ class Base(Configuration):
     WOPI_ACCESS_TOKEN_TIMEOUT = values.IntegerValue(
         60 * 60 * 10, environ_name="WOPI_ACCESS_TOKEN_TIMEOUT", environ_prefix=None
     )
+    # Stateless access tokens signed with the SECRET_KEY. They carry the abilities granted
+    # when they were issued: revoking an access only applies to the tokens issued after.
+    WOPI_ACCESS_TOKEN_SIGNED = values.BooleanValue(
+        False, environ_name="WOPI_ACCESS_TOKEN_SIGNED", environ_prefix=None
+    )
+    WOPI_ACCESS_TOKEN_LRU_SIZE = values.IntegerValue(
+        1024, environ_name="WOPI_ACCESS_TOKEN_LRU_SIZE", environ_prefix=None
+    )
+    WOPI_ACCESS_TOKEN_LRU_TIMEOUT = values.IntegerValue(
+        60, environ_name="WOPI_ACCESS_TOKEN_LRU_TIMEOUT", environ_prefix=None
+    )
     WOPI_CONVERSION_SOURCE_TOKEN_TIMEOUT = values.IntegerValue(
         120, environ_name="WOPI_CONVERSION_SOURCE_TOKEN_TIMEOUT", environ_prefix=None
     )
     WOPI_LOCK_TIMEOUT = values.IntegerValue(
         30 * 60, environ_name="WOPI_LOCK_TIMEOUT", environ_prefix=None
     )
+    WOPI_GET_FILE_CHUNK_SIZE = values.PositiveIntegerValue(
+        1024 * 1024, environ_name="WOPI_GET_FILE_CHUNK_SIZE", environ_prefix=None
+    )
+    # When set, the WOPI GetFile operation does not stream the file itself but lets
+    # nginx serve it from this internal location using the X-Accel-Redirect header.
+    WOPI_GET_FILE_X_ACCEL_REDIRECT_LOCATION = values.Value(
+        None, environ_name="WOPI_GET_FILE_X_ACCEL_REDIRECT_LOCATION", environ_prefix=None
+    )
     WOPI_LEGACY_CONVERSION_TARGETS = {
         "doc": "docx",
         "xls": "xlsx",
@@ -1487,6 +1599,13 @@ class Base(Configuration):
             environ_prefix=None,
         ),
     }
+    # Delay in seconds during which the analysis requests of a file updated through WOPI
+    # are collapsed into a single analysis of its latest version. 0 disables it.
+    MALWARE_DETECTION_COALESCE_COUNTDOWN = values.IntegerValue(
+        60,
+        environ_name="MALWARE_DETECTION_COALESCE_COUNTDOWN",
+        environ_prefix=None,
+    )
     # Delay in seconds for the development SleepyDummyBackend safe result.
     MALWARE_DETECTION_DUMMY_SLEEP = values.PositiveIntegerValue(
         3,
@@ -1687,6 +1806,8 @@ class Test(Base):
     FEATURES_INDEXED_SEARCH = True
 
     SEARCH_INDEXER_CLASS = None
+    # The searches of a test must see the changes of the items made between them
+    SEARCH_RESULTS_CACHE_TIMEOUT = 0
     OIDC_STORE_ACCESS_TOKEN = False
     OIDC_STORE_REFRESH_TOKEN = False
 
@@ -10,7 +10,7 @@ from django.utils.translation import gettext as _
 from core import models
 from core.api.utils import detect_mimetype
 from core.models import Item
-from core.utils.item_title import manage_unique_title
+from core.utils.item_title import lock_titles, manage_unique_title
 from wopi.conversion.backends.onlyoffice import OnlyOfficeConversionBackend
 from wopi.conversion.exceptions import (
     ConversionMisconfigured,
@@ -81,7 +81,7 @@ def _resolve_destination_parent(source_item, user):
 def _target_filename(item, target_extension, parent, user):
     """Return a sibling-free filename for the converted item."""
     if parent:
-        siblings = Item.objects.children(parent.path)
+        siblings = Item.objects.filter_parent_path(parent.path)
     else:
         siblings = Item.objects.filter(path__depth=1, accesses__user=user).distinct()
 
@@ -100,9 +100,11 @@ def prepare_conversion(source_item, user):
     """
     target_extension, _ = _validate_conversion(source_item, user, require_ready=False)
     parent = _resolve_destination_parent(source_item, user)
-    target_filename = _target_filename(source_item, target_extension, parent, user)
-
     with transaction.atomic():
+        # The titles of the folder stay locked until the placeholder is created
+        if parent:
+            lock_titles(parent.path)
+        target_filename = _target_filename(source_item, target_extension, parent, user)
         placeholder = Item.objects.create_child(
             creator=user,
             link_reach=None if parent else models.LinkReachChoices.RESTRICTED,
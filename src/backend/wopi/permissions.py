@@ -21,6 +21,6 @@ class AccessTokenPermission(BasePermission):
         if item.id != view.get_file_id():
             return False
 
-        abilities = item.get_abilities(request.user)
+        abilities = request.auth.get_abilities()
 
         return abilities["retrieve"]
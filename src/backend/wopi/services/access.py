@@ -3,6 +3,11 @@ Services for WOPI access
 https://learn.microsoft.com/en-us/microsoft-365/cloud-storage-partner-program/rest/concepts#access-token
 """
 
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import timedelta
 from secrets import token_urlsafe
@@ -10,11 +15,20 @@ from uuid import UUID
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, AnonymousUser
+from django.core import signing
 from django.core.cache import cache
 from django.utils import timezone
 
 from core.models import Item, User
 
+SIGNED_ACCESS_SALT = "wopi.access_token"
+# Random tokens are url safe base64 strings, only signed tokens contain this separator.
+SIGNED_ACCESS_SEPARATOR = ":"
+# Abilities used by the WOPI endpoints, the only ones carried by a signed token.
+SIGNED_ACCESS_ABILITIES = ("retrieve", "update")
+REVOKED_ACCESS_CACHE_PREFIX = "wopi_revoked_access"
+ITEM_VERSION_CACHE_PREFIX = "wopi_item_version"
+
 
 class AccessError(Exception):
     """Base exception for access errors."""
@@ -32,12 +46,56 @@ class AccessUserItemNotAllowed(AccessError):
     """Exception for when a user is not allowed to access an item."""
 
 
+class AccessTokenExpiredError(AccessError):
+    """Exception for when a signed access token is expired."""
+
+
+class AccessTokenRevokedError(AccessError):
+    """Exception for when a signed access token has been revoked."""
+
+
+def get_item_version_cache_key(item_id):
+    """Cache key of the version invalidating the items hydrated from signed tokens."""
+    return f"{ITEM_VERSION_CACHE_PREFIX}:{item_id}"
+
+
+def get_accesses_digest(generations):
+    """
+    Digest of the generations of the accesses of an item and of its ancestors, changing
+    whenever an access is added, updated or removed on one of them.
+    """
+    return hashlib.sha256(":".join(generations).encode()).hexdigest()
+
+
+def get_revoked_token_cache_key(token):
+    """Cache key flagging a signed access token as revoked."""
+    return f"{REVOKED_ACCESS_CACHE_PREFIX}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+
 @dataclass
 class AccessUserItem:
     """Service for accessing a user item"""
 
     item: Item
     user: AbstractUser
+    abilities: dict | None = None
+
+    def get_abilities(self):
+        """
+        Return the abilities of the user on the item. They are carried by signed tokens,
+        otherwise computed once per request.
+        """
+        if self.abilities is None:
+            self.abilities = self.item.get_abilities(self.user)
+        return self.abilities
+
+    def copy(self):
+        """Return a copy not sharing the item and user instances."""
+        return AccessUserItem(
+            item=copy.copy(self.item),
+            user=copy.copy(self.user),
+            abilities=dict(self.abilities) if self.abilities is not None else None,
+        )
 
     def to_dict(self):
         """Convert the access user item to a dictionary"""
@@ -51,7 +109,7 @@ class AccessUserItem:
         """Convert a dictionary to an access user item"""
         try:
             return cls(
-                item=Item.objects.get(id=UUID(data["item"])),
+                item=Item.objects.select_related("creator").get(id=UUID(data["item"])),
                 user=User.objects.get(id=UUID(data["user"])) if data["user"] else AnonymousUser(),
             )
         except (Item.DoesNotExist, User.DoesNotExist) as error:
@@ -60,6 +118,64 @@ class AccessUserItem:
             raise AccessUserItemInvalidDataError("Invalid data") from error
 
 
+class AccessUserItemLRU:
+    """
+    Per process LRU of the access user items hydrated from signed tokens, keyed by token.
+    An entry is only valid for the item version it was hydrated with and for at most
+    WOPI_ACCESS_TOKEN_LRU_TIMEOUT seconds.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token, item_version):
+        """Return a copy of the access user item cached for this token and item version."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            cached_version, cached_at, access_user_item = entry
+            if (
+                cached_version != item_version
+                or time.monotonic() - cached_at > settings.WOPI_ACCESS_TOKEN_LRU_TIMEOUT
+            ):
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+
+        # Views update the item, never share the same instance between requests
+        return access_user_item.copy()
+
+    def set(self, token, item_version, access_user_item):
+        """Cache an access user item for this token and item version."""
+        maxsize = settings.WOPI_ACCESS_TOKEN_LRU_SIZE
+        if maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (
+                item_version,
+                time.monotonic(),
+                access_user_item.copy(),
+            )
+            self._entries.move_to_end(token)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        """Remove the entry of a token."""
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+access_user_item_lru = AccessUserItemLRU()
+
+
 class AccessUserItemService:
     """Service managing the access token for WOPI."""
 
@@ -68,6 +184,45 @@ class AccessUserItemService:
         """Generate a random access token"""
         return token_urlsafe()
 
+    @staticmethod
+    def generate_signed_token(item: Item, user: AbstractUser, abilities: dict, token_eol):
+        """
+        Generate a stateless access token, signed with the SECRET_KEY, carrying the item,
+        its path, the abilities granted and the expiration date.
+        """
+        return signing.dumps(
+            {
+                "i": str(item.id),
+                "p": str(item.path),
+                "u": str(user.id) if not user.is_anonymous else None,
+                "a": [ability for ability in SIGNED_ACCESS_ABILITIES if abilities.get(ability)],
+                "e": int(token_eol.timestamp()),
+            },
+            salt=SIGNED_ACCESS_SALT,
+            compress=True,
+        )
+
+    @staticmethod
+    def is_signed_token(token: str) -> bool:
+        """
+        Check if the token is a signed token. Signed tokens are only accepted while
+        WOPI_ACCESS_TOKEN_SIGNED is enabled.
+        """
+        return settings.WOPI_ACCESS_TOKEN_SIGNED and SIGNED_ACCESS_SEPARATOR in token
+
+    @staticmethod
+    def load_signed_token(token: str) -> dict:
+        """Verify the signature of a token and return its payload."""
+        try:
+            payload = signing.loads(token, salt=SIGNED_ACCESS_SALT)
+        except signing.BadSignature as error:
+            raise AccessUserItemInvalidDataError("Invalid signature") from error
+
+        if not isinstance(payload, dict) or not isinstance(payload.get("e"), int):
+            raise AccessUserItemInvalidDataError("Invalid data")
+
+        return payload
+
     def insert_new_access(
         self, item: Item, user: AbstractUser, ttl: int | None = None
     ) -> tuple[str, int]:
@@ -83,15 +238,93 @@ class AccessUserItemService:
             raise AccessUserItemNotAllowed()
 
         effective_ttl = ttl if ttl is not None else settings.WOPI_ACCESS_TOKEN_TIMEOUT
-        token = self.generate_token()
-        access_user_item = AccessUserItem(item=item, user=user)
         token_eol = timezone.now() + timedelta(seconds=effective_ttl)
-        cache.set(token, access_user_item.to_dict(), timeout=effective_ttl)
+        if settings.WOPI_ACCESS_TOKEN_SIGNED:
+            token = self.generate_signed_token(item, user, abilities, token_eol)
+        else:
+            token = self.generate_token()
+            access_user_item = AccessUserItem(item=item, user=user)
+            cache.set(token, access_user_item.to_dict(), timeout=effective_ttl)
         return token, int(round(token_eol.timestamp())) * 1000
 
     def get_access_user_item(self, token: str) -> AccessUserItem:
         """Get the access user item for the token"""
+        if self.is_signed_token(token):
+            return self._get_signed_access_user_item(token)
+
         data = cache.get(token)
         if data is None:
             raise AccessUserItemNotFoundError("Resource not found")
         return AccessUserItem.from_dict(data)
+
+    def _get_signed_access_user_item(self, token: str) -> AccessUserItem:
+        """
+        Get the access user item for a signed token. The revocation flag, the item version
+        and the generations of the accesses of the item and its ancestors are fetched in a
+        single cache round trip, the item and the user are only loaded from the database
+        when missing from the process LRU.
+
+        The abilities carried by the token are an upper bound: they are computed again
+        from the database each time the item and the user are loaded, so a change of the
+        accesses, of the link or of the deletion of the item or of one of its ancestors
+        withdraws them within WOPI_ACCESS_TOKEN_LRU_TIMEOUT seconds. A change of the item
+        or of the accesses of its ancestors withdraws them right away.
+        """
+        payload = self.load_signed_token(token)
+        if payload["e"] < time.time():
+            raise AccessTokenExpiredError("Access token expired")
+
+        try:
+            item_version_cache_key = get_item_version_cache_key(UUID(payload["i"]))
+            generation_cache_keys = [
+                Item.get_nb_accesses_generation_cache_key(UUID(item_id))
+                for item_id in payload["p"].split(".")
+            ]
+        except (KeyError, ValueError, TypeError, AttributeError) as error:
+            raise AccessUserItemInvalidDataError("Invalid data") from error
+
+        revoked_token_cache_key = get_revoked_token_cache_key(token)
+        cached_values = cache.get_many(
+            [revoked_token_cache_key, item_version_cache_key, *generation_cache_keys]
+        )
+        if cached_values.get(revoked_token_cache_key):
+            access_user_item_lru.discard(token)
+            raise AccessTokenRevokedError("Access token revoked")
+
+        generations = [cached_values.get(key) for key in generation_cache_keys]
+        accesses_digest = None if None in generations else get_accesses_digest(generations)
+        item_version = (cached_values.get(item_version_cache_key), accesses_digest)
+        access_user_item = access_user_item_lru.get(token, item_version)
+        if access_user_item is not None:
+            return access_user_item
+
+        access_user_item = AccessUserItem.from_dict(
+            {"item": payload.get("i"), "user": payload.get("u")}
+        )
+        abilities = access_user_item.item.get_abilities(access_user_item.user)
+        granted_abilities = payload.get("a", [])
+        access_user_item.abilities = {
+            ability: ability in granted_abilities and bool(abilities.get(ability))
+            for ability in SIGNED_ACCESS_ABILITIES
+        }
+        access_user_item_lru.set(token, item_version, access_user_item)
+        return access_user_item
+
+    def revoke_access(self, token: str):
+        """
+        Revoke an access token. Signed tokens can not be deleted, they are added to a
+        deny-list until they expire.
+        """
+        if not self.is_signed_token(token):
+            cache.delete(token)
+            return
+
+        try:
+            payload = self.load_signed_token(token)
+        except AccessUserItemInvalidDataError:
+            return
+
+        remaining_ttl = int(payload["e"] - time.time())
+        if remaining_ttl > 0:
+            cache.set(get_revoked_token_cache_key(token), True, timeout=remaining_ttl)
+        access_user_item_lru.discard(token)
@@ -1,16 +1,79 @@
 """Services for the WOPI lock operations."""
 
+import threading
+from typing import NamedTuple
+
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import cache, caches
+
+from django_redis.cache import RedisCache
 
 from core.models import Item
 
+# Each script returns {1} on success, {0, current lock} otherwise.
+# KEYS[1]: lock key, ARGV[1]: lock value, ARGV[2]: timeout
+LOCK_OR_REFRESH_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return {1}
+end
+if current == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return {1}
+end
+return {0, current}
+"""
+
+REFRESH_IF_MATCH_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return {1}
+end
+return {0, current}
+"""
+
+UNLOCK_IF_MATCH_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {1}
+end
+return {0, current}
+"""
+
+# ARGV[1]: old lock value, ARGV[2]: new lock value, ARGV[3]: timeout
+RELOCK_IF_MATCH_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return {1}
+end
+return {0, current}
+"""
+
+
+class LockResult(NamedTuple):
+    """Result of an atomic lock operation."""
+
+    success: bool
+    # The lock held on the item when the operation failed, empty if none.
+    current_lock: str = ""
+
 
 class LockService:
-    """Service for the WOPI lock operations."""
+    """
+    Service for the WOPI lock operations.
+
+    The *_if_match operations compare and update the lock in a single round trip: they
+    run as Lua scripts on Redis, and under a process lock for the other cache backends
+    (local memory cache used in tests).
+    """
 
     lock_timeout = settings.WOPI_LOCK_TIMEOUT
     lock_prefix = "wopi_lock"
+    _local_lock = threading.Lock()
 
     def __init__(self, item: Item):
         self.item = item
@@ -43,3 +106,77 @@ class LockService:
     def unlock(self):
         """Unlock the item."""
         cache.delete(self._lock_key)
+
+    def _run_script(self, script, *args):
+        """Run a lock script on Redis and return its result."""
+        backend = caches["default"]
+        client = backend.client.get_client(write=True)
+        response = client.register_script(script)(
+            keys=[backend.make_key(self._lock_key)],
+            args=[arg if isinstance(arg, int) else backend.client.encode(arg) for arg in args],
+        )
+        if response[0]:
+            return LockResult(success=True)
+        # No current lock is returned as nil
+        current_lock = response[1] if len(response) > 1 else None
+        if current_lock is None:
+            return LockResult(success=False)
+        return LockResult(success=False, current_lock=backend.client.decode(current_lock))
+
+    @staticmethod
+    def _is_redis_cache():
+        """Check if the default cache is a Redis cache supporting scripts."""
+        return isinstance(caches["default"], RedisCache)
+
+    def lock_or_refresh(self, lock_value: str) -> LockResult:
+        """Lock the item if it is not locked, refresh the lock if it holds the same value."""
+        if self._is_redis_cache():
+            return self._run_script(LOCK_OR_REFRESH_SCRIPT, lock_value, self.lock_timeout)
+
+        with self._local_lock:
+            current_lock = self.get_lock()
+            if current_lock is None:
+                self.lock(lock_value)
+                return LockResult(success=True)
+            if current_lock == lock_value:
+                self.refresh_lock()
+                return LockResult(success=True)
+            return LockResult(success=False, current_lock=current_lock)
+
+    def refresh_lock_if_match(self, lock_value: str) -> LockResult:
+        """Refresh the lock if it holds the given value."""
+        if self._is_redis_cache():
+            return self._run_script(REFRESH_IF_MATCH_SCRIPT, lock_value, self.lock_timeout)
+
+        with self._local_lock:
+            current_lock = self.get_lock(default="")
+            if current_lock != lock_value:
+                return LockResult(success=False, current_lock=current_lock)
+            self.refresh_lock()
+            return LockResult(success=True)
+
+    def unlock_if_match(self, lock_value: str) -> LockResult:
+        """Unlock the item if the lock holds the given value."""
+        if self._is_redis_cache():
+            return self._run_script(UNLOCK_IF_MATCH_SCRIPT, lock_value)
+
+        with self._local_lock:
+            current_lock = self.get_lock(default="")
+            if current_lock != lock_value:
+                return LockResult(success=False, current_lock=current_lock)
+            self.unlock()
+            return LockResult(success=True)
+
+    def relock_if_match(self, old_lock_value: str, new_lock_value: str) -> LockResult:
+        """Replace the lock by a new one if it holds the old value."""
+        if self._is_redis_cache():
+            return self._run_script(
+                RELOCK_IF_MATCH_SCRIPT, old_lock_value, new_lock_value, self.lock_timeout
+            )
+
+        with self._local_lock:
+            current_lock = self.get_lock(default="")
+            if current_lock != old_lock_value:
+                return LockResult(success=False, current_lock=current_lock)
+            self.lock(new_lock_value)
+            return LockResult(success=True)
@@ -0,0 +1,35 @@
+"""
+Declare and configure the signals for the wopi application
+"""
+
+from functools import partial
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import signals
+from django.dispatch import receiver
+
+from core.models import Item
+from wopi.services.access import get_item_version_cache_key
+
+
+@receiver(signals.post_save, sender=Item)
+@receiver(signals.post_delete, sender=Item)
+def bump_wopi_item_version(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Change the version of the item so the processes holding it in memory for a signed
+    access token load it again from the database, once the transaction is committed.
+    """
+    if not settings.WOPI_ACCESS_TOKEN_SIGNED:
+        return
+
+    transaction.on_commit(
+        partial(
+            cache.set,
+            get_item_version_cache_key(instance.id),
+            uuid4().hex,
+            timeout=settings.WOPI_ACCESS_TOKEN_TIMEOUT,
+        )
+    )
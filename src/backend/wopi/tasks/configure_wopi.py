@@ -1,6 +1,8 @@
 """Task configuring WOPI using discovery url."""
 
 from base64 import b64decode
+from copy import deepcopy
+from uuid import uuid4
 
 from django.conf import settings
 from django.core.cache import cache
@@ -15,6 +17,7 @@ from defusedxml.ElementTree import fromstring
 from drive.celery_app import app as celery_app
 
 WOPI_CONFIGURATION_CACHE_KEY = "wopi_configuration"
+WOPI_CONFIGURATION_VERSION_CACHE_KEY = "wopi_configuration_version"
 WOPI_DEFAULT_CONFIGURATION = {
     "mimetypes": {},
     "extensions": {},
@@ -39,14 +42,36 @@ def setup_periodic_tasks(sender: Celery, **kwargs):
 
 @celery_app.task
 def configure_wopi_clients():
-    """Configure wopi clients from discovery url."""
-    cache.delete(WOPI_CONFIGURATION_CACHE_KEY)
+    """
+    Configure wopi clients from discovery url.
+    The configuration is built in memory and replaces the previous one at once, the
+    previous one is kept if a discovery fails. A new version is then published for the
+    processes holding the configuration in memory.
+    """
+    wopi_configuration = deepcopy(WOPI_DEFAULT_CONFIGURATION)
 
     for client in settings.WOPI_CLIENTS:
         _configure_wopi_client_from_discovery(
-            client, settings.WOPI_CLIENTS_CONFIGURATION[client]["discovery_url"]
+            client,
+            settings.WOPI_CLIENTS_CONFIGURATION[client]["discovery_url"],
+            wopi_configuration,
         )
 
+    if settings.WOPI_CLIENTS:
+        cache.set(
+            WOPI_CONFIGURATION_CACHE_KEY,
+            wopi_configuration,
+            timeout=settings.WOPI_CONFIGURATION_CACHE_EXPIRATION,
+        )
+    else:
+        cache.delete(WOPI_CONFIGURATION_CACHE_KEY)
+
+    cache.set(
+        WOPI_CONFIGURATION_VERSION_CACHE_KEY,
+        uuid4().hex,
+        timeout=settings.WOPI_CONFIGURATION_CACHE_EXPIRATION,
+    )
+
 
 def build_rsa_public_key(modulus, exponent):
     """Build RSA public key from modulus and exponent."""
@@ -61,8 +86,8 @@ def build_rsa_public_key(modulus, exponent):
     )
 
 
-def _configure_wopi_client_from_discovery(client, discovery_url):
-    """Configure wopi client from discovery url."""
+def _configure_wopi_client_from_discovery(client, discovery_url, wopi_configuration):
+    """Add the configuration of a wopi client from its discovery url."""
 
     response = requests.get(discovery_url, timeout=30)
 
@@ -72,11 +97,6 @@ def _configure_wopi_client_from_discovery(client, discovery_url):
             f"wopi client {client} is invalid"
         )
 
-    wopi_configuration = cache.get(
-        WOPI_CONFIGURATION_CACHE_KEY,
-        default=WOPI_DEFAULT_CONFIGURATION,
-    )
-
     root = fromstring(response.content)
 
     # Find the net-zone element
@@ -137,9 +157,3 @@ def _configure_wopi_client_from_discovery(client, discovery_url):
                     "launch_url": action.get("urlsrc"),
                     "client": client,
                 }
-
-    cache.set(
-        WOPI_CONFIGURATION_CACHE_KEY,
-        wopi_configuration,
-        timeout=settings.WOPI_CONFIGURATION_CACHE_EXPIRATION,
-    )
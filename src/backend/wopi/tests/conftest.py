@@ -4,7 +4,9 @@ from django.core.cache import cache
 
 import pytest
 
+from wopi.services.access import access_user_item_lru
 from wopi.tasks.configure_wopi import WOPI_CONFIGURATION_CACHE_KEY
+from wopi.utils import local_wopi_configuration
 
 
 @pytest.fixture(autouse=True)
@@ -12,6 +14,8 @@ def clear_cache():
     """Fixture to clear the cache before each test."""
     yield
     cache.clear()
+    access_user_item_lru.clear()
+    local_wopi_configuration.clear()
 
 
 @pytest.fixture
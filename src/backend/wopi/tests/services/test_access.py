@@ -9,8 +9,10 @@ from django.core.cache import cache
 import pytest
 
 from core.factories import ItemFactory, UserFactory, UserItemAccessFactory
-from core.models import LinkReachChoices
+from core.models import Item, LinkReachChoices, RoleChoices
 from wopi.services.access import (
+    AccessTokenExpiredError,
+    AccessTokenRevokedError,
     AccessUserItem,
     AccessUserItemInvalidDataError,
     AccessUserItemNotAllowed,
@@ -217,3 +219,273 @@ def test_access_user_item_service_retrieve_data_with_invalid_token():
 
     with pytest.raises(AccessUserItemNotFoundError):
         access_user_item_service.get_access_user_item("invalid-token")
+
+
+def test_access_user_item_get_abilities_computed_once(django_assert_num_queries):
+    """Abilities not carried by the token should be computed once."""
+    access = UserItemAccessFactory(role=RoleChoices.EDITOR)
+    access_user_item = AccessUserItem(item=access.item, user=access.user)
+
+    abilities = access_user_item.get_abilities()
+    assert abilities["update"] is True
+
+    with django_assert_num_queries(0):
+        assert access_user_item.get_abilities() == abilities
+
+
+def test_access_user_item_service_revoke_random_token():
+    """Revoking a random access token should remove it from the cache."""
+    access = UserItemAccessFactory()
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    access_user_item_service.revoke_access(access_token)
+
+    assert cache.get(access_token) is None
+    with pytest.raises(AccessUserItemNotFoundError):
+        access_user_item_service.get_access_user_item(access_token)
+
+
+# Signed access tokens
+
+
+@pytest.mark.parametrize(
+    "role,expected_abilities",
+    [
+        (RoleChoices.READER, {"retrieve": True, "update": False}),
+        (RoleChoices.EDITOR, {"retrieve": True, "update": True}),
+    ],
+)
+def test_access_user_item_service_signed_token(settings, role, expected_abilities):
+    """
+    A signed access token should not be stored in the cache and carry the item,
+    the user and the abilities granted.
+    """
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    settings.WOPI_ACCESS_TOKEN_TIMEOUT = 60
+    access = UserItemAccessFactory(role=role)
+
+    with patch.object(timezone, "now", return_value=datetime(2025, 3, 10, 12, 0, 0)):
+        access_user_item_service = AccessUserItemService()
+        access_token, access_token_ttl = access_user_item_service.insert_new_access(
+            access.item, access.user
+        )
+
+    assert access_token_ttl == 1741608060000
+    assert access_user_item_service.is_signed_token(access_token)
+    assert cache.get(access_token) is None
+
+    with patch("wopi.services.access.time.time", return_value=1741608000):
+        access_user_item = access_user_item_service.get_access_user_item(access_token)
+
+    assert access_user_item.item == access.item
+    assert access_user_item.user == access.user
+    assert access_user_item.get_abilities() == expected_abilities
+
+
+def test_access_user_item_service_signed_token_anonymous_user(settings):
+    """A signed access token can be issued to an anonymous user."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    item = ItemFactory(link_reach=LinkReachChoices.PUBLIC)
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(item, AnonymousUser())
+
+    access_user_item = access_user_item_service.get_access_user_item(access_token)
+    assert access_user_item.item == item
+    assert isinstance(access_user_item.user, AnonymousUser)
+    assert access_user_item.get_abilities() == {"retrieve": True, "update": False}
+
+
+def test_access_user_item_service_signed_token_expired(settings):
+    """An expired signed access token should be rejected."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user, ttl=-1)
+
+    with pytest.raises(AccessTokenExpiredError):
+        access_user_item_service.get_access_user_item(access_token)
+
+
+def test_access_user_item_service_signed_token_tampered(settings):
+    """A signed access token with an invalid signature should be rejected."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    with pytest.raises(AccessUserItemInvalidDataError):
+        access_user_item_service.get_access_user_item(f"{access_token}a")
+
+
+def test_access_user_item_service_signed_token_revoked(settings):
+    """A revoked signed access token should be rejected until it expires."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+    access_user_item_service.get_access_user_item(access_token)
+
+    access_user_item_service.revoke_access(access_token)
+
+    with pytest.raises(AccessTokenRevokedError):
+        access_user_item_service.get_access_user_item(access_token)
+
+
+def test_access_user_item_service_signed_token_lru(settings, django_assert_num_queries):
+    """
+    The item and the user hydrated from a signed access token should be kept in memory,
+    without sharing the same instances between calls.
+    """
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    # The item, the user and the role of the user to compute the abilities
+    with django_assert_num_queries(3):
+        first_access_user_item = access_user_item_service.get_access_user_item(access_token)
+
+    with django_assert_num_queries(0):
+        second_access_user_item = access_user_item_service.get_access_user_item(access_token)
+
+    assert second_access_user_item.item == access.item
+    assert second_access_user_item.item.creator == access.item.creator
+    assert second_access_user_item.user == access.user
+    assert second_access_user_item.item is not first_access_user_item.item
+
+
+def test_access_user_item_service_signed_token_lru_disabled(settings, django_assert_num_queries):
+    """Setting WOPI_ACCESS_TOKEN_LRU_SIZE to 0 should disable the in memory cache."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    settings.WOPI_ACCESS_TOKEN_LRU_SIZE = 0
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    access_user_item_service.get_access_user_item(access_token)
+    with django_assert_num_queries(3):
+        access_user_item_service.get_access_user_item(access_token)
+
+
+def test_access_user_item_service_signed_token_lru_invalidated_on_item_save(
+    settings, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """Saving the item should invalidate the instances kept in memory."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+    access_user_item_service.get_access_user_item(access_token)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        access.item.title = "new title"
+        access.item.save()
+
+    with django_assert_num_queries(3):
+        access_user_item = access_user_item_service.get_access_user_item(access_token)
+
+    assert access_user_item.item.title == "new title"
+
+
+def test_access_user_item_service_signed_token_setting_disabled(settings):
+    """Signed access tokens should not be accepted once WOPI_ACCESS_TOKEN_SIGNED is disabled."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory()
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    settings.WOPI_ACCESS_TOKEN_SIGNED = False
+    assert not access_user_item_service.is_signed_token(access_token)
+    with pytest.raises(AccessUserItemNotFoundError):
+        access_user_item_service.get_access_user_item(access_token)
+
+
+def test_access_user_item_service_signed_token_access_downgraded(settings):
+    """A user downgraded after the token was issued should lose the update ability."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory(role=RoleChoices.EDITOR)
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": True,
+        "update": True,
+    }
+
+    access.role = RoleChoices.READER
+    access.save()
+
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": True,
+        "update": False,
+    }
+
+
+def test_access_user_item_service_signed_token_ancestor_access_removed(settings):
+    """A user whose access on an ancestor was removed should lose the abilities granted."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory(role=RoleChoices.EDITOR, item__type="folder")
+    item = ItemFactory(parent=access.item, type="file")
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(item, access.user)
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities()["update"]
+
+    access.delete()
+
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": False,
+        "update": False,
+    }
+
+
+def test_access_user_item_service_signed_token_ancestor_link_restricted(settings):
+    """
+    An anonymous user should lose the abilities granted by the link of an ancestor once
+    it is restricted, when the item is loaded again from the database.
+    """
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    parent = ItemFactory(type="folder", link_reach=LinkReachChoices.PUBLIC, link_role="editor")
+    item = ItemFactory(parent=parent, type="file", link_reach=None)
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(item, AnonymousUser())
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": True,
+        "update": True,
+    }
+
+    # Bulk updates of the ancestors do not change the version of the item
+    Item.objects.filter(pk=parent.pk).update(link_reach=LinkReachChoices.RESTRICTED)
+    settings.WOPI_ACCESS_TOKEN_LRU_TIMEOUT = -1
+
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": False,
+        "update": False,
+    }
+
+
+def test_access_user_item_service_signed_token_no_escalation(settings):
+    """A signed token should not grant more abilities than those it was issued with."""
+    settings.WOPI_ACCESS_TOKEN_SIGNED = True
+    access = UserItemAccessFactory(role=RoleChoices.READER)
+
+    access_user_item_service = AccessUserItemService()
+    access_token, _ = access_user_item_service.insert_new_access(access.item, access.user)
+
+    access.role = RoleChoices.EDITOR
+    access.save()
+
+    assert access_user_item_service.get_access_user_item(access_token).get_abilities() == {
+        "retrieve": True,
+        "update": False,
+    }
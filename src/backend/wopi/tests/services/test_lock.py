@@ -3,7 +3,7 @@
 import pytest
 
 from core import factories
-from wopi.services.lock import LockService
+from wopi.services.lock import LockResult, LockService
 
 pytestmark = pytest.mark.django_db
 
@@ -26,3 +26,74 @@ def test_lock_service():
     lock_service.unlock()
     assert lock_service.is_locked() is False
     assert lock_service.get_lock() is None
+
+
+def test_lock_service_lock_or_refresh():
+    """The item should be locked if free, the lock refreshed if it holds the same value."""
+    item = factories.ItemFactory()
+    lock_service = LockService(item)
+
+    assert lock_service.lock_or_refresh("1234567890") == LockResult(success=True)
+    assert lock_service.get_lock() == "1234567890"
+
+    assert lock_service.lock_or_refresh("1234567890") == LockResult(success=True)
+    assert lock_service.get_lock() == "1234567890"
+
+    assert lock_service.lock_or_refresh("other") == LockResult(
+        success=False, current_lock="1234567890"
+    )
+    assert lock_service.get_lock() == "1234567890"
+
+
+def test_lock_service_refresh_lock_if_match():
+    """The lock should only be refreshed if it holds the given value."""
+    item = factories.ItemFactory()
+    lock_service = LockService(item)
+
+    assert lock_service.refresh_lock_if_match("1234567890") == LockResult(
+        success=False, current_lock=""
+    )
+    assert lock_service.is_locked() is False
+
+    lock_service.lock("1234567890")
+    assert lock_service.refresh_lock_if_match("other") == LockResult(
+        success=False, current_lock="1234567890"
+    )
+    assert lock_service.refresh_lock_if_match("1234567890") == LockResult(success=True)
+
+
+def test_lock_service_unlock_if_match():
+    """The item should only be unlocked if the lock holds the given value."""
+    item = factories.ItemFactory()
+    lock_service = LockService(item)
+
+    assert lock_service.unlock_if_match("1234567890") == LockResult(success=False, current_lock="")
+
+    lock_service.lock("1234567890")
+    assert lock_service.unlock_if_match("other") == LockResult(
+        success=False, current_lock="1234567890"
+    )
+    assert lock_service.is_locked() is True
+
+    assert lock_service.unlock_if_match("1234567890") == LockResult(success=True)
+    assert lock_service.is_locked() is False
+
+
+def test_lock_service_relock_if_match():
+    """The lock should only be replaced if it holds the old value."""
+    item = factories.ItemFactory()
+    lock_service = LockService(item)
+
+    assert lock_service.relock_if_match("1234567890", "new") == LockResult(
+        success=False, current_lock=""
+    )
+    assert lock_service.is_locked() is False
+
+    lock_service.lock("1234567890")
+    assert lock_service.relock_if_match("other", "new") == LockResult(
+        success=False, current_lock="1234567890"
+    )
+    assert lock_service.get_lock() == "1234567890"
+
+    assert lock_service.relock_if_match("1234567890", "new") == LockResult(success=True)
+    assert lock_service.get_lock() == "new"
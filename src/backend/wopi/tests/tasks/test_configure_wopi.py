@@ -7,6 +7,7 @@ import responses
 
 from wopi.tasks.configure_wopi import (
     WOPI_CONFIGURATION_CACHE_KEY,
+    WOPI_CONFIGURATION_VERSION_CACHE_KEY,
     configure_wopi_clients,
 )
 
@@ -164,3 +165,95 @@ def test_configure_wopi_clients_request_failing(settings):
         match="status code 500 return by discovery url for wopi client vendorA is invalid",
     ):
         configure_wopi_clients()
+
+
+@responses.activate
+def test_configure_wopi_clients_publish_new_version(settings):
+    """Each refresh of the configuration should publish a new version."""
+
+    settings.WOPI_CLIENTS = ["vendorA"]
+    settings.WOPI_CLIENTS_CONFIGURATION = {
+        "vendorA": {
+            "discovery_url": "https://vendorA.com/hosting/discovery",
+        }
+    }
+
+    # pylint: disable=line-too-long
+    responses.add(
+        responses.GET,
+        "https://vendorA.com/hosting/discovery",
+        body="""
+<wopi-discovery>
+    <net-zone name="external-http">
+        <app name="application/vnd.oasis.opendocument.text">
+            <action default="true" ext="" name="edit" urlsrc="http://localhost:9980/browser/0968141f2c/cool.html?"/>
+        </app>
+    </net-zone>
+</wopi-discovery>
+""",
+    )
+
+    configure_wopi_clients()
+    first_version = cache.get(WOPI_CONFIGURATION_VERSION_CACHE_KEY)
+    assert first_version is not None
+
+    configure_wopi_clients()
+    assert cache.get(WOPI_CONFIGURATION_VERSION_CACHE_KEY) not in (None, first_version)
+
+
+@responses.activate
+def test_configure_wopi_clients_request_failing_keeps_previous_configuration(settings):
+    """
+    When a discovery fails, the previous configuration should be kept: it is never
+    removed nor partially updated.
+    """
+
+    settings.WOPI_CLIENTS = ["vendorA", "vendorB"]
+    settings.WOPI_CLIENTS_CONFIGURATION = {
+        "vendorA": {
+            "discovery_url": "https://vendorA.com/hosting/discovery",
+        },
+        "vendorB": {
+            "discovery_url": "https://vendorB.com/hosting/discovery",
+        },
+    }
+    previous_configuration = {
+        "mimetypes": {},
+        "extensions": {
+            "odt": {
+                "launch_url": "http://localhost:9980/browser/0968141f2c/cool.html?",
+                "client": "vendorA",
+            },
+        },
+        "vendorA": {
+            "proof_keys": {},
+        },
+    }
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, previous_configuration)
+    cache.set(WOPI_CONFIGURATION_VERSION_CACHE_KEY, "previous")
+
+    # pylint: disable=line-too-long
+    responses.add(
+        responses.GET,
+        "https://vendorA.com/hosting/discovery",
+        body="""
+<wopi-discovery>
+    <net-zone name="external-http">
+        <app name="application/vnd.oasis.opendocument.text">
+            <action default="true" ext="" name="edit" urlsrc="http://localhost:9980/browser/0968141f2c/cool.html?"/>
+        </app>
+    </net-zone>
+</wopi-discovery>
+""",
+    )
+    responses.add(
+        responses.GET,
+        "https://vendorB.com/hosting/discovery",
+        status=500,
+    )
+
+    with pytest.raises(RuntimeError):
+        configure_wopi_clients()
+
+    assert cache.get(WOPI_CONFIGURATION_CACHE_KEY) == previous_configuration
+    assert cache.get(WOPI_CONFIGURATION_VERSION_CACHE_KEY) == "previous"
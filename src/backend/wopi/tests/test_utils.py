@@ -1,5 +1,6 @@
 """Tests for the wopi utils."""
 
+from unittest import mock
 from urllib.parse import quote_plus
 
 from django.contrib.auth.models import AnonymousUser
@@ -9,11 +10,17 @@ import pytest
 
 from core import models
 from core.factories import ItemFactory, UserFactory
-from wopi.tasks.configure_wopi import WOPI_CONFIGURATION_CACHE_KEY
+from wopi.tasks.configure_wopi import (
+    WOPI_CONFIGURATION_CACHE_KEY,
+    WOPI_CONFIGURATION_VERSION_CACHE_KEY,
+)
 from wopi.utils import (
+    UnsatisfiableRangeError,
     compute_wopi_launch_url,
     get_wopi_client_config,
+    get_wopi_configuration,
     is_item_wopi_supported,
+    parse_range_header,
 )
 
 pytestmark = pytest.mark.django_db
@@ -683,3 +690,76 @@ def test_compute_wopi_launch_url_placeholders(settings):
     assert compute_wopi_launch_url(launch_url, get_file_info_path) == (
         f"{expected_launch_url}?WOPISrc={quote_plus(get_file_info_path)}&closebutton=false&dchat=1"
     )
+
+
+@pytest.mark.parametrize(
+    "range_header,expected",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=10-", (10, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-500", (0, 99)),
+        ("bytes=50-500", (50, 99)),
+        ("bytes=99-99", (99, 99)),
+        ("bytes=9-0", None),
+        ("bytes=-", None),
+        ("bytes=0-1,5-6", None),
+        ("lines=0-9", None),
+    ],
+)
+def test_parse_range_header(range_header, expected):
+    """Test the parse_range_header function."""
+    assert parse_range_header(range_header, 100) == expected
+
+
+@pytest.mark.parametrize(
+    "range_header,size",
+    [("bytes=100-", 100), ("bytes=100-200", 100), ("bytes=-0", 100), ("bytes=-1", 0)],
+)
+def test_parse_range_header_not_satisfiable(range_header, size):
+    """A range out of the file bounds should raise an UnsatisfiableRangeError."""
+    with pytest.raises(UnsatisfiableRangeError):
+        parse_range_header(range_header, size)
+
+
+def test_get_wopi_configuration_without_version():
+    """Without a published version, the configuration should be read from the cache."""
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"odt": {}}})
+    assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"odt": {}}}
+
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"ods": {}}})
+    assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"ods": {}}}
+
+
+def test_get_wopi_configuration_kept_in_memory(settings):
+    """A versioned configuration should be kept in memory until its version changes."""
+    settings.WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL = 0
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"odt": {}}})
+    cache.set(WOPI_CONFIGURATION_VERSION_CACHE_KEY, "v1")
+    assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"odt": {}}}
+
+    # Same version: the configuration is not read again
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"ods": {}}})
+    with mock.patch.object(cache, "get", wraps=cache.get) as mock_cache_get:
+        assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"odt": {}}}
+    mock_cache_get.assert_called_once_with(WOPI_CONFIGURATION_VERSION_CACHE_KEY)
+
+    # New version: the configuration is refreshed
+    cache.set(WOPI_CONFIGURATION_VERSION_CACHE_KEY, "v2")
+    assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"ods": {}}}
+
+
+def test_get_wopi_configuration_version_check_interval(settings):
+    """The version should not be checked more than once per interval."""
+    settings.WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL = 60
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"odt": {}}})
+    cache.set(WOPI_CONFIGURATION_VERSION_CACHE_KEY, "v1")
+    assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"odt": {}}}
+
+    cache.set(WOPI_CONFIGURATION_CACHE_KEY, {"mimetypes": {}, "extensions": {"ods": {}}})
+    cache.set(WOPI_CONFIGURATION_VERSION_CACHE_KEY, "v2")
+    with mock.patch.object(cache, "get", wraps=cache.get) as mock_cache_get:
+        assert get_wopi_configuration() == {"mimetypes": {}, "extensions": {"odt": {}}}
+    mock_cache_get.assert_not_called()
@@ -347,3 +347,16 @@ def test_verify_wopi_proof_wrong_key():
     )
 
     assert result is False
+
+
+def test_load_public_key_loaded_once():
+    """A proof key should only be deserialized once per process."""
+    private_key, public_key = _generate_rsa_keypair()
+    pem = _serialize_public_key(public_key)
+    signature.load_public_key.cache_clear()
+
+    loaded_key = signature.load_public_key(pem)
+
+    assert signature.load_public_key(pem) is loaded_key
+    assert signature.load_public_key.cache_info().hits == 1
+    assert loaded_key.public_numbers() == private_key.public_key().public_numbers()
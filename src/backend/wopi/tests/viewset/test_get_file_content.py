@@ -145,3 +145,126 @@ def test_get_file_content_max_expected_size():
         HTTP_X_WOPI_MAXEXPECTEDSIZE="2",
     )
     assert response.status_code == 412
+
+
+def _create_wopi_item_with_content(content):
+    """Create an item readable by a user with some content and return an access token."""
+    folder = factories.ItemFactory(type=models.ItemTypeChoices.FOLDER)
+    item = factories.ItemFactory(
+        parent=folder,
+        type=models.ItemTypeChoices.FILE,
+        filename="wopi_test.txt",
+        update_upload_state=models.ItemUploadStateChoices.READY,
+        link_reach=models.LinkReachChoices.RESTRICTED,
+        link_role=models.LinkRoleChoices.EDITOR,
+    )
+    user = factories.UserFactory()
+    factories.UserItemAccessFactory(item=item, user=user, role=models.RoleChoices.EDITOR)
+
+    default_storage.save(item.file_key, BytesIO(content))
+
+    service = AccessUserItemService()
+    access_token, _ = service.insert_new_access(item, user)
+
+    return item, access_token
+
+
+@pytest.mark.parametrize(
+    "range_header,expected_content,expected_content_range",
+    [
+        ("bytes=0-1", b"my", "bytes 0-1/8"),
+        ("bytes=3-", b"prose", "bytes 3-7/8"),
+        ("bytes=-4", b"rose", "bytes 4-7/8"),
+        ("bytes=5-100", b"ose", "bytes 5-7/8"),
+    ],
+)
+def test_get_file_content_range(range_header, expected_content, expected_content_range):
+    """A single byte range should be served as partial content."""
+    item, access_token = _create_wopi_item_with_content(b"my prose")
+
+    client = APIClient()
+    response = client.get(
+        f"/api/v1.0/wopi/files/{item.id}/contents/",
+        HTTP_AUTHORIZATION=f"Bearer {access_token}",
+        HTTP_RANGE=range_header,
+    )
+    assert response.status_code == 206
+    assert b"".join(response.streaming_content) == expected_content
+    assert response.headers["Content-Range"] == expected_content_range
+    assert response.headers["Content-Length"] == str(len(expected_content))
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+@pytest.mark.parametrize(
+    "range_header",
+    ["bytes=0-1,4-5", "items=0-1", "bytes=5-2", "bytes=-", "invalid"],
+)
+def test_get_file_content_range_ignored(range_header):
+    """Ranges that can not be honored should fall back to the whole file."""
+    item, access_token = _create_wopi_item_with_content(b"my prose")
+
+    client = APIClient()
+    response = client.get(
+        f"/api/v1.0/wopi/files/{item.id}/contents/",
+        HTTP_AUTHORIZATION=f"Bearer {access_token}",
+        HTTP_RANGE=range_header,
+    )
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == b"my prose"
+    assert "Content-Range" not in response.headers
+    assert response.headers["Content-Length"] == "8"
+
+
+@pytest.mark.parametrize("range_header", ["bytes=8-", "bytes=20-30", "bytes=-0"])
+def test_get_file_content_range_not_satisfiable(range_header):
+    """A range starting beyond the end of the file should return a 416."""
+    item, access_token = _create_wopi_item_with_content(b"my prose")
+
+    client = APIClient()
+    response = client.get(
+        f"/api/v1.0/wopi/files/{item.id}/contents/",
+        HTTP_AUTHORIZATION=f"Bearer {access_token}",
+        HTTP_RANGE=range_header,
+    )
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */8"
+
+
+def test_get_file_content_chunk_size(settings):
+    """The file should be streamed by chunks of WOPI_GET_FILE_CHUNK_SIZE bytes."""
+    settings.WOPI_GET_FILE_CHUNK_SIZE = 3
+    item, access_token = _create_wopi_item_with_content(b"my prose")
+
+    client = APIClient()
+    response = client.get(
+        f"/api/v1.0/wopi/files/{item.id}/contents/",
+        HTTP_AUTHORIZATION=f"Bearer {access_token}",
+    )
+    assert response.status_code == 200
+    assert list(response.streaming_content) == [b"my ", b"pro", b"se"]
+
+
+def test_get_file_content_x_accel_redirect(settings):
+    """
+    When an X-Accel-Redirect location is configured, the transfer should be delegated
+    to nginx with the S3 authorization headers.
+    """
+    settings.WOPI_GET_FILE_X_ACCEL_REDIRECT_LOCATION = "/wopi-media/"
+    item, access_token = _create_wopi_item_with_content(b"my prose")
+    head_response = default_storage.connection.meta.client.head_object(
+        Bucket=default_storage.bucket_name, Key=item.file_key
+    )
+
+    client = APIClient()
+    response = client.get(
+        f"/api/v1.0/wopi/files/{item.id}/contents/",
+        HTTP_AUTHORIZATION=f"Bearer {access_token}",
+        HTTP_RANGE="bytes=0-1",
+    )
+    assert response.status_code == 200
+    assert not response.content
+    assert response.headers["X-Accel-Redirect"] == f"/wopi-media/{item.file_key}"
+    assert response.headers["X-WOPI-ItemVersion"] == head_response["ETag"].strip('"')
+    assert response.headers["Authorization"].startswith("AWS4-HMAC-SHA256 Credential=")
+    assert response.headers["X-Amz-Date"]
+    assert response.headers["X-Amz-Content-SHA256"]
@@ -53,7 +53,7 @@ def test_put_file_content_connected_user_with_access():
             },
         )
 
-    mock_analyse_file.assert_called_once_with(item.file_key, item_id=item.id)
+    mock_analyse_file.assert_called_once_with(item.file_key, item_id=item.id, analysis_version=1)
     assert response.status_code == 200
     assert "X-WOPI-ItemVersion" in response.headers
 
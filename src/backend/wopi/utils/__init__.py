@@ -1,6 +1,7 @@
 """Utils for WOPI"""
 
 import re
+import time
 from urllib.parse import urlencode, urlparse
 
 from django.conf import settings
@@ -9,10 +10,16 @@ from django.core.cache import cache
 from core import models
 from wopi.tasks.configure_wopi import (
     WOPI_CONFIGURATION_CACHE_KEY,
+    WOPI_CONFIGURATION_VERSION_CACHE_KEY,
     WOPI_DEFAULT_CONFIGURATION,
 )
 
 LAUNCH_URL_PLACEHOLDER_REGEX = r"(<(?P<name>[a-z]+)=(?P<placeholder>[a-zA-Z0-9_]+)&?>)"
+BYTE_RANGE_REGEX = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+
+class UnsatisfiableRangeError(Exception):
+    """Exception for when a requested byte range can not be served."""
 
 
 def is_item_wopi_supported(item, user):
@@ -62,9 +69,52 @@ def get_wopi_client_proof_keys(item, user):
     return wopi_configuration[wopi_client_config["client"]]["proof_keys"]
 
 
+class LocalWopiConfiguration:
+    """
+    Process local copy of the wopi configuration. It is kept as long as the version
+    published in the cache by the configure_wopi_clients task does not change, the
+    version being checked at most every WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        # (version, checked_at, configuration), replaced at once on refresh
+        self._state = None
+
+    def get(self):
+        """Return the wopi configuration."""
+        state = self._state
+        checked_at = time.monotonic()
+        if (
+            state is not None
+            and checked_at - state[1] < settings.WOPI_CONFIGURATION_VERSION_CHECK_INTERVAL
+        ):
+            return state[2]
+
+        version = cache.get(WOPI_CONFIGURATION_VERSION_CACHE_KEY)
+        if version is None:
+            # No version published, the configuration can not be kept in memory
+            self._state = None
+            return cache.get(WOPI_CONFIGURATION_CACHE_KEY, default=WOPI_DEFAULT_CONFIGURATION)
+
+        if state is not None and state[0] == version:
+            self._state = (version, checked_at, state[2])
+            return state[2]
+
+        configuration = cache.get(WOPI_CONFIGURATION_CACHE_KEY, default=WOPI_DEFAULT_CONFIGURATION)
+        self._state = (version, checked_at, configuration)
+        return configuration
+
+    def clear(self):
+        """Drop the local copy of the wopi configuration."""
+        self._state = None
+
+
+local_wopi_configuration = LocalWopiConfiguration()
+
+
 def get_wopi_configuration():
     """get the wopi configuration"""
-    return cache.get(WOPI_CONFIGURATION_CACHE_KEY, default=WOPI_DEFAULT_CONFIGURATION)
+    return local_wopi_configuration.get()
 
 
 def compute_wopi_launch_url(launch_url, get_file_info_path, lang=None):
@@ -121,3 +171,40 @@ def get_wopi_item_version(head_object):
         return str(last_modified)
 
     return str(head_object.get("ContentLength", "0"))
+
+
+def parse_range_header(range_header, size):
+    """
+    Parse a HTTP Range header against a file of the given size.
+
+    Return a (start, end) tuple of inclusive byte offsets, or None when the header is
+    missing or can not be honored (unsupported unit, multiple ranges, malformed value).
+    In that case the whole file should be served, as allowed by RFC 9110.
+    Raise UnsatisfiableRangeError when the range is valid but starts beyond the file end.
+    """
+    if not range_header:
+        return None
+
+    match = BYTE_RANGE_REGEX.match(range_header.strip())
+    if not match:
+        return None
+
+    start, end = match.group("start"), match.group("end")
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range, the last n bytes of the file
+        suffix_length = int(end)
+        if suffix_length == 0 or size == 0:
+            raise UnsatisfiableRangeError()
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise UnsatisfiableRangeError()
+    end = int(end) if end else size - 1
+
+    return start, min(end, size - 1)
@@ -7,6 +7,7 @@ https://learn.microsoft.com/en-us/microsoft-365/cloud-storage-partner-program/on
 import struct
 from base64 import b64decode
 from datetime import datetime, timezone
+from functools import lru_cache
 
 from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes, serialization
@@ -87,6 +88,12 @@ def build_expected_proof(access_token: str, url: str, timestamp: int) -> bytes:
 # ---------- RSA SIGNATURE VERIFICATION ----------
 
 
+@lru_cache(maxsize=16)
+def load_public_key(pem: bytes):
+    """Load a PEM public key, once per process as proof keys only change on rotation."""
+    return serialization.load_pem_public_key(pem)
+
+
 def verify_wopi_proof(
     proof_keys: dict[str, bytes],
     signature: str,
@@ -99,10 +106,10 @@ def verify_wopi_proof(
     https://learn.microsoft.com/en-us/microsoft-365/cloud-storage-partner-program/online/scenarios/proofkeys#verifying-the-proof-keys
     """
 
-    public_key = serialization.load_pem_public_key(proof_keys["public_key"])
+    public_key = load_public_key(proof_keys["public_key"])
     old_public_key = None
     if proof_keys.get("old_public_key"):
-        old_public_key = serialization.load_pem_public_key(proof_keys["old_public_key"])
+        old_public_key = load_public_key(proof_keys["old_public_key"])
 
     try:
         signed_proof = b64decode(signature)
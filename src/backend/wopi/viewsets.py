@@ -4,6 +4,7 @@ import logging
 import uuid
 from datetime import timedelta
 from os.path import splitext
+from urllib.parse import quote
 
 from django.conf import settings
 from django.core.exceptions import RequestDataTooBig
@@ -13,22 +14,24 @@ from django.db import transaction
 from django.http import StreamingHttpResponse
 from django.utils.timezone import now
 
-from lasuite.malware_detection import malware_detection
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from sentry_sdk import capture_exception
 
-from core.api.utils import get_item_file_head_object
+from core.api.utils import generate_s3_authorization_headers, get_item_file_head_object
 from core.models import Item
+from core.tasks.malware_detection import schedule_item_file_analysis
 from wopi.authentication import WopiAccessTokenAuthentication, get_access_token
 from wopi.exceptions import WopiRequestSignatureError
 from wopi.permissions import AccessTokenPermission
 from wopi.services.lock import LockService
 from wopi.utils import (
+    UnsatisfiableRangeError,
     get_wopi_client_config,
     get_wopi_client_proof_keys,
     get_wopi_item_version,
+    parse_range_header,
     signature,
 )
 
@@ -41,6 +44,7 @@ HTTP_X_WOPI_OVERRIDE = "HTTP_X_WOPI_OVERRIDE"
 HTTP_X_WOPI_TIMESTAMP = "HTTP_X_WOPI_TIMESTAMP"
 HTTP_X_WOPI_PROOF = "HTTP_X_WOPI_PROOF"
 HTTP_X_WOPI_PROOFOLD = "HTTP_X_WOPI_PROOFOLD"
+HTTP_RANGE = "HTTP_RANGE"
 
 X_WOPI_INVALIDFILENAMERROR = "X-WOPI-InvalidFileNameError"
 X_WOPI_ITEMVERSION = "X-WOPI-ItemVersion"
@@ -120,7 +124,7 @@ class WopiViewSet(viewsets.ViewSet):
         https://learn.microsoft.com/en-us/microsoft-365/cloud-storage-partner-program/rest/files/checkfileinfo
         """
         item = request.auth.item
-        abilities = item.get_abilities(request.user)
+        abilities = request.auth.get_abilities()
 
         self._verify_request_signature(request)
 
@@ -193,21 +197,65 @@ class WopiViewSet(viewsets.ViewSet):
                 )
                 return Response(status=412)
 
+        if settings.WOPI_GET_FILE_X_ACCEL_REDIRECT_LOCATION:
+            return self._get_file_content_x_accel_redirect(item, head_object)
+
+        size = int(head_object["ContentLength"])
+        headers = {
+            "X-WOPI-ItemVersion": get_wopi_item_version(head_object),
+            "Accept-Ranges": "bytes",
+        }
+        get_object_args = {
+            "Bucket": default_storage.bucket_name,
+            "Key": item.file_key,
+        }
+
+        try:
+            byte_range = parse_range_header(request.META.get(HTTP_RANGE), size)
+        except UnsatisfiableRangeError:
+            return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            start, end = byte_range
+            get_object_args["Range"] = f"bytes={start}-{end}"
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = end - start + 1
+            status = 206
+        else:
+            headers["Content-Length"] = size
+            status = 200
+
         s3_client = default_storage.connection.meta.client
+        file = s3_client.get_object(**get_object_args)
 
-        file = s3_client.get_object(
-            Bucket=default_storage.bucket_name,
-            Key=item.file_key,
+        return StreamingHttpResponse(
+            streaming_content=file["Body"].iter_chunks(
+                chunk_size=settings.WOPI_GET_FILE_CHUNK_SIZE
+            ),
+            content_type=item.mimetype,
+            headers=headers,
+            status=status,
         )
 
-        return StreamingHttpResponse(
-            streaming_content=file["Body"].iter_chunks(),
+    def _get_file_content_x_accel_redirect(self, item, head_object):
+        """
+        Delegate the file transfer to nginx. The response only carries the internal
+        location to redirect to and the S3 authorization headers, nginx then proxies
+        the object storage response, Range requests included.
+        """
+        s3_request = generate_s3_authorization_headers(item.file_key)
+        location = settings.WOPI_GET_FILE_X_ACCEL_REDIRECT_LOCATION.rstrip("/")
+
+        return Response(
+            status=200,
             content_type=item.mimetype,
             headers={
+                "X-Accel-Redirect": f"{location}/{quote(item.file_key)}",
                 "X-WOPI-ItemVersion": get_wopi_item_version(head_object),
-                "Content-Length": head_object["ContentLength"],
+                "Authorization": s3_request.headers["Authorization"],
+                "X-Amz-Date": s3_request.headers["X-Amz-Date"],
+                "X-Amz-Content-SHA256": s3_request.headers["X-Amz-Content-SHA256"],
             },
-            status=200,
         )
 
     def _put_file_content(self, request, pk=None):
@@ -219,7 +267,7 @@ class WopiViewSet(viewsets.ViewSet):
             return Response(status=404)
 
         item = request.auth.item
-        abilities = item.get_abilities(request.user)
+        abilities = request.auth.get_abilities()
 
         if not abilities["update"]:
             return Response(status=401)
@@ -248,7 +296,8 @@ class WopiViewSet(viewsets.ViewSet):
         # non-READY files in WOPI.
         item.save(update_fields=["size", "updated_at"])
 
-        malware_detection.analyse_file(item.file_key, item_id=item.id)
+        # Editors save every few seconds, the analyses of a burst are coalesced.
+        schedule_item_file_analysis(item)
 
         head_response = s3_client.head_object(Bucket=default_storage.bucket_name, Key=item.file_key)
         return Response(
@@ -273,8 +322,7 @@ class WopiViewSet(viewsets.ViewSet):
 
         self._verify_request_signature(request)
 
-        item = request.auth.item
-        abilities = item.get_abilities(request.user)
+        abilities = request.auth.get_abilities()
 
         if not abilities["update"]:
             return Response(status=401)
@@ -299,14 +347,10 @@ class WopiViewSet(viewsets.ViewSet):
         item = request.auth.item
         lock_service = LockService(item)
 
-        if not lock_service.is_locked():
-            lock_service.lock(lock_value)
-            return Response(status=200)
-
-        if not lock_service.is_lock_valid(lock_value):
-            return Response(status=409, headers={X_WOPI_LOCK: lock_service.get_lock()})
+        result = lock_service.lock_or_refresh(lock_value)
+        if not result.success:
+            return Response(status=409, headers={X_WOPI_LOCK: result.current_lock})
 
-        lock_service.refresh_lock()
         return Response(status=200)
 
     def _get_lock(self, request, pk=None):
@@ -334,12 +378,10 @@ class WopiViewSet(viewsets.ViewSet):
         item = request.auth.item
         lock_service = LockService(item)
 
-        current_lock_value = lock_service.get_lock(default="")
+        result = lock_service.refresh_lock_if_match(lock_value)
+        if not result.success:
+            return Response(status=409, headers={X_WOPI_LOCK: result.current_lock})
 
-        if current_lock_value != lock_value:
-            return Response(status=409, headers={X_WOPI_LOCK: current_lock_value})
-
-        lock_service.refresh_lock()
         return Response(status=200)
 
     def _unlock(self, request, pk=None):
@@ -356,12 +398,10 @@ class WopiViewSet(viewsets.ViewSet):
         item = request.auth.item
         lock_service = LockService(item)
 
-        current_lock_value = lock_service.get_lock(default="")
-
-        if current_lock_value != lock_value:
-            return Response(status=409, headers={X_WOPI_LOCK: current_lock_value})
+        result = lock_service.unlock_if_match(lock_value)
+        if not result.success:
+            return Response(status=409, headers={X_WOPI_LOCK: result.current_lock})
 
-        lock_service.unlock()
         return Response(status=200)
 
     def _unlock_and_relock(self, request, pk=None):
@@ -379,12 +419,10 @@ class WopiViewSet(viewsets.ViewSet):
         item = request.auth.item
         lock_service = LockService(item)
 
-        current_lock_value = lock_service.get_lock(default="")
-        if current_lock_value != old_lock_value:
-            return Response(status=409, headers={X_WOPI_LOCK: current_lock_value})
+        result = lock_service.relock_if_match(old_lock_value, new_lock_value)
+        if not result.success:
+            return Response(status=409, headers={X_WOPI_LOCK: result.current_lock})
 
-        lock_service.unlock()
-        lock_service.lock(new_lock_value)
         return Response(status=200)
 
     def _rename_file(self, request, pk=None):
@@ -392,7 +430,7 @@ class WopiViewSet(viewsets.ViewSet):
         Rename the file
         """
         item = request.auth.item
-        abilities = item.get_abilities(request.user)
+        abilities = request.auth.get_abilities()
 
         if not abilities["update"]:
             return Response(status=401)
@@ -73,7 +73,7 @@ export type Item = {
   created_at: Date;
   is_favorite?: boolean;
   children?: Item[];
-  parents?: Item[];
+  parents?: (ItemBreadcrumb & { type: ItemType })[];
   breadcrumb?: ItemBreadcrumb[];
   numchild?: number;
   nb_accesses?: number;
@@ -193,7 +193,7 @@ export const isIdInItemTree = (itemPath: string, targetId: string): boolean => {
   return pathIds.includes(targetId);
 };
 
-export const getItemTitle = (item: Item) => {
+export const getItemTitle = (item: Pick<Item, "title" | "main_workspace">) => {
   if (item.main_workspace) {
     return i18n.t("explorer.workspaces.mainWorkspace");
   }